@@ -4,41 +4,30 @@ import os
 import hashlib
 from datetime import datetime
 from src.user.portfolio_manager import PortfolioManager
+from src.user.store import Store
 
 class UserManager:
-    def __init__(self, storage_file="data/users.json"):
+    """
+    Users and their preferences, kept in the shared SQLite store
+    (data/users.json is imported once on first use).
+    """
+    def __init__(self, storage_file="data/users.json", store=None):
         self.storage_file = storage_file
-        self.users = {}
-        # Initialize Portfolio Manager
-        self.portfolio_manager = PortfolioManager()
-        self._load_users()
-
-    def _load_users(self):
-        """Loads users from JSON file."""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, "r", encoding="utf-8") as f:
-                    self.users = json.load(f)
-            except Exception as e:
-                print(f"Error loading users: {e}")
-                self.users = {}
-        else:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
-            self.users = {}
+        self.store = store or Store.get(os.path.join(os.path.dirname(storage_file) or '.', 'app.db'))
+        self.store.migrate_users(self.storage_file)
+        # Initialize Portfolio Manager (same store, portfolios next to the users file)
+        self.portfolio_manager = PortfolioManager(os.path.join(os.path.dirname(storage_file) or '.', 'portfolios'), store=self.store)
             
         # Seed default user if empty to prevent lockout during migration
-        if not self.users:
+        if self.store.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
             print("Seeding default 'test' user...")
             self.register("test", "pass", "Test", "User", "test@example.com")
 
-    def _save_users(self):
-        """Saves users to JSON file."""
-        try:
-            with open(self.storage_file, "w", encoding="utf-8") as f:
-                json.dump(self.users, f, indent=4)
-        except Exception as e:
-            print(f"Error saving users: {e}")
+    @property
+    def users(self):
+        """{username: user dict} snapshot of every user (read-only; use register / update_profile to write)."""
+        rows = self.store.execute("SELECT username FROM users ORDER BY username").fetchall()
+        return {r['username']: self.get_user(r['username']) for r in rows}
 
     def _hash_password(self, password):
         """Basic hashing for security (prototype level)."""
@@ -46,14 +35,11 @@ class UserManager:
 
     def register(self, username, password, name, surname, email):
         """Registers a new user. Returns (Success, Message)."""
-        if username in self.users:
-            return False, "El nombre de usuario ya existe."
-        
         # Basic validation
         if not username or not password:
             return False, "Usuario y contraseña son obligatorios."
 
-        self.users[username] = {
+        user = {
             "username": username,
             "password_hash": self._hash_password(password),
             "name": name,
@@ -65,12 +51,15 @@ class UserManager:
                 "seasons": ['2526', '2425']
             }
         }
-        self._save_users()
+        with self.store.transaction() as conn:
+            # Insert-if-absent in one transaction: two sessions can't both claim a name
+            if not self.store.insert_user(conn, user):
+                return False, "El nombre de usuario ya existe."
         return True, "Registro exitoso."
 
     def authenticate(self, username, password):
         """Authenticates a user. Returns User dict or None."""
-        user = self.users.get(username)
+        user = self.get_user(username)
         if not user:
             return None
         
@@ -80,20 +69,30 @@ class UserManager:
 
     def update_profile(self, username, data):
         """Updates user profile data (name, surname, email, preferences)."""
-        if username not in self.users:
-            return False, "Usuario no encontrado."
-        
-        user = self.users[username]
-        
-        # Update allowed fields
-        if "name" in data: user["name"] = data["name"]
-        if "surname" in data: user["surname"] = data["surname"]
-        if "email" in data: user["email"] = data["email"]
-        if "preferences" in data: user["preferences"] = data["preferences"]
-        
-        self.users[username] = user
-        self._save_users()
+        # Update allowed fields (only the ones given; preferences replace the user's set)
+        fields = {k: data[k] for k in ("name", "surname", "email") if k in data}
+        with self.store.transaction() as conn:
+            if conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is None:
+                return False, "Usuario no encontrado."
+            if fields:
+                conn.execute(f"UPDATE users SET {', '.join(f'{k} = ?' for k in fields)} WHERE username = ?",
+                             list(fields.values()) + [username])
+            if "preferences" in data:
+                self.store.set_preferences(conn, username, data["preferences"])
         return True, "Perfil actualizado."
 
+    def delete_user(self, username):
+        """Removes a user and their preferences (bets are kept)."""
+        cur = self.store.execute("DELETE FROM users WHERE username = ?", (username,))
+        return cur.rowcount > 0
+
     def get_user(self, username):
-        return self.users.get(username)
+        row = self.store.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        user = {k: row[k] for k in ("username", "password_hash", "name", "surname", "email", "joined_at")}
+        if row["extra"]:
+            user.update(json.loads(row["extra"]))
+        prefs = self.store.execute("SELECT key, value FROM preferences WHERE username = ?", (username,)).fetchall()
+        user["preferences"] = {p["key"]: json.loads(p["value"]) for p in prefs}
+        return user
@@ -3,44 +3,31 @@ import pandas as pd
 import plotly.express as px
 import sys
 import os
-from datetime import datetime
+import re
+import datetime
+import traceback
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, Future
 
 # Add root to path so we can import src
 sys.path.append(os.getcwd())
 
-from src.data.loader import DataLoader
+# Dev mode only (DASHBOARD_DEV_RELOAD=1): pick up edited src modules before importing from them
+from src.dashboard.dev_reload import reload_changed
+reload_changed()
+
 from src.data.upcoming import FixturesFetcher
-from src.engine.predictor import Predictor
-from src.data.cups import CupLoader 
+from src.data.snapshot import SlateSnapshot
+from src.data.service import DataService
 
 from src.dashboard.match_view import render_match_details
-import src.dashboard.match_view
-import src.engine.predictor
-import importlib
-import src.engine.features
-import src.engine.ml_engine
-import src.engine.predictor
-import src.data.upcoming # Import module
-import src.auth.user_manager 
-import src.user.portfolio_manager # Add for reload checks 
-import src.data.odds_api_client # Fix: Force reload odds client 
-
-importlib.reload(src.engine.features)
-importlib.reload(src.engine.ml_engine)
-importlib.reload(src.engine.predictor)
-importlib.reload(src.engine.predictor)
-importlib.reload(src.user.portfolio_manager) # FORCE RELOAD PORTFOLIO
-importlib.reload(src.data.odds_api_client) # FORCE RELOAD ODDS CLIENT
-importlib.reload(src.auth.user_manager)
-importlib.reload(src.auth.user_manager)
-importlib.reload(src.data.upcoming) # FORCE RELOAD FixturesFetcher
-import src.dashboard.premium_row
-importlib.reload(src.dashboard.premium_row) # FORCE RELOAD UI Component
-
-
-from src.engine.features import FeatureEngineer
 from src.engine.patterns import PatternAnalyzer
-# from src.auth.user_manager import UserManager # Moved below to ensure reload works
+from src.engine.value_engine import ValueEngine
+from src.engine.trends_scanner import TrendScanner
+from src.engine.team_matches import TeamMatchTable
+from src.engine.referee import RefereeAnalyzer
+from src.engine.strategies import PREMATCH_PATTERNS
+from src.engine.trends import TrendsAnalyzer, TrendSearcher
 
 st.set_page_config(page_title="Sports Betting EV Analyzer", layout="wide")
 
@@ -53,6 +40,8 @@ from src.auth.user_manager import UserManager
 from src.dashboard.profile_view import render_profile_view
 from src.dashboard.portfolio_view import render_portfolio_view, dialog_add_prediction
 from src.dashboard.premium_row import render_premium_match_row
+from src.dashboard.render_model import RenderModels
+from src.utils.cache import VersionedLRU
 from src.engine.settlement import BetSettler # Import Settler
 
 # Initialize Manager
@@ -140,46 +129,111 @@ def fetch_upcoming_cached(leagues, _last_updated, cache_bust_v=11): # Increment
     fetcher = FixturesFetcher()
     return fetcher.fetch_upcoming(leagues)
 
-@st.cache_resource
-def get_predictor(data, version=3):
-    return Predictor(data)
-
-@st.cache_data(ttl=3600) # Cache for 1 hour
-def load_data(leagues, seasons, version=4): # Incremented version
-    loader = DataLoader()
-    df = loader.fetch_data(leagues, seasons)
-
-    if df.empty:
-        return df
+@st.cache_data(ttl=300)
+def load_snapshot_cached(mtime, leagues, start=None, end=None):
+    # mtime is hashed, so a newly written snapshot is picked up immediately.
+    # Only the rows of these leagues / dates are read from disk.
+    return SlateSnapshot.load(list(leagues), start, end)
+
+def slate_trends(match, predictor, scanner):
+    """Home/away trends of a slate row: precomputed in the snapshot, else scanned now."""
+    h_trends, a_trends = match.get('home_trends'), match.get('away_trends')
+    if isinstance(h_trends, list) and isinstance(a_trends, list):
+        return h_trends, a_trends
+    h_norm = predictor.normalize_name(match['HomeTeam'])
+    a_norm = predictor.normalize_name(match['AwayTeam'])
+    index = data_version.trends
+    return scanner.scan(h_norm, data, context='home', index=index), scanner.scan(a_norm, data, context='away', index=index)
+
+# --- LAZY SLATE RENDERING ---
+# Only the visible page of a slate is computed and rendered (Streamlit runs expander
+# bodies even when collapsed, so the page is the unit); the next page is warmed in
+# the background while the user reads the current one.
+SLATE_PAGE_SIZE = 20
+PREFETCH_KEEP = 200
 
-    try:
-        cup_loader = CupLoader()
-        cup_schedule = cup_loader.fetch_all_cups()
-    except Exception as e:
-        print(f"Warning: Could not fetch cup data: {e}")
-        cup_schedule = None
-
-    # Calculate Features
-    engineer = FeatureEngineer(df)
-    df = engineer.add_rest_days(cup_schedule=cup_schedule) # Pass cup data
-    df = engineer.add_rolling_stats(window=5)
-    df = engineer.add_recent_form(window=5) # PPG Form
-    df = engineer.add_opponent_difficulty(window=5) # NEW: Opponent Strength
-    df = engineer.add_relative_strength()
-
-    # --- GLOBAL NORMALIZATION AT SOURCE ---
-    # Fixes Promoted/Relegated team history disconnects (e.g. Leicester vs Leicester City)
-    from src.utils.normalization import NameNormalizer
-    df['HomeTeam'] = df['HomeTeam'].apply(NameNormalizer.normalize)
-    df['AwayTeam'] = df['AwayTeam'].apply(NameNormalizer.normalize)
-    
-    return df
+@st.cache_resource
+def prefetch_pool():
+    # One shared background worker: prefetching must never compete with the visible page
+    return ThreadPoolExecutor(max_workers=1)
+
+def paginate(frame, key, page_size=SLATE_PAGE_SIZE):
+    """
+    Visible page of a sorted frame plus the next one (empty on the last page).
+    The pager is only shown when there is more than one page; nothing is dropped,
+    every row stays one page away.
+    """
+    n_pages = max(1, -(-len(frame) // page_size))
+    if st.session_state.get(key, 1) > n_pages:
+        st.session_state[key] = 1 # Filters changed under the pager
+    if n_pages > 1:
+        page = st.number_input(f"Página (de {n_pages}, {len(frame)} partidos)", min_value=1, max_value=n_pages, step=1, key=key)
+    else:
+        page = 1
+    start = (int(page) - 1) * page_size
+    return frame.iloc[start:start + page_size], frame.iloc[start + page_size:start + 2 * page_size]
+
+def _keep_future(key, future):
+    futures = st.session_state.setdefault('prefetch', {})
+    futures[key] = future
+    while len(futures) > PREFETCH_KEEP:
+        futures.pop(next(iter(futures)))
+
+def prefetch(key, fn, *args):
+    """Starts fn(*args) in the background once per key (the future lives in the session)."""
+    if key not in st.session_state.get('prefetch', {}):
+        _keep_future(key, prefetch_pool().submit(fn, *args))
+
+def prefetched(key, fn, *args):
+    """Result of a prefetched call (waits if it's still running), else computed now and kept for reruns."""
+    future = st.session_state.get('prefetch', {}).get(key)
+    if future is not None:
+        try:
+            return future.result()
+        except Exception:
+            pass # Recompute in the foreground below
+    result = fn(*args)
+    done = Future()
+    done.set_result(result)
+    _keep_future(key, done)
+    return result
+
+LIVE_PREDICTIONS_SIZE = 2000
+
+def live_prediction(data_version, match):
+    """
+    predict_match_safe for a live (non-snapshot) fixture, memoized per data version.
+    Keyed by fixture, referee, real odds and loaded ML model, so pager and button
+    reruns reuse the row while refreshed odds or a retrained model still recompute it.
+    Returns a copy (callers merge the fixture columns into it).
+    """
+    predictor = data_version.predictor
+    current_odds = {k: v for k, v in match.items() if str(k).startswith('B365')}
+    key = (
+        RenderModels.fixture_id(match),
+        str(match.get('Referee')),
+        tuple(sorted((k, str(v)) for k, v in current_odds.items())),
+        predictor.ml_engine.model_key,
+    )
+    cache = data_version.shared('live_predictions', lambda: VersionedLRU(LIVE_PREDICTIONS_SIZE))
+    cached = cache.get_or_build(key, lambda: (predictor.predict_match_safe(
+        match['HomeTeam'],
+        match['AwayTeam'],
+        match_date=match.get('Date'),
+        referee=match.get('Referee'),
+        known_odds=current_odds # PASS KNOWN ODDS!
+    ),))
+    row = cached[0] # Wrapped so a failed (empty) prediction is cached too
+    return dict(row) if row else row
 
 
 
 
 
 # --- CONSTANTS ---
+STRONG_TREND_RE = re.compile(r"L(\d+)/(\d+)") # "... L8/10" trend counts
+# Disable TLS warnings (fixtures/odds sources are fetched with verify=False)
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 league_options = ['SP1', 'SP2', 'E0', 'E1', 'D1', 'I1', 'F1', 'P1', 'N1']
 league_names = {
     'SP1': 'La Liga (España)', 'E0': 'Premier League', 'E1': 'Championship',
@@ -233,10 +287,20 @@ if not active_leagues:
 
 
 
-# Call with version 4 (Bumped to force normalization refresh)
-data = load_data(active_leagues, active_seasons, version=4)
-# Initialize Predictor Globally for Match View using Cache
-predictor = get_predictor(data)
+# Shared by every session: one frame, predictor and indexes per data version (DataService.PIPELINE_VERSION)
+data_version = DataService.get(active_leagues, active_seasons)
+data = data_version.data
+# Initialize Predictor Globally for Match View
+predictor = data_version.predictor
+
+@st.cache_resource
+def settlement_job():
+    # One background settlement run per process for every user's pending bets (not on page load).
+    # Default selection: the data version most sessions already share, so it adds no build
+    return BetSettler.start_schedule(user_manager.portfolio_manager.store,
+                                     lambda: DataService.get(default_leagues, ['2526', '2425']).frame)
+
+settlement_job()
 
 st.sidebar.info(f"Cargados {len(data)} partidos.")
 
@@ -247,11 +311,6 @@ if st.session_state['view'] == 'profile':
     
 # --- ROUTING: PORTFOLIO VIEW ---
 if st.session_state['view'] == 'portfolio':
-    # Auto-Settle on Load
-    settled = BetSettler.settle_user_bets(user_manager, st.session_state['user']['username'], data)
-    if settled > 0:
-        st.toast(f"✅ {settled} apuestas han sido actualizadas automáticamente!")
-        
     render_portfolio_view(user_manager, st.session_state['user']['username'])
     st.stop()
 
@@ -404,7 +463,6 @@ with tab1:
     with st.expander("🛠️ Filtros: Fecha y Competición", expanded=True):
         f_col1, f_col2 = st.columns(2)
         with f_col1:
-            import datetime
             # --- DATE NAVIGATION (Minimalist) ---
             if 'current_date' not in st.session_state:
                 st.session_state.current_date = datetime.date.today()
@@ -487,41 +545,28 @@ with tab1:
         
         # SSG / HYBRID DATA LOADING (Backend First)
         # ------------------------------------------------------------------
-        import json
-        import os
-        CACHE_FILE = "data_cache/dashboard_data.json"
-        backend_matches = None
-
-        if os.path.exists(CACHE_FILE):
-             try:
-                 # Check freshness (TTL: 2 hours)
-                 import time
-                 mtime = os.path.getmtime(CACHE_FILE)
-                 age_hours = (time.time() - mtime) / 3600
-                 
-                 # FORCE DISABLE CACHE FOR DEBUGGING
-                 if True: # was age_hours > 2.0
-                     # print(f"Cache expired ({age_hours:.1f}h). Ignoring.")
-                     bk_data = None
-                 else:
-                     with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                         bk_data = json.load(f)
-                     if bk_data and 'matches' in bk_data:
-                         st.toast(f"⚡ Datos cargados del Backend ({bk_data['metadata']['last_updated']})")
-                         backend_matches = pd.DataFrame(bk_data['matches'])
-             except Exception as e:
-                 # st.error(f"Error loading backend: {e}")
-                 pass
-
-        if backend_matches is not None and not backend_matches.empty:
-            upcoming = backend_matches
-        else:
+        # Precomputed slate (tools/update_dashboard_data.py); live fetch only for leagues it lacks
+        snap_start, snap_end = date_range if len(date_range) == 2 else (None, None)
+        snapshot = load_snapshot_cached(SlateSnapshot.mtime(), tuple(selected_leagues_tab1), snap_start, snap_end)
+        live_leagues = list(selected_leagues_tab1)
+        parts = []
+        if snapshot is not None:
+            parts.append(snapshot.for_leagues(selected_leagues_tab1))
+            live_leagues = snapshot.missing_leagues(selected_leagues_tab1)
+            age_min = int(snapshot.age.total_seconds() // 60)
+            st.caption(f"⚡ Cartelera precalculada hace {age_min} min ({snapshot.last_updated:%d/%m %H:%M})"
+                       + (f" · En vivo: {', '.join(live_leagues)}" if live_leagues else ""))
+
+        if live_leagues:
             # Fallback to Live Fetch
             try:
                  db_ts = os.path.getmtime('data_cache/odds_database.csv')
             except:
                  db_ts = 0
-            upcoming = fetch_upcoming_cached(selected_leagues_tab1, db_ts, cache_bust_v=17)
+            parts.append(fetch_upcoming_cached(live_leagues, db_ts, cache_bust_v=17))
+        
+        parts = [p for p in parts if not p.empty]
+        upcoming = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
         
         upcoming = upcoming.copy() # SAFETY COPY
         
@@ -566,169 +611,33 @@ with tab1:
                 
                 # ----------------------------------
                 
-                predictor = get_predictor(data)
+                predictor = data_version.predictor
                 predictions = []
                 
-                # Import Patterns
-                from src.engine.strategies import PREMATCH_PATTERNS
-
-                # Advanced Pattern Evaluator using Centralized Strategies
-                def evaluate_match_potential(row):
-                    preds = []
-                    
-                    for name, cond_func, _, type_str in PREMATCH_PATTERNS:
-                        if cond_func(row):
-                            # Calculate specific probabilities/suggestions based on pattern type
-                            prob = 0
-                            suggestion = name
-                            specific_odd = "N/A" # Default if odds not found
-                            
-                            # Custom logic for display nuances
-                            if "Local Dominante" in name:
-                                prob = min(95, int(row.get('HomePPG', 1.5) * 35))
-                                suggestion = "Victoria Local (Alta Confianza)"
-                                # Try Home Win Odds
-                                odd_val = row.get('B365H') or row.get('AvgH')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-
-                            elif "Festival" in name:
-                                avg_goals = row.get('HomeAvgGoalsFor',0) + row.get('AwayAvgGoalsFor',0)
-                                prob = min(90, int(avg_goals * 20))
-                                suggestion = "Más de 2.5 Goles"
-                                # Look for specific B365_Over2.5 or B365>2.5
-                                odd_val = row.get('B365_Over2.5') or row.get('B365>2.5')
-                                if pd.isna(odd_val): odd_val = row.get('Avg>2.5')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-
-                            elif "Seguro" in name:
-                                prob = 85
-                                suggestion = "Más de 1.5 Goles"
-                                # Look for specific B365_Over1.5 or B365>1.5
-                                odd_val = row.get('B365_Over1.5') or row.get('B365>1.5')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                                # REMOVED: Confusing Ref O2.5 fallback
-                                # else:
-                                #    pass
-
-                            elif "Choque" in name:
-                                prob = 80
-                                suggestion = "Victoria Local (Forma)"
-                                odd_val = row.get('B365H') or row.get('AvgH')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-
-                            elif "Tarjetas" in name:
-                                # DYNAMIC CARDS STRATEGY
-                                # Estimate cards based on Ref + Team Aggression
-                                ref_cards = row.get('Ref_AvgCards', 4.0)
-                                team_cards = (row.get('HomeAvgCards', 2.0) + row.get('AwayAvgCards', 2.0)) / 2
-                                est_cards = (ref_cards + team_cards) / 2
-                                
-                                # Decide Line
-                                if est_cards >= 4.8:
-                                    suggestion = "Más de 4.5 Tarjetas"
-                                    line = 4.5
-                                elif est_cards >= 3.8:
-                                    suggestion = "Más de 3.5 Tarjetas" 
-                                    line = 3.5
-                                else:
-                                    suggestion = "Más de 3.5 Tarjetas (Riesgo)"
-                                    line = 3.5
-                                    prob = 55 # Lower confidence
-                                
-                                prob = min(85, int(est_cards * 15))
-                                
-                                # Dynamic Lookup
-                                odd_val = row.get(f'B365_Cards_Over{line}')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val} (O{line})"
-
-                            elif "Córner" in name:
-                                # DYNAMIC CORNERS STRATEGY
-                                tot_corners = row.get('HomeAvgCornersFor', 5) + row.get('AwayAvgCornersFor', 4)
-                                
-                                if tot_corners > 10.5:
-                                    suggestion = "Más de 10.5 Córners"
-                                    line = 10.5
-                                elif tot_corners > 9.5:
-                                    suggestion = "Más de 9.5 Córners"
-                                    line = 9.5
-                                else:
-                                    suggestion = "Más de 8.5 Córners"
-                                    line = 8.5
-                                
-                                prob = min(80, int(tot_corners * 8))
-                                
-                                odd_val = row.get(f'B365_Corners_Over{line}')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val} (O{line})"
-
-                            elif "Visitante" in name:
-                                prob = 60
-                                suggestion = "Victoria Visitante o X2"
-                                odd_val = row.get('B365A') or row.get('AvgA')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-
-                            elif "Ambos Marcan" in name:
-                                prob = 80
-                                suggestion = "Ambos Marcan (Sí)"
-                                odd_val = row.get('B365_BTTS_Yes') or row.get('B365GG')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                            
-                            # NEW: TEAM GOALS
-                            elif "Goleador Local" in name or ("Local" in name and row.get('HomeAvgGoalsFor', 0) > 1.8):
-                                prob = 75
-                                suggestion = "Local: Más de 1.5 Goles"
-                                odd_val = row.get('B365_HomeTeam_Goals_Over1.5')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                            
-                            elif "Goleador Visitante" in name or ("Visitante" in name and row.get('AwayAvgGoalsFor', 0) > 1.8):
-                                prob = 70
-                                suggestion = "Visitante: Más de 1.5 Goles"
-                                odd_val = row.get('B365_AwayTeam_Goals_Over1.5')
-                                if pd.notna(odd_val): specific_odd = f"{odd_val}"
-
-                            else:
-                                prob = 70
-                                # Generic mapping check
-                                if "Local" in name:
-                                     odd_val = row.get('B365H') or row.get('AvgH')
-                                     if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                                elif "Visitante" in name:
-                                     odd_val = row.get('B365A') or row.get('AvgA')
-                                     if pd.notna(odd_val): specific_odd = f"{odd_val}"
-                            
-                            preds.append({
-                                'pattern': name,
-                                'suggestion': suggestion,
-                                'prob': prob,
-                                'type': 'pattern_match',
-                                'stats': row,
-                                'odd': specific_odd # Add to result
-                            })
-
-                    return preds
+                # Value bets: goal model probabilities vs. every available odds column
+                value_engine = ValueEngine()
 
                 matches_data = []
                 count_preds = 0
                 
-                # Instantiate TrendsAnalyzer for Form Lookups
-                from src.engine.trends import TrendsAnalyzer
-                trends_analyzer_forms = TrendsAnalyzer(data)
+                # Row view models (form, logos, odds, pills), built once per fixture and data version
+                render_models = data_version.shared('render_models', lambda: RenderModels.get(data_version.frame))
 
                 # Process all matches first
                 all_preds = []
+                slate_rows = []
                 for idx, match in upcoming.iterrows():
-                    # Extract known odds from upcoming match data to prevent synthetic overwrite
-                    current_odds = {k: v for k, v in match.items() if str(k).startswith('B365')}
-                    
-                    # Enhanced Prediction (Pass full context to avoid 0-0/Mismatch)
-                    row = predictor.predict_match_safe(
-                        match['HomeTeam'], 
-                        match['AwayTeam'], 
-                        match_date=match.get('Date'),
-                        referee=match.get('Referee'),
-                        known_odds=current_odds # PASS KNOWN ODDS!
-                    )
+                    # Snapshot rows already carry the prediction merged with the real odds
+                    if pd.notna(match.get('FromSnapshot')) and match.get('FromSnapshot'):
+                        display_row = match.to_dict()
+                        matches_data.append(display_row)
+                        if display_row.get('HasStats'):
+                            slate_rows.append(display_row)
+                        continue
                     
+                    # Enhanced Prediction (full context + known odds), reused across reruns of this data version
+                    row = live_prediction(data_version, match)
+
                     # Prepare display data even if prediction fails
                     display_row = match.to_dict()
                     if row:
@@ -749,70 +658,95 @@ with tab1:
                             elif k not in row:
                                 row[k] = v
                                 
-                        patterns = evaluate_match_potential(row)
-                        for p in patterns:
-                            all_preds.append({
-                                'HomeTeam': match['HomeTeam'],
-                                'AwayTeam': match['AwayTeam'],
-                                'Div': match['Div'],
-                                'Date': match['Date'],
-                                'Time': match.get('Time', 'N/A'),
-                                **p,
-                                **row # CRITICAL FIX: Unpack full prediction stats so they are available at top level for UI and Navigation
-                            })
+                        slate_rows.append(row)
+
+                # Evaluate the whole slate in one pass, best EV first
+                if slate_rows:
+                    value_bets = value_engine.evaluate(pd.DataFrame(slate_rows))
+                    for bet in value_bets.itertuples(index=False):
+                        row = slate_rows[bet.match_idx]
+                        all_preds.append({
+                            'HomeTeam': row['HomeTeam'],
+                            'AwayTeam': row['AwayTeam'],
+                            'Div': row.get('Div'),
+                            'Date': row.get('Date'),
+                            'Time': row.get('Time', 'N/A'),
+                            'pattern': 'Valor (EV)',
+                            'suggestion': bet.suggestion,
+                            'market': bet.market,
+                            'prob': int(round(bet.prob * 100)),
+                            'type': 'value_bet',
+                            'stats': row,
+                            'odd': f"{bet.odd}",
+                            'ev': bet.edge,
+                            'stake': bet.stake,
+                            **row # CRITICAL FIX: Unpack full prediction stats so they are available at top level for UI and Navigation
+                        })
 
                 # Display Logic
                 if all_preds:
                     preds_df = pd.DataFrame(all_preds)
                     
                     if 'Div' in preds_df.columns:
-                        grouped_preds = preds_df.groupby('Div')
-                        
                         flags_map_emoji = {
                             'SP1': '🇪🇸', 'SP2': '🇪🇸', 'E0': '🇬🇧', 'E1': '🇬🇧', 'D1': '🇩🇪', 'I1': '🇮🇹', 'F1': '🇫🇷', 'P1': '🇵🇹', 'N1': '🇳🇱'
                         }
                         
-                        for div, group in grouped_preds:
+                        # Deduplicate by Match (Home, Away, Date)
+                        # We aggregate patterns and take the max prob
+                        unique_matches = {}
+                        for _, row in preds_df[preds_df['Div'].notna()].iterrows():
+                            key = (row['Div'], row['HomeTeam'], row['AwayTeam'], row['Date'])
+                            if key not in unique_matches:
+                                unique_matches[key] = {
+                                    'meta': row,
+                                    'patterns': []
+                                }
+                                
+                            # DEDUPLICATION: Check if this suggestion exists
+                            existing_suggestions = [p['suggestion'] for p in unique_matches[key]['patterns']]
+                            if row['suggestion'] not in existing_suggestions:
+                                unique_matches[key]['patterns'].append({
+                                    'suggestion': row['suggestion'],
+                                    'prob': row['prob'],
+                                    'pattern': row['pattern'],
+                                    'odd': row.get('odd', 'N/A'),
+                                    'ev': row.get('ev'),
+                                    'stake': row.get('stake'),
+                                    'market': row.get('market')
+                                })
+                        
+                        opportunities = list(unique_matches.values())
+                        count_preds = len(opportunities)
+                        
+                        # Same pager as the Cartelera: only the visible page of opportunities
+                        # is rendered, league by league with the best EV first
+                        value_df = pd.DataFrame({
+                            'Div': [item['meta']['Div'] for item in opportunities],
+                            'ev': [max(p['ev'] for p in item['patterns']) for item in opportunities],
+                            'pos': range(len(opportunities)),
+                        }).sort_values(['Div', 'ev'], ascending=[True, False], kind='stable')
+                        league_counts = value_df['Div'].value_counts()
+                        value_page, _ = paginate(value_df, 'value_page')
+                        
+                        for div, group in value_page.groupby('Div', sort=False):
                             league_name = league_names.get(div, div)
                             flag_emoji = flags_map_emoji.get(div, '⚽')
                             
-                            # Deduplicate by Match (Home, Away, Date)
-                            # We aggregate patterns and take the max prob
-                            unique_matches = {}
-                            for _, row in group.iterrows():
-                                key = (row['HomeTeam'], row['AwayTeam'], row['Date'])
-                                if key not in unique_matches:
-                                    unique_matches[key] = {
-                                        'meta': row,
-                                        'patterns': []
-                                    }
-                                    
-                                # DEDUPLICATION: Check if this suggestion exists
-                                existing_suggestions = [p['suggestion'] for p in unique_matches[key]['patterns']]
-                                if row['suggestion'] not in existing_suggestions:
-                                    unique_matches[key]['patterns'].append({
-                                        'suggestion': row['suggestion'],
-                                        'prob': row['prob'],
-                                        'pattern': row['pattern'],
-                                        'odd': row.get('odd', 'N/A')
-                                    })
-                            
-                            with st.expander(f"{flag_emoji} {league_name} ({len(unique_matches)} partidos con oportunidades)", expanded=True):
-                                for key, data_item in unique_matches.items():
-                                    count_preds += 1
+                            with st.expander(f"{flag_emoji} {league_name} ({league_counts[div]} partidos con oportunidades)", expanded=True):
+                                for pos in group['pos']:
+                                    data_item = opportunities[pos]
                                     row = data_item['meta']
-                                    patterns = data_item['patterns']
                                     
-                                    # Sort patterns by probability desc
-                                    patterns = sorted(patterns, key=lambda x: x['prob'], reverse=True)
-                                    best_pattern = patterns[0]
+                                    # Sort value bets by EV desc
+                                    patterns = sorted(data_item['patterns'], key=lambda x: x['ev'], reverse=True)
                                     
                                     # Use Shared Component for Consistency & Compactness
                                     render_premium_match_row(
                                         row, 
                                         predictor, 
                                         None, 
-                                        trends_analyzer_forms, 
+                                        render_models, 
                                         go_to_match, 
                                         home_trends=None, # Don't overload with generic trends if we have specific strategies
                                         away_trends=None,
@@ -820,13 +754,6 @@ with tab1:
                                         extra_strategies=patterns,
                                         strategy_callback=on_strategy_click
                                     )
-                                    
-                                    # st.divider() # Component adds border/padding, usually enough.
-
-
-
-                                        
-
 
                 if count_preds == 0:
                     st.info("No se detectaron patrones de 'Alto Valor' (Filtros Estrictos). Revisa el explorador abajo.")
@@ -849,35 +776,42 @@ with tab1:
 
                 st.subheader("📋 Cartelera del Día (Vista Premium)")
                 
-                import importlib
-                import src.dashboard.premium_row
-                importlib.reload(src.dashboard.premium_row)
-                from src.dashboard.premium_row import render_premium_match_row
-                
-                from src.engine.trends_scanner import TrendScanner
-                
                 # Initialize Scanner
                 scanner = TrendScanner()
 
                 if matches_data:
-                    # 1. Sort Data: Date -> Div -> Time
+                    # 1. Sort Data: Div -> Date -> Time (same order as the league grouping below)
                     md_df = pd.DataFrame(matches_data)
                     md_df['Date'] = pd.to_datetime(md_df['Date'])
                     
                     # ROBUST SORT
                     sort_keys = ['Date']
-                    if 'Div' in md_df.columns: sort_keys.append('Div')
+                    if 'Div' in md_df.columns: sort_keys.insert(0, 'Div')
                     if 'Time' in md_df.columns: sort_keys.append('Time')
                     
                     md_df = md_df.sort_values(by=sort_keys)
                     
                     # DEDUPLICATE (Robustness)
                     md_df = md_df.drop_duplicates(subset=['HomeTeam', 'AwayTeam', 'Date'])
+
+                    def slate_row(m_dict):
+                        """Trends of a slate row with its view model warmed (safe in the background)."""
+                        h_trends, a_trends = slate_trends(m_dict, predictor, scanner)
+                        render_models.view(m_dict, predictor, h_trends, a_trends, buttons=True)
+                        return h_trends, a_trends
+
+                    def slate_key(m_dict):
+                        return ('slate', data_version.token, RenderModels.fixture_id(m_dict))
+
+                    # 2. Only the visible page is computed; the next one is warmed meanwhile
+                    page_df, next_df = paginate(md_df, 'slate_page')
+                    for m_dict in next_df.to_dict('records'):
+                        prefetch(slate_key(m_dict), slate_row, m_dict)
                     
-                    # 2. Render Loop
+                    # 3. Render Loop
                     # Group by League for cleaner UI?
-                    if 'Div' in md_df.columns:
-                        grouped = md_df.groupby('Div')
+                    if 'Div' in page_df.columns:
+                        grouped = page_df.groupby('Div', sort=False)
                         
                         flags_map_emoji = {
                             'SP1': '🇪🇸', 'SP2': '🇪🇸', 'E0': '🇬🇧', 'E1': '🇬🇧', 'D1': '🇩🇪', 'I1': '🇮🇹', 'F1': '🇫🇷', 'P1': '🇵🇹', 'N1': '🇳🇱'
@@ -896,13 +830,13 @@ with tab1:
                             'E1': "https://media.api-sports.io/football/leagues/40.png"    # Championship
                         }
                         default_logo = "https://cdn-icons-png.flaticon.com/512/53/53283.png"
+                        league_sizes = md_df['Div'].value_counts()
 
                         for div, group in grouped:
                             league_name = league_names.get(div, div)
                             flag = flags_map_emoji.get(div, '')
                             logo = league_logos.get(div, default_logo)
                             
-                            # Custom Header (Minimalist Strip)
                             # Custom Header (Minimalist Strip)
                             st.markdown(f"""
                             <div style="
@@ -918,6 +852,7 @@ with tab1:
                                 <img src="{logo}" onerror="this.src='{default_logo}'" style="width: 32px; height: 32px; margin-right: 12px; object-fit: contain;">
                                 <span style="font-weight: 700; font-size: 1.25em; color: #31333F;">{league_name}</span>
                                 <span style="margin-left: 10px; font-size: 1.5em;">{flag}</span>
+                                <span style="margin-left: auto; color: #888; font-size: 0.85em;">{league_sizes.get(div, len(group))} partidos</span>
                             </div>
                             """, unsafe_allow_html=True)
                             
@@ -925,19 +860,14 @@ with tab1:
                                 # Convert Series to Dict
                                 m_dict = m_row.to_dict()
                                 
-                                # SCAN TRENDS ON THE FLY
-                                h_norm = predictor.normalize_name(m_dict['HomeTeam'])
-                                a_norm = predictor.normalize_name(m_dict['AwayTeam'])
-                                
-                                h_trends = scanner.scan(h_norm, data, context='home')
-                                a_trends = scanner.scan(a_norm, data, context='away')
+                                h_trends, a_trends = prefetched(slate_key(m_dict), slate_trends, m_dict, predictor, scanner)
                                 
                                 # Pass dependencies
                                 render_premium_match_row(
                                     m_dict, 
                                     predictor, 
                                     None, 
-                                    trends_analyzer_forms,
+                                    render_models,
                                     go_to_match,
                                     home_trends=h_trends,
                                     away_trends=a_trends,
@@ -947,19 +877,15 @@ with tab1:
                     else:
                         # Fallback no Div grouping
                         st.caption("Partidos Varios")
-                        for _, m_row in md_df.iterrows():
-                            # SCAN TRENDS
-                            h_norm = predictor.normalize_name(m_row['HomeTeam'])
-                            a_norm = predictor.normalize_name(m_row['AwayTeam'])
-                            
-                            h_trends = scanner.scan(h_norm, data, context='home')
-                            a_trends = scanner.scan(a_norm, data, context='away')
+                        for _, m_row in page_df.iterrows():
+                            m_dict = m_row.to_dict()
+                            h_trends, a_trends = prefetched(slate_key(m_dict), slate_trends, m_dict, predictor, scanner)
                             
                             render_premium_match_row(
-                                m_row.to_dict(), 
+                                m_dict, 
                                 predictor, 
                                 None, 
-                                trends_analyzer_forms, 
+                                render_models, 
                                 go_to_match, 
                                 home_trends=h_trends, 
                                 away_trends=a_trends,
@@ -1007,72 +933,42 @@ with tab2:
         # Recent Form Charts
         st.subheader(f"Forma Reciente ({period})")
         
-        # Context-aware Metric Options
+        # Context-aware Metric Options (team-perspective columns of the shared team-match table)
         if period == "Partido Completo":
             metric_options = {
-                'Goles (H/A)': ('FTHG', 'FTAG'),
-                'Tiros a Puerta': ('HST', 'AST'),
-                'Córners': ('HC', 'AC'),
-                'Faltas': ('HF', 'AF'), 
-                'Tarjetas (Y+R)': ('Cards', 'Cards') 
+                'Goles (H/A)': 'GoalsFor',
+                'Tiros a Puerta': 'ShotsTargetFor',
+                'Córners': 'CornersFor',
+                'Faltas': 'FoulsFor', 
+                'Tarjetas (Y+R)': 'CardsFor' 
             }
         else:
              # Restricted metrics for Halves (Data usually only has Goals)
              metric_options = {
-                'Goles (H/A)': ('HTHG', 'HTAG') if period == '1ª Parte' else ('HomeGoals2H', 'AwayGoals2H'),
+                'Goles (H/A)': 'HTGoalsFor' if period == '1ª Parte' else '2HGoalsFor',
              }
              
         selected_metric_label = st.selectbox("Seleccionar Métrica", list(metric_options.keys()), key="h2h_metric_select")
         
-        # Get Home Team History
-        home_games = data[(data['HomeTeam'] == team_home) | (data['AwayTeam'] == team_home)].sort_values('Date').tail(10)
-        away_games = data[(data['HomeTeam'] == team_away) | (data['AwayTeam'] == team_away)].sort_values('Date').tail(10)
+        team_table = data_version.shared('team_table', lambda: TeamMatchTable.get(data_version.frame))
         
-        # Prepare Data for Plot
-        def get_team_metric(row, team, metric_label, period):
-            # 1H/2H Special Logic (Goals Only)
-            if period != "Partido Completo":
-                 # Determine if Home or Away role
-                 is_home = (row['HomeTeam'] == team)
-                 
-                 # 1H Goals
-                 if period == "1ª Parte":
-                     return row['FTHG'] if is_home else row['FTAG'] # Wait, this uses FT. Fix to HTHG.
-                     # Actually check if HTHG exists
-                     if 'HTHG' not in row: return 0
-                     return row['HTHG'] if is_home else row['HTAG']
-                     
-                 # 2H Goals
-                 elif period == "2ª Parte":
-                     if 'HTHG' not in row or 'FTHG' not in row: return 0
-                     
-                     g_ft = row['FTHG'] if is_home else row['FTAG']
-                     g_ht = row['HTHG'] if is_home else row['HTAG']
-                     return max(0, g_ft - g_ht)
-
-            # Full Period Logic
-            if metric_label == 'Tarjetas (Y+R)':
-                # Sum Yellow + Red
-                if row['HomeTeam'] == team:
-                    return row.get('HY',0) + row.get('HR',0)
-                else:
-                    return row.get('AY',0) + row.get('AR',0)
-            
-            # Standard Tuple Mapping
-            if metric_label in metric_options:
-                col_home, col_away = metric_options[metric_label]
-                if row['HomeTeam'] == team:
-                    return row.get(col_home, 0)
-                else:
-                    return row.get(col_away, 0)
-            return 0
-            
-        home_games['Value'] = home_games.apply(lambda x: get_team_metric(x, team_home, selected_metric_label, period), axis=1)
-        away_games['Value'] = away_games.apply(lambda x: get_team_metric(x, team_away, selected_metric_label, period), axis=1)
+        def team_values(games, column):
+            """Per-match values of one team-perspective column (0 where the source lacks it)."""
+            if column == 'CardsFor':
+                return team_values(games, 'YellowFor') + team_values(games, 'RedFor')
+            if column not in games.columns:
+                return pd.Series(0, index=games.index)
+            return games[column]
+        
+        # Last 10 matches of each team (oldest first for the chart)
+        home_games = team_table.team(team_home).tail(10)
+        away_games = team_table.team(team_away).tail(10)
+        home_values = team_values(home_games, metric_options[selected_metric_label])
+        away_values = team_values(away_games, metric_options[selected_metric_label])
         
         fig = px.line()
-        fig.add_scatter(x=home_games['Date'], y=home_games['Value'], name=team_home, mode='lines+markers')
-        fig.add_scatter(x=away_games['Date'], y=away_games['Value'], name=team_away, mode='lines+markers')
+        fig.add_scatter(x=home_games['Date'], y=home_values, name=team_home, mode='lines+markers')
+        fig.add_scatter(x=away_games['Date'], y=away_values, name=team_away, mode='lines+markers')
         fig.update_layout(title=f"Evolución de {selected_metric_label} (Últimos 10) - {period}")
         st.plotly_chart(fig, use_container_width=True)
         
@@ -1080,7 +976,7 @@ with tab2:
         st.subheader("Comparativa Global (Temporada Actual)")
         
         def get_season_stats(team_name):
-            matches = data[(data['HomeTeam'] == team_name) | (data['AwayTeam'] == team_name)]
+            matches = team_table.team(team_name)
             if matches.empty: return None
             
             # Stats depend on period too? Ideally yes, but let's stick to Full Match for this table to avoid complexity overload
@@ -1092,22 +988,22 @@ with tab2:
             
             if period == "Partido Completo":
                  stats = {
-                    'Goles Fav': matches.apply(lambda x: x['FTHG'] if x['HomeTeam'] == team_name else x['FTAG'], axis=1).mean(),
-                    'Goles Con': matches.apply(lambda x: x['FTAG'] if x['HomeTeam'] == team_name else x['FTHG'], axis=1).mean(),
-                    'Córners': matches.apply(lambda x: x['HC'] if x['HomeTeam'] == team_name and 'HC' in x else (x['AC'] if 'AC' in x else 0), axis=1).mean(),
-                    'Tarjetas': matches.apply(lambda x: (x['HY'] + x['HR']) if x['HomeTeam'] == team_name and 'HY' in x else (x['AY'] + x['AR']), axis=1).mean(),
-                    'Tiros Puerta': matches.apply(lambda x: x['HST'] if x['HomeTeam'] == team_name and 'HST' in x else (x['AST'] if 'AST' in x else 0), axis=1).mean()
+                    'Goles Fav': team_values(matches, 'GoalsFor').mean(),
+                    'Goles Con': team_values(matches, 'GoalsAgainst').mean(),
+                    'Córners': team_values(matches, 'CornersFor').mean(),
+                    'Tarjetas': team_values(matches, 'CardsFor').mean(),
+                    'Tiros Puerta': team_values(matches, 'ShotsTargetFor').mean()
                 }
             elif period == "1ª Parte":
                 # Only Goals
                  stats = {
-                    'Goles Fav (1H)': matches.apply(lambda x: x.get('HTHG',0) if x['HomeTeam'] == team_name else x.get('HTAG',0), axis=1).mean(),
-                    'Goles Con (1H)': matches.apply(lambda x: x.get('HTAG',0) if x['HomeTeam'] == team_name else x.get('HTHG',0), axis=1).mean(),
+                    'Goles Fav (1H)': team_values(matches, 'HTGoalsFor').mean(),
+                    'Goles Con (1H)': team_values(matches, 'HTGoalsAgainst').mean(),
                 }
             elif period == "2ª Parte":
                  stats = {
-                    'Goles Fav (2H)': matches.apply(lambda x: (x.get('FTHG',0)-x.get('HTHG',0)) if x['HomeTeam'] == team_name else (x.get('FTAG',0)-x.get('HTAG',0)), axis=1).mean(),
-                    'Goles Con (2H)': matches.apply(lambda x: (x.get('FTAG',0)-x.get('HTAG',0)) if x['HomeTeam'] == team_name else (x.get('FTHG',0)-x.get('HTHG',0)), axis=1).mean(),
+                    'Goles Fav (2H)': team_values(matches, '2HGoalsFor').mean(),
+                    'Goles Con (2H)': team_values(matches, '2HGoalsAgainst').mean(),
                 }
             
             return stats
@@ -1125,8 +1021,7 @@ with tab2:
         # H2H Matches (USING NEW ENGINE)
         st.subheader("Últimos Enfrentamientos Directos (Historial Completo)")
         
-        from src.engine.h2h import H2HManager
-        h2h_manager = H2HManager(data)
+        h2h_manager = data_version.h2h
         
         h2h_matches = h2h_manager.get_h2h_matches(team_home, team_away)
         
@@ -1157,9 +1052,7 @@ with tab2:
 with tab3:
     st.header("Análisis Arbitral")
     
-    from src.engine.referee import RefereeAnalyzer
-    
-    ref_analyzer = RefereeAnalyzer(data)
+    ref_analyzer = data_version.shared('referee_analyzer', lambda: RefereeAnalyzer(data_version.frame))
     ref_summary = ref_analyzer.get_summary()
     
     if not ref_summary.empty:
@@ -1197,6 +1090,15 @@ with tab3:
         selected_ref = st.selectbox("Detalle del Árbitro", referee_list)
         
         if selected_ref:
+            # Rolling profile (precomputed in the referee index)
+            prof_cols = st.columns(3)
+            for prof_col, (window, label) in zip(prof_cols, [('L10', 'Últimos 10'), ('L20', 'Últimos 20'), ('Season', 'Temporada')]):
+                profile = ref_analyzer.get_profile(selected_ref, window)
+                if profile:
+                    with prof_col:
+                        st.metric(f"Tarjetas/partido ({label})", f"{profile['AvgCards']:.2f}", f"{profile['Matches']} partidos", delta_color="off")
+                        st.caption(f"Faltas: {profile['AvgFouls']:.1f} · Sesgo local: {profile['HomeBias']:+.2f}")
+
             ref_matches = ref_analyzer.get_referee_matches(selected_ref)
             st.subheader(f"Partidos arbitrados por {selected_ref}")
             st.dataframe(ref_matches[['Date', 'Div', 'HomeTeam', 'AwayTeam', 'HY', 'AY', 'HR', 'AR', 'HF', 'AF', 'FTHG', 'FTAG']])
@@ -1210,10 +1112,7 @@ with tab4:
     if st.button("Ejecutar Backtest"):
         analyzer = PatternAnalyzer(data)
         
-        # IMPORT LATEST STRATEGIES (PRO VERSIONS)
-        # We use the centralized definitions to ensure consistency with the Predictor/Signals
-        from src.engine.strategies import PREMATCH_PATTERNS
-        
+        # LATEST STRATEGIES (PRO VERSIONS): centralized PREMATCH_PATTERNS, consistent with the Predictor/Signals
         # Mapping Pattern List to format scan_patterns expects
         # scan_patterns expects list of tuples: (name, cond_func, target_func, odds_col)
         # PREMATCH_PATTERNS in strategies.py is exactly this format.
@@ -1271,16 +1170,6 @@ with tab5:
     st.header("🔥 Tendencias y Rachas")
     st.info("Vista diaria de partidos con tendencias detalladas (L5/6, BTTS, Córners).")
     
-    # Reload logic to pick up engine changes
-    try:
-        import importlib
-        import src.engine.trends
-        importlib.reload(src.engine.trends)
-        from src.engine.trends import TrendsAnalyzer
-    except Exception as e:
-        st.error(f"Error reload streaks: {e}")
-        from src.engine.trends import TrendsAnalyzer
-
     # Date Filter & Search
     with st.container(border=True):
         col_date, col_search = st.columns([1, 2])
@@ -1290,18 +1179,13 @@ with tab5:
         with col_search:
             search_query_trends = st.text_input("Filtrar por Equipo o Competición", placeholder="Ej: Sporting CP, Premier League", key="search_trends")
             
-    # Disable TLS warnings if any
-    import urllib3
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    
     # Logic Block
     try:     
         if not data.empty:
             with st.spinner("Buscando partidos y analizando tendencias..."):
-                trends_analyzer = TrendsAnalyzer(data)
-                fix_fetcher = FixturesFetcher()
-                leagues = list(fix_fetcher.LEAGUE_URLS.keys())
-                upcoming_daily = fix_fetcher.fetch_upcoming(leagues)
+                trends_analyzer = data_version.shared('trends_analyzer', lambda: TrendsAnalyzer(data_version.frame))
+                leagues = list(FixturesFetcher.LEAGUE_URLS.keys())
+                upcoming_daily = fetch_upcoming_cached(leagues, datetime.datetime.now().strftime('%Y-%m-%d-%H'))
                 
                 # Filter by Date
                 upcoming_daily['DateObj'] = pd.to_datetime(upcoming_daily['Date']).dt.date
@@ -1319,21 +1203,30 @@ with tab5:
             if not day_fixtures.empty:
                 st.success(f"Partidos: {len(day_fixtures)}")
                 
+                # League order, one page at a time: only visible matches get trends, the next page is warmed
+                sort_keys = ['Div'] + (['Time'] if 'Time' in day_fixtures.columns else [])
+                day_fixtures = day_fixtures.sort_values(sort_keys, kind='stable')
+                page_fixtures, next_fixtures = paginate(day_fixtures, 'trends_page')
+                trends_version = data_version.token
+                for nxt in next_fixtures.itertuples(index=False):
+                    prefetch(('tendencias', trends_version, nxt.HomeTeam, nxt.AwayTeam), trends_analyzer.get_match_trends, nxt.HomeTeam, nxt.AwayTeam)
+                league_sizes = day_fixtures['Div'].value_counts()
+                
                 # Group by Div
-                grouped = day_fixtures.groupby('Div')
+                grouped = page_fixtures.groupby('Div', sort=False)
                 flags_map_trends = {'SP1': '🇪🇸', 'E0': '🇬🇧', 'D1': '🇩🇪', 'I1': '🇮🇹', 'F1': '🇫🇷', 'P1': '🇵🇹', 'N1': '🇳🇱'}
                 
                 for div, matches in grouped:
                     league_name = league_names.get(div, div)
                     flag = flags_map_trends.get(div, '⚽')
                     
-                    with st.expander(f"{flag} {league_name} ({len(matches)} partidos)", expanded=True):
+                    with st.expander(f"{flag} {league_name} ({league_sizes.get(div, len(matches))} partidos)", expanded=True):
                         for _, match in matches.iterrows():
                             h_team = match['HomeTeam']
                             a_team = match['AwayTeam']
                             
-                            # Calculate Trends
-                            trends_match = trends_analyzer.get_match_trends(h_team, a_team)
+                            # Calculate Trends (prefetched while the previous page was shown)
+                            trends_match = prefetched(('tendencias', trends_version, h_team, a_team), trends_analyzer.get_match_trends, h_team, a_team)
                             trends_h = trends_match['Home']
                             trends_a = trends_match['Away']
                             
@@ -1352,8 +1245,7 @@ with tab5:
                                     if trends_h:
                                         for t in trends_h:
                                             # Strict Pattern Match L{x}/{y}
-                                            import re
-                                            match = re.search(r"L(\d+)/(\d+)", t)
+                                            match = STRONG_TREND_RE.search(t)
                                             is_strong = False
                                             if match:
                                                 num, den = int(match.group(1)), int(match.group(2))
@@ -1372,8 +1264,7 @@ with tab5:
                                     trend_count = 0
                                     if trends_a:
                                         for t in trends_a:
-                                            import re
-                                            match = re.search(r"L(\d+)/(\d+)", t)
+                                            match = STRONG_TREND_RE.search(t)
                                             is_strong = False
                                             if match:
                                                 num, den = int(match.group(1)), int(match.group(2))
@@ -1397,20 +1288,12 @@ with tab5:
                                 
                                 # Fetch H2H Dynamically
                                 if not data.empty:
-                                    # Normalize names for lookup (redundant if data is norm, but safe)
-                                    h2h = data[((data['HomeTeam'] == h_team) & (data['AwayTeam'] == a_team)) | 
-                                               ((data['HomeTeam'] == a_team) & (data['AwayTeam'] == h_team))]
-                                    
-                                    # Sort by date descending
-                                    if 'Date' in h2h.columns:
-                                        h2h['DateObj'] = pd.to_datetime(h2h['Date'], dayfirst=True)
-                                        h2h = h2h.sort_values('DateObj', ascending=False).head(5)
-                                    else:
-                                        h2h = h2h.head(5)
+                                    # Shared pair index (newest first, Date already parsed)
+                                    h2h = data_version.h2h.get_h2h_matches(h_team, a_team).head(5)
 
                                     if not h2h.empty:
                                         for _, hmatch in h2h.iterrows():
-                                            d_str = hmatch['DateObj'].strftime('%d/%m/%y') if pd.notna(hmatch.get('DateObj')) else '?'
+                                            d_str = hmatch['Date'].strftime('%d/%m/%y') if pd.notna(hmatch.get('Date')) else '?'
                                             res = f"{hmatch['FTHG']}-{hmatch['FTAG']}"
                                             # Bold the winner
                                             res_fmt = f"**{res}**"
@@ -1428,7 +1311,6 @@ with tab5:
         
     except Exception as e:
         st.error(f"Error en Tendencias: {e}")
-        import traceback
         st.code(traceback.format_exc())
 
 # --- TAB 6: Team Statistics Search (The 'Buscador') ---
@@ -1437,13 +1319,8 @@ with tab6:
     st.markdown("Filtra y encuentra equipos que cumplan condiciones estadísticas específicas.")
     
     try:
-        import importlib
-        import src.engine.trends
-        importlib.reload(src.engine.trends)
-        from src.engine.trends import TrendSearcher
-        
         if not data.empty:
-            trend_engine = TrendSearcher(data)
+            trend_engine = data_version.shared('trend_searcher', lambda: TrendSearcher(data_version.frame))
             
             # --- SEARCH FILTERS UI ---
             with st.container(border=True):
@@ -1459,7 +1336,7 @@ with tab6:
                 st.markdown("---")
                 
                 # Filters
-                c1, c2, c3, c4 = st.columns(4)
+                c1, c2, c3, c4, c5 = st.columns(5)
                 
                 with c1:
                     # Dynamic Options based on Period
@@ -1485,7 +1362,8 @@ with tab6:
                             'Goles': 'Goles',
                             'Goles Recibidos': 'Goles Recibidos',
                             'Más de 0.5 goles': 'Over05',
-                            'Más de 1.5 goles': 'Over15' # > 1.5 in a half is rare but possible
+                            'Más de 1.5 goles': 'Over15', # > 1.5 in a half is rare but possible
+                            'Ambos equipos marcan': 'BTTS'
                         }
                         
                     selected_stat_label = st.selectbox("Estadística", list(stat_options.keys()), key="stat_sel")
@@ -1499,7 +1377,11 @@ with tab6:
                     threshold = st.number_input("Valor (Umbral)", min_value=0.0, value=1.5, step=0.5, key="stat_th")
                     
                 with c4:
-                    window_size = st.selectbox("Últimos Partidos", [2, 3, 5, 10], index=1, key="stat_win")
+                    window_size = st.selectbox("Últimos Partidos", [2, 3, 5, 10, 20], index=1, key="stat_win")
+                    
+                with c5:
+                    venue_label = st.selectbox("Campo", ["Todos", "Local", "Visitante"], key="stat_venue")
+                    venue = {"Todos": "All", "Local": "Home", "Visitante": "Away"}[venue_label]
                     
                 # Search Button
                 if st.button("Buscar Equipos", type="primary", use_container_width=True, key="stat_btn"):
@@ -1508,18 +1390,31 @@ with tab6:
                     if period_stats == "1ª Parte": period_code = "1H"
                     elif period_stats == "2ª Parte": period_code = "2H"
                     
-                    results_df = trend_engine.search_teams(selected_stat, operator, threshold, window_size, period=period_code)
-                    
-                    # Perform Search
-                    results = trend_engine.search_teams(
+                    # Keep results across reruns so the pager does not reset them
+                    st.session_state['stat_results'] = trend_engine.search_teams(
                         stat_type=selected_stat, 
                         operator=operator, 
                         value=threshold, 
-                        last_n_matches=window_size
+                        last_n_matches=window_size,
+                        period=period_code,
+                        venue=venue
                     )
+                    st.session_state['stat_page'] = 1
+                    
+                results = st.session_state.get('stat_results')
+                if results is not None:
+                    # Results come sorted by value; show one page at a time
+                    PAGE_SIZE = 24
+                    n_pages = max(1, -(-len(results) // PAGE_SIZE))
+                    if n_pages > 1:
+                        page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key="stat_page")
+                    else:
+                        page = 1
+                    total_found = len(results)
+                    results = results.iloc[(page - 1) * PAGE_SIZE: page * PAGE_SIZE].reset_index(drop=True)
                     
                     if not results.empty:
-                        st.success(f"Encontrados **{len(results)} equipos**.")
+                        st.success(f"Encontrados **{total_found} equipos**.")
                         
                         try:
                             for div, group in results.groupby('Div'):
@@ -1590,7 +1485,6 @@ with tab7:
             st.info(f"Modo Seleccionado: {time_option}")
 
     # 2. Date Logic
-    import datetime
     today = datetime.date.today()
     start_date = today
     end_date = today
@@ -1611,80 +1505,56 @@ with tab7:
     # 3. Fetch Data (Broad Search)
     if st.button("🔄 Escanear Estrategias", type="primary", use_container_width=True):
         with st.spinner("Escaneando calendario y aplicando patrones..."):
-            # Load Backend Data First (User Request for periodic updates)
-            import json
-            import os # Added import for os
-            backend_data = None
-            CACHE_FILE = "data_cache/dashboard_data.json"
+            # Precomputed slate first (tools/update_dashboard_data.py); live scan only for leagues it lacks
+            snapshot = load_snapshot_cached(SlateSnapshot.mtime(), tuple(active_leagues), start_date, end_date)
+            live_leagues = list(active_leagues)
+            pool_parts = []
+            if snapshot is not None:
+                st.info(f"⚡ Usando datos pre-calculados del Backend (Actualizado: {snapshot.last_updated:%d/%m %H:%M})")
+                pool_parts.append(snapshot.for_leagues(active_leagues))
+                live_leagues = snapshot.missing_leagues(active_leagues)
             
-            if False: # FORCE DISABLE CACHE (Use Live Logic)
-                try:
-                    with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                        backend_data = json.load(f)
-                except: pass
-            
-            used_backend = False
-            matches_pool = pd.DataFrame() # Initialize
-
-            if backend_data:
-                last_u = backend_data['metadata']['last_updated']
-                st.info(f"⚡ Usando datos pre-calculados del Backend (Actualizado: {last_u})")
-                
-                # Convert to DataFrame for filtering
-                raw_matches = backend_data['matches']
-                if raw_matches:
-                    df_backend = pd.DataFrame(raw_matches)
-                     # Filter by Date Range
-                    try:
-                        df_backend['DateObj'] = pd.to_datetime(df_backend['Date'], dayfirst=True).dt.date
-                        mask = (df_backend['DateObj'] >= start_date) & (df_backend['DateObj'] <= end_date)
-                        matches_pool = df_backend[mask]
-                        used_backend = True
-                    except Exception as e:
-                        st.error(f"Error filtrando datos backend: {e}")
-            
-            # Fallback to Live Calculation if Backend failed or empty
-            if not used_backend:
-                st.warning("⚠️ Datos backend no disponibles. Escaneando en vivo (puede ser más lento)...")
-                # Fetch ALL leagues or User selection? Default to All for strategies to be useful
+            # Fallback to Live Calculation for what the backend doesn't cover
+            if live_leagues:
+                st.warning(f"⚠️ Datos backend no disponibles para {', '.join(live_leagues)}. Escaneando en vivo (puede ser más lento)...")
                 # We reuse the cached fetcher
                 now_str_hour = datetime.datetime.now().strftime('%Y-%m-%d-%H')
-                upcoming_strat = fetch_upcoming_cached(sidebar_leagues if 'sidebar_leagues' in locals() else leagues, now_str_hour)
-                
-                if not upcoming_strat.empty:
-                    # Filter by Date Range
-                    try:
-                        upcoming_strat['DateObj'] = pd.to_datetime(upcoming_strat['Date'], dayfirst=True).dt.date
-                        mask = (upcoming_strat['DateObj'] >= start_date) & (upcoming_strat['DateObj'] <= end_date)
-                        matches_pool = upcoming_strat[mask]
-                    except Exception as e:
-                        st.error(f"Error filtrando fechas: {e}")
-                        matches_pool = pd.DataFrame()
+                pool_parts.append(fetch_upcoming_cached(live_leagues, now_str_hour))
+            
+            matches_pool = pd.DataFrame() # Initialize
+            pool_parts = [p for p in pool_parts if not p.empty]
+            if pool_parts:
+                upcoming_strat = pd.concat(pool_parts, ignore_index=True)
+                # Filter by Date Range
+                try:
+                    upcoming_strat['DateObj'] = pd.to_datetime(upcoming_strat['Date'], dayfirst=True).dt.date
+                    mask = (upcoming_strat['DateObj'] >= start_date) & (upcoming_strat['DateObj'] <= end_date)
+                    matches_pool = upcoming_strat[mask]
+                except Exception as e:
+                    st.error(f"Error filtrando fechas: {e}")
+                    matches_pool = pd.DataFrame()
                 
             
             if not matches_pool.empty:
                 st.success(f"Analizando {len(matches_pool)} partidos programados...")
                 
                 # 4. Pattern Matching Engine
-                from src.engine.strategies import PREMATCH_PATTERNS
-                
                 # Dictionary to store matches per pattern
                 strategy_results = {name: [] for name, _, _, _ in PREMATCH_PATTERNS}
                 pattern_docs = {name: func.__doc__ for name, func, _, _ in PREMATCH_PATTERNS}
                 
-                # Predictor needed for Avg Stats lookups if NOT using backend (or specifically for normalization?)
-                # If using backend, 'Stats' are already in the row.
-                if not used_backend:
-                    if 'predictor' not in locals():
-                         predictor = get_predictor(data) # Assumes 'data' is global from top of script
-
-                    debug_mismatches = []
+                # Snapshot rows are already enriched; the predictor is only needed for live rows
+                from_snapshot = matches_pool['FromSnapshot'].eq(True) if 'FromSnapshot' in matches_pool.columns else pd.Series(False, index=matches_pool.index)
+                debug_mismatches = []
+                found_any = False
+                if not from_snapshot.all():
+                    predictor = data_version.predictor
                     # Cache history teams for fast lookup
                     history_teams = set(predictor.history['HomeTeam'].unique()) | set(predictor.history['AwayTeam'].unique())
 
                 for idx, match_row in matches_pool.iterrows():
                     # If Backend: data is already enriched
-                    if used_backend:
+                    if from_snapshot[idx]:
                         # Direct check of 'active_strategies' list
                         active = match_row.get('active_strategies', [])
                         for strat_name in active:
@@ -1702,9 +1572,6 @@ with tab7:
 
                     # ELSE: LIVE CALCULATION
                     try:
-                        # Optimization: Predictor uses memory lookup, fast enough for <100 matches.
-                        ref_name = match_row.get('Referee', None)
-                        
                         # DEBUG: Verify teams exist in history
                         h_norm = predictor.normalize_name(match_row['HomeTeam'])
                         a_norm = predictor.normalize_name(match_row['AwayTeam'])
@@ -1713,16 +1580,8 @@ with tab7:
                         if not is_known:
                             debug_mismatches.append(f"{match_row['HomeTeam']} ({h_norm}) vs {match_row['AwayTeam']} ({a_norm})")
                         
-                        # Extract Odds from match_row (Important for injected matches)
-                        current_odds = {k: v for k, v in match_row.items() if str(k).startswith('B365')}
-                        
-                        analysis_row = predictor.predict_match_safe(
-                            match_row['HomeTeam'], 
-                            match_row['AwayTeam'], 
-                            referee=ref_name,
-                            match_date=match_row.get('Date'),
-                            known_odds=current_odds
-                        )
+                        # Same memoized row as the Cartelera (odds from match_row, important for injected matches)
+                        analysis_row = live_prediction(data_version, match_row)
                         
                         # Check each pattern
                         for name_pat, cond_func, _, _ in PREMATCH_PATTERNS:
@@ -1741,78 +1600,78 @@ with tab7:
                         # print(f"Error {e}")
                         pass
 
-                    for pat_name, matches_found in strategy_results.items():
-                        count = len(matches_found)
-                        
-                        # Header with Count
-                        header_icon = "✅" if count > 0 else "⚪"
+                for pat_name, matches_found in strategy_results.items():
+                    count = len(matches_found)
+                    
+                    # Header with Count
+                    header_icon = "✅" if count > 0 else "⚪"
+                    
+                    with st.expander(f"{header_icon} {pat_name} ({count} partidos)", expanded=(count > 0)):
+                        # Docstring / Explanation
+                        doc = pattern_docs.get(pat_name, "Sin definición.")
+                        st.info(f"📋 **Definición**: {doc}")
                         
-                        with st.expander(f"{header_icon} {pat_name} ({count} partidos)", expanded=(count > 0)):
-                            # Docstring / Explanation
-                            doc = pattern_docs.get(pat_name, "Sin definición.")
-                            st.info(f"📋 **Definición**: {doc}")
-                            
-                            if count > 0:
-                                found_any = True
-                                # Display Matches nicely
-                                cols = st.columns(3)
-                                for i, m in enumerate(matches_found):
-                                    with cols[i % 3]:
-                                        with st.container(border=True):
-                                            st.markdown(f"**{m['Home']}** vs **{m['Away']}**")
-                                            st.caption(f"📅 {m['Date']} 🕒 {m['Time']} | {m['Div']}")
-                                            
-                                            # Custom Betting Card UI
-                                            # Stats Row
-                                            stats_cols = st.columns(2)
-                                            with stats_cols[0]:
-                                                if "Goles" in pat_name or ">2.5" in pat_name or "1.5" in pat_name:
-                                                     g_proj = m['Stats'].get('HomeAvgGoalsFor',0) + m['Stats'].get('AwayAvgGoalsFor',0)
-                                                     st.metric("⚽ Proy.", f"{g_proj:.2f}")
-                                                else:
-                                                     st.metric("🏠 Local PPG", f"{m['Stats'].get('HomePPG',0):.2f}")
-                                            
-                                            with stats_cols[1]:
-                                                if "Goles" in pat_name:
-                                                     st.metric("🛡️ Def. Avg", f"{(m['Stats'].get('HomeAvgGoalsAgainst',0)+m['Stats'].get('AwayAvgGoalsAgainst',0))/2:.2f}")
-                                                else:
-                                                     st.metric("✈️ Visita PPG", f"{m['Stats'].get('AwayPPG',0):.2f}")
+                        if count > 0:
+                            found_any = True
+                            # Display Matches nicely
+                            cols = st.columns(3)
+                            for i, m in enumerate(matches_found):
+                                with cols[i % 3]:
+                                    with st.container(border=True):
+                                        st.markdown(f"**{m['Home']}** vs **{m['Away']}**")
+                                        st.caption(f"📅 {m['Date']} 🕒 {m['Time']} | {m['Div']}")
+                                        
+                                        # Custom Betting Card UI
+                                        # Stats Row
+                                        stats_cols = st.columns(2)
+                                        with stats_cols[0]:
+                                            if "Goles" in pat_name or ">2.5" in pat_name or "1.5" in pat_name:
+                                                 g_proj = m['Stats'].get('HomeAvgGoalsFor',0) + m['Stats'].get('AwayAvgGoalsFor',0)
+                                                 st.metric("⚽ Proy.", f"{g_proj:.2f}")
+                                            else:
+                                                 st.metric("🏠 Local PPG", f"{m['Stats'].get('HomePPG',0):.2f}")
+                                        
+                                        with stats_cols[1]:
+                                            if "Goles" in pat_name:
+                                                 st.metric("🛡️ Def. Avg", f"{(m['Stats'].get('HomeAvgGoalsAgainst',0)+m['Stats'].get('AwayAvgGoalsAgainst',0))/2:.2f}")
+                                            else:
+                                                 st.metric("✈️ Visita PPG", f"{m['Stats'].get('AwayPPG',0):.2f}")
 
-                                            st.markdown("---")
-                                            
-                                            # ODDS ROW (The requested fix)
-                                            odds = m['Stats']
-                                            
-                                            # Helper to format
-                                            def fmt_odd(val):
-                                                return f"{val:.2f}" if (val and val > 1) else "-"
-
-                                            # 1X2
-                                            o_cols = st.columns(3)
-                                            with o_cols[0]: st.markdown(f"**1:** `{fmt_odd(odds.get('B365H'))}`")
-                                            with o_cols[1]: st.markdown(f"**X:** `{fmt_odd(odds.get('B365D'))}`")
-                                            with o_cols[2]: st.markdown(f"**2:** `{fmt_odd(odds.get('B365A'))}`")
-                                            
-                                            # Extra Markets
-                                            e_cols = st.columns(2)
-                                            with e_cols[0]: st.caption(f"**>2.5**: `{fmt_odd(odds.get('B365>2.5'))}`")
-                                            with e_cols[1]: st.caption(f"**BTTS**: `{fmt_odd(odds.get('B365_BTTS_Yes'))}`")
-                                            
-                                            # Action Button
-                                            # Fix Duplicate Key Error by making key highly specific
-                                            btn_key = f"btn_add_{pat_name}_{m['Home']}_{m['Away']}_{m['Date']}_{i}"
-                                            if st.button("➕ Añadir", key=btn_key):
-                                                on_strategy_click(m['Stats'], {'name': pat_name})
-                                            
-                    if not found_any:
-                        st.warning("No se encontraron coincidencias para ninguna estrategia en este rango de fechas.")
+                                        st.markdown("---")
+                                        
+                                        # ODDS ROW (The requested fix)
+                                        odds = m['Stats']
+                                        
+                                        # Helper to format
+                                        def fmt_odd(val):
+                                            return f"{val:.2f}" if (val and val > 1) else "-"
+
+                                        # 1X2
+                                        o_cols = st.columns(3)
+                                        with o_cols[0]: st.markdown(f"**1:** `{fmt_odd(odds.get('B365H'))}`")
+                                        with o_cols[1]: st.markdown(f"**X:** `{fmt_odd(odds.get('B365D'))}`")
+                                        with o_cols[2]: st.markdown(f"**2:** `{fmt_odd(odds.get('B365A'))}`")
+                                        
+                                        # Extra Markets
+                                        e_cols = st.columns(2)
+                                        with e_cols[0]: st.caption(f"**>2.5**: `{fmt_odd(odds.get('B365>2.5'))}`")
+                                        with e_cols[1]: st.caption(f"**BTTS**: `{fmt_odd(odds.get('B365_BTTS_Yes'))}`")
+                                        
+                                        # Action Button
+                                        # Fix Duplicate Key Error by making key highly specific
+                                        btn_key = f"btn_add_{pat_name}_{m['Home']}_{m['Away']}_{m['Date']}_{i}"
+                                        if st.button("➕ Añadir", key=btn_key):
+                                            on_strategy_click(m['Stats'], {'name': pat_name})
+                                        
+                if not found_any:
+                    st.warning("No se encontraron coincidencias para ninguna estrategia en este rango de fechas.")
+                
+                if debug_mismatches:
+                    with st.expander(f"⚠️ Debug: {len(debug_mismatches)} Partidos con Datos Faltantes (Nombres)", expanded=False):
+                        st.write("Estos equipos no se encontraron en la base de datos histórica con su nombre actual.")
+                        st.dataframe(pd.DataFrame(debug_mismatches, columns=["Partido (Nombre -> Normalizado)"]), hide_index=True)
                     
-                    if debug_mismatches:
-                        with st.expander(f"⚠️ Debug: {len(debug_mismatches)} Partidos con Datos Faltantes (Nombres)", expanded=False):
-                            st.write("Estos equipos no se encontraron en la base de datos histórica con su nombre actual.")
-                            st.dataframe(pd.DataFrame(debug_mismatches, columns=["Partido (Nombre -> Normalizado)"]), hide_index=True)
-                        
-                else:
-                    st.warning("No hay partidos en el rango de fechas seleccionado.")
+            elif pool_parts:
+                st.warning("No hay partidos en el rango de fechas seleccionado.")
             else:
                 st.error("No se pudieron cargar partidos próximos (Error de Red o Sin Datos).")
@@ -0,0 +1,42 @@
+import os
+import sys
+import importlib
+
+# Opt-in: DASHBOARD_DEV_RELOAD=1 streamlit run src/dashboard/app.py
+ENABLED = os.environ.get("DASHBOARD_DEV_RELOAD", "").lower() in ("1", "true", "yes")
+PREFIX = "src."
+
+_mtimes = {}
+
+def reload_changed(prefix=PREFIX):
+    """
+    Dev-mode hot reload: reloads the already imported `src.*` modules whose source
+    file changed since the previous call, dependencies first (import order).
+    A no-op unless DASHBOARD_DEV_RELOAD is set, so production reruns never re-import.
+    Returns the names of the reloaded modules.
+    """
+    if not ENABLED:
+        return []
+
+    changed = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if not name.startswith(prefix) or not path:
+            continue
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        seen = _mtimes.setdefault(name, mtime)
+        if mtime != seen:
+            changed.append(name)
+            _mtimes[name] = mtime
+
+    # sys.modules lists a module before the ones it imports; reload the leaves first
+    for name in reversed(changed):
+        try:
+            importlib.reload(sys.modules[name])
+            print(f"🔁 Reloaded {name}")
+        except Exception as e:
+            print(f"⚠️ Could not reload {name}: {e}")
+    return changed
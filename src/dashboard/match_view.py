@@ -1,9 +1,13 @@
 
+import re
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from src.engine.trends import TrendsAnalyzer
+from src.engine.standings import StandingsEngine
+from src.engine.feature_service import FeatureService
+from src.engine.h2h import H2HManager
 
 def render_match_details(match_info, predictor):
     """
@@ -131,7 +135,6 @@ def render_match_details(match_info, predictor):
                     odd_found = None
                     
                     # Over/Under X.X Patterns (+1.5, >1.5, Over 1.5)
-                    import re
                     match_over = re.search(r'(\+|>|Over|Más de|Mas de) ?([0-9]\.5)', text, re.IGNORECASE)
                     if match_over:
                         line = match_over.group(2) # "1.5"
@@ -181,37 +184,22 @@ def render_match_details(match_info, predictor):
             # return # Don't return, just skip this block properly
         else:
             # Helper to calculate averages
+            # Point-in-time features: only matches played BEFORE this one
+            feature_service = FeatureService.get(predictor.history)
+            
             def get_avg_stats(team, n_games):
-                matches = predictor.history[
-                    (predictor.history['HomeTeam'] == team) | 
-                    (predictor.history['AwayTeam'] == team)
-                ].sort_values('Date', ascending=False)
-                
-                # If we have a current match date, filter to only show matches BEFORE this one
-                if 'Date' in match_info:
-                        matches = matches[matches['Date'] < match_info.get('Date')]
-                
-                matches = matches.head(n_games)
-                
-                if matches.empty:
+                feats = feature_service.features(team, as_of=match_info.get('Date'), n=n_games)
+                if not feats:
                     return None
                     
-                stats = {'Goles': 0, 'Tiros': 0, 'Córners': 0, 'Tarjetas': 0}
-                count = len(matches)
-                
-                for _, m in matches.iterrows():
-                    if m['HomeTeam'] == team:
-                        stats['Goles'] += m['FTHG']
-                        stats['Tiros'] += m.get('HST', 0) + m.get('HS', 0) 
-                        stats['Córners'] += m.get('HC', 0)
-                        stats['Tarjetas'] += m.get('HY', 0) + m.get('HR', 0)
-                    else:
-                        stats['Goles'] += m['FTAG']
-                        stats['Tiros'] += m.get('AST', 0) + m.get('AS', 0)
-                        stats['Córners'] += m.get('AC', 0)
-                        stats['Tarjetas'] += m.get('AY', 0) + m.get('AR', 0)
-                
-                return {k: round(v / count, 2) for k, v in stats.items()}
+                stats = {
+                    'Goles': feats['AvgGoalsFor'],
+                    'Tiros': feats['AvgShotsTargetFor'] + feats['AvgShotsFor'],
+                    'Córners': feats['AvgCornersFor'],
+                    'Tarjetas': feats['AvgCardsFor']
+                }
+                # NaN: the source has no data for that stat
+                return {k: round(v, 2) if pd.notna(v) else None for k, v in stats.items()}
 
             home_stats = get_avg_stats(home_team, window)
             away_stats = get_avg_stats(away_team, window)
@@ -240,9 +228,8 @@ def render_match_details(match_info, predictor):
     with st.container(border=True):
         st.subheader("⚔️ Historial H2H")
         
-        from src.engine.h2h import H2HManager
         # Predictor history (if available) contains the data
-        h2h_engine = H2HManager(predictor.history if not predictor.history.empty else pd.DataFrame())
+        h2h_engine = H2HManager.get(predictor.history)
         
         h2h_matches = h2h_engine.get_h2h_matches(home_team, away_team)
         
@@ -272,58 +259,23 @@ def render_match_details(match_info, predictor):
         league_code = match_info.get('Div')
         
         if league_code:
-            league_matches = predictor.history[predictor.history['Div'] == league_code]
+            # Shared standings engine (running totals, built once per data version)
+            standings = StandingsEngine.get(predictor.history)
+            season = standings.latest_season(league_code)
+            table = standings.table(league_code, season)
             
-            if not league_matches.empty:
-                # Filter for Current Season Logic
-                if 'Season' in league_matches.columns:
-                    max_season = league_matches['Season'].max()
-                    st.caption(f"Mostrando clasificación: Temporada {max_season}")
-                    league_matches = league_matches[league_matches['Season'] == max_season]
+            if not table.empty:
+                if season == StandingsEngine.NO_SEASON:
+                    st.warning("Columna 'Season' no encontrada. Mostrando todo el historial cargado.")
                 else:
-                        # Fallback: Last 365 Days
-                        st.warning("Columna 'Season' no encontrada. Filtrando por últimos 12 meses.")
-                        if 'Date' in league_matches.columns:
-                            cutoff = pd.Timestamp.now() - pd.Timedelta(days=365)
-                            league_matches['DateObj'] = pd.to_datetime(league_matches['Date'])
-                            league_matches = league_matches[league_matches['DateObj'] > cutoff]
-            
-                points = {}
-                goals_diff = {}
-                played = {}
+                    st.caption(f"Mostrando clasificación: Temporada {season}")
                 
-                for _, m in league_matches.iterrows():
-                    h, a, res, hg, ag = m['HomeTeam'], m['AwayTeam'], m['FTR'], m['FTHG'], m['FTAG']
-                    
-                    for t in [h, a]:
-                        if t not in points: points[t] = 0
-                        if t not in goals_diff: goals_diff[t] = 0
-                        if t not in played: played[t] = 0
-                        played[t] += 1
-                    
-                    goals_diff[h] += (hg - ag)
-                    goals_diff[a] += (ag - hg)
-                    
-                    if res == 'H':
-                        points[h] += 3
-                    elif res == 'A':
-                        points[a] += 3
-                    else:
-                        points[h] += 1
-                        points[a] += 1
-                
-                # Create DF
-                standings_data = []
-                for team in points:
-                    standings_data.append({
-                        'Equipo': team,
-                        'PJ': played[team],
-                        'Pts': points[team],
-                        'DG': goals_diff[team]
-                    })
-                
-                df_standings = pd.DataFrame(standings_data).sort_values(['Pts', 'DG'], ascending=False).reset_index(drop=True)
-                df_standings.index += 1 # Rank 1-based
+                df_standings = table.rename(columns={
+                    'Team': 'Equipo', 'Played': 'PJ', 'Won': 'G', 'Drawn': 'E', 'Lost': 'P',
+                    'GoalsFor': 'GF', 'GoalsAgainst': 'GC', 'GoalDiff': 'DG', 'Points': 'Pts',
+                    'HomePoints': 'Pts Local', 'AwayPoints': 'Pts Visitante', 'Form': 'Forma'
+                }).set_index('Position')[['Equipo', 'PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts', 'Pts Local', 'Pts Visitante', 'Forma']]
+                df_standings.index.name = None # Rank 1-based
                 
                 # Highlight current teams
                 def highlight_teams(s):
@@ -332,7 +284,7 @@ def render_match_details(match_info, predictor):
 
                 st.dataframe(df_standings.style.apply(highlight_teams, axis=1), use_container_width=True)
             else:
-                st.warning(f"No hay datos suficientes de la liga '{league_code}' (Matches Found: {len(league_matches)}) para calcular la clasificación.")
+                st.warning(f"No hay datos suficientes de la liga '{league_code}' para calcular la clasificación.")
         else:
             st.info("Información de liga (Div) no disponible en los metadatos del partido.")
 
@@ -346,8 +298,6 @@ def render_match_details(match_info, predictor):
         
         t_col1, t_col2 = st.columns(2)
         
-        import re
-        
         def render_trend_item(t):
             # Parse "L{x}/{y}"
             match = re.search(r"L(\d+)/(\d+)", t)
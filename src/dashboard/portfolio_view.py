@@ -1,6 +1,7 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import plotly.express as px
 
@@ -11,8 +12,9 @@ def render_portfolio_view(user_manager, username):
     st.title("Mi Portafolio de Apuestas")
     
     pm = user_manager.portfolio_manager
-    stats = pm.get_portfolio_stats(username)
-    bets = pm.get_user_bets(username)
+    # Cached per ledger version: reruns don't recompute until a bet changes
+    report = pm.analytics(username)
+    stats = report.summary
     
     # 1. TOP STATS ROW
     k1, k2, k3, k4, k5, k6 = st.columns(6)
@@ -23,84 +25,45 @@ def render_portfolio_view(user_manager, username):
     k5.metric("Retorno", f"{stats['total_returned']:.2f}€")
     k6.metric("Apuestas", f"{stats['settled_bets']} / {stats['total_bets']}")
     
+    k7, k8, k9, k10 = st.columns(4)
+    k7.metric("Yield", f"{stats['yield']}%")
+    k8.metric("Acierto (sin nulas)", f"{stats['hit_rate']}%")
+    k9.metric("Bankroll", f"{stats['bankroll']:.2f}€")
+    k10.metric("Máx. Drawdown", f"{stats['max_drawdown']:.2f}€", delta=f"-{stats['max_drawdown_pct']}%", delta_color="off")
+    
     st.divider()
 
-    # 2. LEAGUE BREAKDOWN
-    with st.expander("📊 Estadísticas por Liga", expanded=False):
-        if not bets:
+    # 2. BANKROLL CURVE & BREAKDOWNS
+    if not report.curve.empty:
+        with st.expander("📈 Evolución del Bankroll", expanded=False):
+            curve = report.curve.reset_index().rename(columns={'index': 'Apuesta', 'bankroll': 'Bankroll', 'peak': 'Máximo'})
+            fig = px.line(curve, x='Apuesta', y=['Bankroll', 'Máximo'], hover_data=['home_team', 'away_team', 'match_dt'])
+            fig.update_layout(height=300, margin=dict(l=0, r=0, t=10, b=0), legend_title_text="")
+            st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📊 Estadísticas por Liga, Estrategia y Cuota", expanded=False):
+        if report.bets.empty:
              st.info("No hay datos suficientes.")
         else:
-             df_all = pd.DataFrame(bets)
-             if 'league' not in df_all.columns:
-                 df_all['league'] = 'Unknown'
-             
-             # Fill NaN
-             df_all['league'] = df_all['league'].fillna('Unknown')
-             
-             # Group Logic
-             league_stats = []
-             grouped = df_all.groupby('league')
-             
-             for league, group in grouped:
-                 n_bets = len(group)
-                 n_real = len(group[group['stake'] > 0])
-                 n_preds = n_bets - n_real
-                 
-                 # Effectiveness (Settled only)
-                 settled_g = group[group['status'].isin(['Won', 'Lost', 'Void'])]
-                 n_settled = len(settled_g)
-                 
-                 win_rate = 0.0
-                 roi = 0.0
-                 
-                 if n_settled > 0:
-                     n_won = len(settled_g[settled_g['status'] == 'Won'])
-                     win_rate = (n_won / n_settled) * 100
-                     
-                     # ROI (Real only)
-                     real_settled = settled_g[settled_g['stake'] > 0]
-                     if not real_settled.empty:
-                         staked = real_settled['stake'].sum()
-                         profit = real_settled['result_amount'].sum() if 'result_amount' in real_settled.columns else 0
-                         # Fallback calc if result_amount missing (old bets)
-                         if 'result_amount' not in real_settled.columns:
-                             # simplistic fallback
-                             profit = 0 
-                             for _, r in real_settled.iterrows():
-                                 if r['status'] == 'Won': profit += (r['stake']*r['odds'] - r['stake'])
-                                 elif r['status'] == 'Lost': profit -= r['stake']
-                         
-                         roi = (profit / staked) * 100 if staked > 0 else 0
-                 
-                 league_stats.append({
-                     "Liga": league,
-                     "Apuestas (Real)": n_real,
-                     "Predicciones": n_preds,
-                     "Win Rate %": round(win_rate, 1),
-                     "ROI %": round(roi, 1),
-                     "Volumen": n_bets
-                 })
-             
-             if league_stats:
-                 st.dataframe(
-                     pd.DataFrame(league_stats).set_index("Liga"),
-                     use_container_width=True
-                 )
+             t_league, t_strategy, t_odds = st.tabs(["Liga", "Estrategia", "Cuota"])
+             for tab, table, label in ((t_league, report.by_league, "Liga"),
+                                       (t_strategy, report.by_strategy, "Estrategia"),
+                                       (t_odds, report.by_odds, "Cuota")):
+                 with tab:
+                     st.dataframe(table.rename_axis(label), use_container_width=True)
     
     st.divider()
     
-    # 2. TABS: Open vs History
+    # 3. TABS: Open vs History
     tab_open, tab_history = st.tabs(["🔓 Pendientes", "📜 Historial"])
     
-    df = pd.DataFrame(bets)
+    df = report.bets
     if df.empty:
         st.info("No tienes predicciones guardadas aún.")
         return
 
-    # Ensure date sorting
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date', ascending=False)
+    # Newest first (sort_values returns a new frame; the cached report stays untouched)
+    df = df.sort_values('placed_at', ascending=False)
 
     with tab_open:
         open_bets = df[df['status'] == 'Pending']
@@ -128,12 +91,8 @@ def render_portfolio_view(user_manager, username):
                             st.caption("Virtual Bet")
 
                     with c_actions:
-                        # Check Eligibility
-                        try:
-                            match_dt = pd.to_datetime(str(row['match_date']))
-                            is_future = match_dt > datetime.now()
-                        except:
-                            is_future = True
+                        # Check Eligibility (unknown date counts as future)
+                        is_future = not (row['match_dt'] <= datetime.now())
 
                         if is_future:
                             # Use icon buttons side-by-side
@@ -164,7 +123,8 @@ def render_portfolio_view(user_manager, username):
         settled = df[df['status'].isin(['Won', 'Lost', 'Void'])]
         if not settled.empty:
             # Add Type Column for Display
-            settled['type'] = settled['stake'].apply(lambda x: "💰 Apuesta" if x > 0 else "👁️ Predicción")
+            settled = settled.assign(type=np.where(settled['stake'] > 0, "💰 Apuesta", "👁️ Predicción"),
+                                     date=settled['placed_at'])
             st.dataframe(
                 settled[['date', 'type', 'home_team', 'away_team', 'selection', 'odds', 'stake', 'status', 'result_amount']],
                 use_container_width=True,
@@ -234,7 +194,8 @@ def dialog_add_prediction(user_manager, username, match_data, strategy_data):
             stake=stake,
             odds=odds,
             strategy=strategy_data.get('pattern', 'Manual'),
-            status="Pending"
+            status="Pending",
+            market=strategy_data.get('market')
         )
         st.success("Guardado!")
         st.session_state['trigger_confetti'] = True # Fun feedback
@@ -0,0 +1,232 @@
+import re
+
+import pandas as pd
+import numpy as np
+from src.engine.team_matches import TeamMatchTable
+from src.utils.logo_manager import LogoManager
+from src.utils.cache import VersionedLRU
+
+DEFAULT_LOGO = "https://cdn-icons-png.flaticon.com/512/53/53283.png"
+FORM_LENGTH = 5
+MAX_PILLS = 4
+
+logo_manager = LogoManager()
+
+
+# --- HTML HELPERS ---
+
+def form_html(results):
+    """Coloured dots for a list of results ('W'/'D'/'L'), newest first."""
+    html = ""
+    for char in results[:FORM_LENGTH]:
+        color = "#ccc"
+        if char == 'W': color = "#28a745"
+        elif char == 'L': color = "#dc3545"
+        html += f'<span style="display:inline-block;width:10px;height:10px;border-radius:50%;background-color:{color};margin-right:2px;"></span>'
+    return html
+
+def trend_pill(text, sentiment='good'):
+    # Colors: Green (Good/High), Orange (Low/Bad), Purple (Strategy)
+    if sentiment == 'strategy':
+        bg_col = "#faf5ff" # Purple-50
+        txt_col = "#6b21a8" # Purple-800
+        border = "#d8b4fe" # Purple-300
+    else:
+        bg_col = "#dcfce7" if sentiment == 'good' else "#ffedd5"
+        txt_col = "#166534" if sentiment == 'good' else "#9a3412"
+        border = "#86efac" if sentiment == 'good' else "#fdba74"
+
+    # Override for negative semantics (only if not strategy)
+    if sentiment != 'strategy':
+        if "Under" in text or "recibe" in text.lower() or "-2.5" in text or "-3.5" in text:
+            bg_col = "#ffedd5"
+            txt_col = "#9a3412"
+            border = "#fdba74"
+
+    return f'<span style="background-color:{bg_col};color:{txt_col};border:1px solid {border};padding:1px 6px;border-radius:4px;font-size:0.75em;margin-right:4px;margin-bottom:2px;display:inline-block;">{text}</span>'
+
+_OVER_RE = re.compile(r'(\+|>|Over|Más de|Mas de) ?([0-9]\.5)', re.IGNORECASE)
+
+def text_with_odd(text, match):
+    """Appends the odd of the market named in the text (Over X.5 / BTTS), if the match has it."""
+    odd_found = None
+    match_over = _OVER_RE.search(text)
+    if match_over:
+        line = match_over.group(2) # "1.5"
+        # Try both formats
+        val = match.get(f"B365_Over{line}") or match.get(f"B365>{line}")
+        if val and str(val).lower() != 'nan':
+            odd_found = val
+
+    lower_txt = text.lower()
+    if 'ambos' in lower_txt or 'btts' in lower_txt:
+        val = match.get('B365_BTTS_Yes')
+        if val and str(val) != 'nan':
+            odd_found = val
+
+    return f"{text} @ {odd_found}" if odd_found else text
+
+def strategy_label(strat):
+    """Name (84%) [💰odd] [EV+x%] of a strategy/value bet."""
+    txt = f"★ {strat.get('suggestion', 'Estrategia')} ({strat.get('prob', 0)}%)"
+    s_odd = strat.get('odd')
+    if s_odd and s_odd != 'N/A':
+        txt += f" 💰{s_odd}"
+    if strat.get('ev') is not None and pd.notna(strat.get('ev')):
+        txt += f" EV+{strat['ev']:.0%}"
+    return txt
+
+
+class RenderModels:
+    """
+    View models of the premium match row, one per fixture and data version.
+
+    Everything the row shows (form dots, logos, odds, prediction, strategy and
+    trend pills) is computed once and kept as ready-to-emit HTML, so a Streamlit
+    rerun only re-sends markup. Form strings for every team are built in one pass
+    over the TeamMatchTable; the prediction is read from the already enriched
+    match and only recomputed when the row doesn't carry it.
+
+    Build it through `RenderModels.get(df)`, which caches one instance per data version.
+    """
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+    ROWS_SIZE = 2048 # View models kept per data version
+
+    def __init__(self, df):
+        self.forms = self._forms(TeamMatchTable.get(df))
+        self._rows = VersionedLRU(self.ROWS_SIZE)
+
+    @classmethod
+    def get(cls, df):
+        """Shared render models for this data (built once per data version)."""
+        return cls._cache.get_or_build(TeamMatchTable.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    @staticmethod
+    def _forms(table):
+        """{team: ['W', 'D', ...]} last FORM_LENGTH played results, newest first."""
+        frame = table.frame
+        played = frame[frame['GoalsFor'].notna() & frame['GoalsAgainst'].notna()]
+        recent = played.groupby('Team', sort=False).tail(FORM_LENGTH)
+        gf, ga = recent['GoalsFor'].to_numpy(dtype=float), recent['GoalsAgainst'].to_numpy(dtype=float)
+        results = pd.Series(np.where(gf > ga, 'W', np.where(gf == ga, 'D', 'L')), index=recent['Team'].to_numpy())
+        return {team: list(res[::-1]) for team, res in results.groupby(level=0, sort=False)}
+
+    @staticmethod
+    def fixture_id(match):
+        return (match.get('Div'), str(match.get('Date')), match['HomeTeam'], match['AwayTeam'])
+
+    # Match fields the row displays (odds, prediction, stats, odds appended to the pills)
+    DISPLAY_FIELDS = ('Time', 'HasStats', 'B365H', 'B365D', 'B365A', 'REG_HomeGoals', 'REG_AwayGoals',
+                      'ML_Over25', 'HomeAvgGoalsFor', 'AwayAvgGoalsFor', 'B365_BTTS_Yes') + tuple(
+                      f for line in ('0.5', '1.5', '2.5', '3.5', '4.5') for f in (f'B365_Over{line}', f'B365>{line}'))
+
+    @classmethod
+    def _display_digest(cls, match):
+        """Values of the displayed fields: a refreshed odd or a new snapshot gives a new view model."""
+        return tuple(str(match.get(f)) for f in cls.DISPLAY_FIELDS)
+
+    @staticmethod
+    def _signature(home_trends, away_trends, extra_strategies, buttons):
+        """What the row shows besides the fixture itself (the same fixture is rendered in several lists)."""
+        texts = tuple(t['text'] for t in (home_trends or [])[:2]) + ('|',) + tuple(t['text'] for t in (away_trends or [])[:2])
+        strats = tuple((s.get('suggestion'), s.get('prob'), s.get('odd'), s.get('ev')) for s in (extra_strategies or []))
+        return texts, strats, bool(buttons)
+
+    def view(self, match, predictor, home_trends=None, away_trends=None, extra_strategies=None, buttons=False):
+        """View model of one row (memoized by fixture, its displayed values and what else it shows)."""
+        key = (self.fixture_id(match), self._display_digest(match),
+               self._signature(home_trends, away_trends, extra_strategies, buttons))
+        return self._rows.get_or_build(key, lambda: self._build(match, predictor, home_trends, away_trends,
+                                                                  extra_strategies, buttons))
+
+    def _prediction(self, match, predictor):
+        """'H-A' predicted score, from the enriched match when it has it."""
+        p_h, p_a = match.get('REG_HomeGoals'), match.get('REG_AwayGoals')
+        if p_h is None or p_a is None:
+            has_stats = match.get('HasStats')
+            if has_stats is not None and pd.notna(has_stats) and not has_stats:
+                return "-" # Prediction already failed upstream
+            pred_row = predictor.predict_match_safe(
+                match['HomeTeam'],
+                match['AwayTeam'],
+                match_date=match.get('Date'),
+                known_odds={k: v for k, v in match.items() if str(k).startswith('B365')}
+            )
+            if not pred_row:
+                return "-"
+            p_h, p_a = pred_row.get('REG_HomeGoals', 0), pred_row.get('REG_AwayGoals', 0)
+        if pd.isna(p_h) or pd.isna(p_a):
+            return "-"
+        return f"{p_h:.0f}-{p_a:.0f}"
+
+    def _build(self, match, predictor, home_trends, away_trends, extra_strategies, buttons):
+        home, away = match['HomeTeam'], match['AwayTeam']
+        div = match.get('Div', '')
+        home_norm = predictor.normalize_name(home)
+        away_norm = predictor.normalize_name(away)
+        hl = logo_manager.get_team_logo(home_norm, div) or DEFAULT_LOGO
+        al = logo_manager.get_team_logo(away_norm, div) or DEFAULT_LOGO
+
+        form_h = self.forms.get(home) or self.forms.get(home_norm, [])
+        form_a = self.forms.get(away) or self.forms.get(away_norm, [])
+
+        g_h = match.get('HomeAvgGoalsFor', 0.0)
+        g_a = match.get('AwayAvgGoalsFor', 0.0)
+        g_h, g_a = (0.0 if g is None or pd.isna(g) else g for g in (g_h, g_a))
+
+        # Pills: strategies (as pills only when not rendered as buttons), then trends, then the ML hint
+        trends_html = ""
+        count = 0
+        strategy_labels = [strategy_label(s) for s in (extra_strategies or [])]
+        if not buttons:
+            for label in strategy_labels:
+                trends_html += trend_pill(label, sentiment='strategy')
+                count += 1
+        for t in (home_trends or [])[:2]:
+            if count >= MAX_PILLS: break
+            trends_html += trend_pill(text_with_odd(t['text'], match), 'good')
+            count += 1
+        for t in (away_trends or [])[:2]:
+            trends_html += trend_pill(text_with_odd(t['text'], match), 'good')
+            count += 1
+        ml_over = match.get('ML_Over25', 0)
+        if ml_over is not None and pd.notna(ml_over) and ml_over > 65 and count < MAX_PILLS:
+            trends_html += trend_pill(text_with_odd(f"IA: +2.5 ({ml_over}%)", match), 'good')
+
+        odds = [str(match.get(c, '-')) for c in ['B365H', 'B365D', 'B365A']]
+
+        return {
+            'home': home,
+            'away': away,
+            'div': div,
+            'header_html': f"<div style='line-height:1.2'><small style='color:#888'>{div}</small><br><b>{match.get('Time', '00:00')}</b></div>",
+            'teams_html': f"""
+            <div style="display:flex;align-items:center;margin-bottom:2px;">
+                <img src="{hl}" onerror="this.src='{DEFAULT_LOGO}'" style="width:20px;height:20px;margin-right:6px;object-fit:contain;">
+                <span style="font-weight:600;font-size:1em;">{home}</span>
+            </div>
+            <div style="display:flex;align-items:center;">
+                <img src="{al}" onerror="this.src='{DEFAULT_LOGO}'" style="width:20px;height:20px;margin-right:6px;object-fit:contain;">
+                <span style="font-weight:600;font-size:1em;">{away}</span>
+            </div>
+            """,
+            'form_html': f"<div style='margin-bottom:2px'>{form_html(form_h)}</div>{form_html(form_a)}",
+            'stats_html': f"""
+             <div style='line-height:1.3;font-size:0.85em'>
+             <span style='color:#666'>Goles:</span> <b>{g_h:.1f} / {g_a:.1f}</b><br>
+             <span style='color:#666'>Pred:</span> <b style='color:#2563EB'>{self._prediction(match, predictor)}</b>
+             </div>
+             """,
+            'trends_html': trends_html,
+            'strategy_labels': strategy_labels,
+            'odds_html': f"""
+            <div style="display:flex;gap:2px;font-size:0.75em;text-align:center;margin-bottom:4px;">
+                <div style="background:#f1f5f9;padding:2px;border-radius:3px;flex:1;">1 <b style='color:#1e293b'>{odds[0]}</b></div>
+                <div style="background:#f1f5f9;padding:2px;border-radius:3px;flex:1;">X <b style='color:#1e293b'>{odds[1]}</b></div>
+                <div style="background:#f1f5f9;padding:2px;border-radius:3px;flex:1;">2 <b style='color:#1e293b'>{odds[2]}</b></div>
+            </div>
+            """,
+        }
@@ -0,0 +1,159 @@
+import os
+import time
+import hashlib
+import threading
+
+import pandas as pd
+from src.data.loader import DataLoader
+from src.utils.cache import VersionedLRU
+
+
+class DataVersion:
+    """
+    One loaded version of the feature history and the engines built on it.
+
+    Shared by every session of the process: `data` hands out shallow views of the
+    single frame (no copy, no hashing; treat them as read-only; with pandas
+    Copy-on-Write a write to a view never reaches the shared frame), and the
+    predictor, trend index and H2H index are built once, on first use
+    (safe with several sessions asking at the same time).
+    """
+    def __init__(self, token, frame):
+        self.token = token
+        self.frame = frame
+        self.loaded_at = time.time()
+        self._shared = {}
+        self._lock = threading.Lock()
+
+    @property
+    def data(self):
+        return self.frame.copy(deep=False)
+
+    def shared(self, name, build):
+        """build() once per version (also for dashboard-side objects, e.g. render models)."""
+        value = self._shared.get(name)
+        if value is None:
+            with self._lock:
+                value = self._shared.get(name)
+                if value is None:
+                    value = build()
+                    self._shared[name] = value
+        return value
+
+    @property
+    def predictor(self):
+        from src.engine.predictor import Predictor
+        # Model (re)training runs in the background so the first render isn't blocked
+        return self.shared('predictor', lambda: Predictor(self.frame, background_training=True))
+
+    @property
+    def trends(self):
+        from src.engine.trend_index import TrendIndex
+        return self.shared('trends', lambda: TrendIndex.get(self.frame))
+
+    @property
+    def h2h(self):
+        from src.engine.h2h import H2HManager
+        return self.shared('h2h', lambda: H2HManager.get(self.frame))
+
+
+class DataService:
+    """
+    Process-wide history for the dashboard, one DataVersion per (leagues, seasons).
+
+    Versions are keyed by a cheap token (league/season selection, pipeline version
+    and the mtimes of the cached season CSVs), so finding the current version is a
+    few stat() calls instead of hashing the frame. A version is rebuilt after TTL
+    (the loader then refreshes stale seasons); concurrent sessions asking for the
+    same cold version wait for one build instead of each running the pipeline.
+    """
+    PIPELINE_VERSION = 4 # Bump to force a rebuild when the feature pipeline changes
+    TTL_SECONDS = 3600
+    CACHE_SIZE = 3
+
+    _cache = VersionedLRU(CACHE_SIZE)
+    _build_locks = {}
+    _build_locks_lock = threading.Lock()
+
+    @classmethod
+    def token(cls, leagues, seasons, cache_dir="data_cache"):
+        """Data-version token of a selection (changes when a season file is re-downloaded)."""
+        parts = [str(cls.PIPELINE_VERSION)]
+        for season in seasons:
+            for league in leagues:
+                path = os.path.join(cache_dir, f"{league}_{season}.csv")
+                try:
+                    stamp = os.stat(path).st_mtime_ns
+                except OSError:
+                    stamp = 0
+                parts.append(f"{league}_{season}:{stamp}")
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def get(cls, leagues, seasons):
+        """Current DataVersion of this selection (built on first use / after TTL)."""
+        leagues, seasons = tuple(leagues), tuple(seasons)
+        entry = cls._lookup(cls.token(leagues, seasons))
+        if entry is not None:
+            return entry
+
+        with cls._build_locks_lock:
+            build_lock = cls._build_locks.setdefault((leagues, seasons), threading.Lock())
+        with build_lock:
+            # Another session may have finished the build while we waited
+            entry = cls._lookup(cls.token(leagues, seasons))
+            if entry is not None:
+                return entry
+            frame = cls.build(leagues, seasons)
+            # Token after loading: the loader may just have (re)downloaded files
+            entry = DataVersion(cls.token(leagues, seasons), frame)
+            cls._cache.put(entry.token, entry)
+            print(f"DataService: built version {entry.token} ({len(frame)} matches)")
+            return entry
+
+    @classmethod
+    def _lookup(cls, token):
+        entry = cls._cache.get(token)
+        if entry is not None and time.time() - entry.loaded_at > cls.TTL_SECONDS:
+            cls._cache.pop(token)
+            return None
+        return entry
+
+    @staticmethod
+    def build(leagues, seasons):
+        """History with the dashboard's feature pipeline applied."""
+        from src.data.cups import CupLoader
+        from src.engine.features import FeatureEngineer
+        from src.utils.normalization import NameNormalizer
+
+        loader = DataLoader()
+        df = loader.fetch_data(list(leagues), list(seasons))
+
+        if df.empty:
+            return df
+
+        try:
+            cup_loader = CupLoader()
+            cup_schedule = cup_loader.fetch_all_cups()
+        except Exception as e:
+            print(f"Warning: Could not fetch cup data: {e}")
+            cup_schedule = None
+
+        # Calculate Features
+        engineer = FeatureEngineer(df)
+        df = engineer.add_rest_days(cup_schedule=cup_schedule) # Pass cup data
+        df = engineer.add_rolling_stats(window=5)
+        df = engineer.add_recent_form(window=5) # PPG Form
+        df = engineer.add_opponent_difficulty(window=5) # Opponent Strength
+        df = engineer.add_relative_strength()
+
+        # --- GLOBAL NORMALIZATION AT SOURCE ---
+        # Fixes Promoted/Relegated team history disconnects (e.g. Leicester vs Leicester City)
+        # Historical names are the reference: confirm them before normalizing, so they
+        # never reach the unknown-names audit file
+        NameNormalizer.register_known(pd.unique(df[['HomeTeam', 'AwayTeam']].to_numpy().ravel()))
+        # New frame, not an in-place edit: engines already looked up on df keep their version
+        df = df.assign(HomeTeam=NameNormalizer.normalize_series(df['HomeTeam']),
+                       AwayTeam=NameNormalizer.normalize_series(df['AwayTeam']))
+
+        return df
@@ -0,0 +1,416 @@
+import json
+import os
+import shutil
+import time
+import datetime
+
+import pandas as pd
+import numpy as np
+
+
+class SlateSnapshot:
+    """
+    Precomputed slate of upcoming matches for the dashboard.
+
+    `tools/update_dashboard_data.py` runs the heavy work on a schedule (predictions,
+    features, strategies, trends, odds) and saves one row per fixture. The dashboard
+    only loads it; leagues missing from it (or a stale / older-schema snapshot)
+    fall back to live computation.
+
+    On disk each build is a folder of typed column blocks under PATH, with a CURRENT
+    pointer swapped atomically. Rows are sorted by (Div, Date), so one league is a
+    contiguous row range and `load(leagues, start, end)` reads only those rows.
+    """
+    PATH = "data_cache/slate"
+    SCHEMA_VERSION = 3
+    KEEP_VERSIONS = 2
+    MAX_AGE_HOURS = 2.0
+    REQUIRED_COLS = ['HomeTeam', 'AwayTeam', 'Date', 'Div', 'HasStats', 'active_strategies', 'home_trends', 'away_trends']
+
+    # Column kind -> typed block it is stored in
+    BLOCK_OF = {'float': 'float', 'int': 'int', 'bool': 'bool', 'datetime': 'datetime', 'category': 'codes', 'json': 'codes'}
+    BLOCKS = ['float', 'int', 'bool', 'datetime', 'codes']
+
+    def __init__(self, matches, metadata=None, patterns_info=None):
+        self.matches = matches
+        self.metadata = metadata or {}
+        self.patterns_info = patterns_info or {}
+
+    # --- BUILD ---
+
+    @classmethod
+    def build(cls, upcoming, predictor, patterns, scanner=None, leagues=None, seasons=None):
+        """
+        Runs predictions, strategies and trend scans for every upcoming fixture.
+        upcoming: Fixtures with HomeTeam, AwayTeam, Date, Div (+ Referee, B365* odds).
+        patterns: PREMATCH_PATTERNS-style (name, condition, target, odds_col) tuples.
+        Per-stage seconds are kept in metadata['timings'].
+        """
+        history = predictor.history
+        timings = {}
+
+        # 1. Predictions (goal model scored for the whole slate in one pass)
+        t0 = time.perf_counter()
+        fixtures = upcoming.to_dict('records')
+        goal_markets = predictor.goal_markets(upcoming['HomeTeam'].to_numpy(), upcoming['AwayTeam'].to_numpy()).to_dict('records') \
+            if fixtures else []
+        rows, analyses = [], []
+        for match, gm in zip(fixtures, goal_markets):
+            try:
+                current_odds = {k: v for k, v in match.items() if str(k).startswith('B365')}
+                analysis = predictor.predict_match_safe(
+                    match['HomeTeam'], match['AwayTeam'],
+                    match_date=match.get('Date'),
+                    referee=match.get('Referee'),
+                    known_odds=current_odds,
+                    goal_markets=gm
+                )
+            except Exception as e:
+                print(f"   Error analyzing {match.get('HomeTeam')} vs {match.get('AwayTeam')}: {e}")
+                continue
+
+            if analysis:
+                # Real odds from the fixture win over synthetic ones (same merge as the live slate)
+                full_match = dict(analysis)
+                for k, v in match.items():
+                    if (str(k).startswith('B365') and pd.notna(v)) or k not in full_match:
+                        full_match[k] = v
+                full_match['HasStats'] = True
+            else:
+                full_match = dict(match)
+                full_match['HasStats'] = False
+            rows.append(full_match)
+            analyses.append(analysis)
+        timings['predict'] = time.perf_counter() - t0
+
+        # 2. Strategies (one pass per pattern over the whole slate)
+        t0 = time.perf_counter()
+        active = [[] for _ in rows]
+        for name, cond, _, _ in patterns:
+            for i, analysis in enumerate(analyses):
+                if not analysis:
+                    continue
+                try:
+                    if cond(analysis):
+                        active[i].append(name)
+                except Exception as e:
+                    print(f"   Pattern '{name}' failed on {analysis.get('HomeTeam')} vs {analysis.get('AwayTeam')}: {e}")
+        for row, names in zip(rows, active):
+            row['active_strategies'] = names
+        timings['strategies'] = time.perf_counter() - t0
+
+        # 3. Trends (each team/venue scanned once)
+        t0 = time.perf_counter()
+        scans = {}
+        for row in rows:
+            for side, context in [('home', 'home'), ('away', 'away')]:
+                if scanner is None:
+                    row[f'{side}_trends'] = []
+                    continue
+                team = predictor.normalize_name(row['HomeTeam' if side == 'home' else 'AwayTeam'])
+                if (team, context) not in scans:
+                    scans[(team, context)] = scanner.scan(team, history, context=context)
+                row[f'{side}_trends'] = scans[(team, context)]
+        timings['trends'] = time.perf_counter() - t0
+
+        matches = pd.DataFrame(rows, columns=None if rows else cls.REQUIRED_COLS)
+        metadata = {
+            'schema_version': cls.SCHEMA_VERSION,
+            'last_updated': datetime.datetime.now().isoformat(),
+            'total_matches': len(matches),
+            'strategies_found': sum(bool(a) for a in active),
+            'leagues': sorted(set(leagues) if leagues is not None else set(matches['Div'].dropna())),
+            'seasons': list(seasons or []),
+            'history_matches': len(history),
+            'timings': timings,
+        }
+        patterns_info = {name: (cond.__doc__ or '').strip() for name, cond, _, _ in patterns}
+        return cls(matches, metadata, patterns_info)
+
+    @classmethod
+    def merge(cls, parts, leagues=None, seasons=None):
+        """One snapshot from per-league shards (timings are summed across shards)."""
+        parts = list(parts)
+        frames = [p.matches for p in parts if not p.matches.empty]
+        matches = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=cls.REQUIRED_COLS)
+        timings = {}
+        for p in parts:
+            for stage, secs in p.metadata.get('timings', {}).items():
+                timings[stage] = timings.get(stage, 0.0) + secs
+        metadata = dict(parts[0].metadata) if parts else {'schema_version': cls.SCHEMA_VERSION}
+        metadata.update({
+            'last_updated': datetime.datetime.now().isoformat(),
+            'total_matches': len(matches),
+            'strategies_found': sum(p.metadata.get('strategies_found', 0) for p in parts),
+            'leagues': sorted(set(leagues) if leagues is not None else set(matches['Div'].dropna())),
+            'seasons': list(seasons or metadata.get('seasons', [])),
+            'timings': timings,
+        })
+        return cls(matches, metadata, parts[0].patterns_info if parts else {})
+
+    # --- STORAGE ---
+
+    @classmethod
+    def mtime(cls, path=None):
+        """Modification time of the CURRENT pointer (0 if there is no snapshot)."""
+        try:
+            return os.path.getmtime(os.path.join(path or cls.PATH, 'CURRENT'))
+        except OSError:
+            return 0
+
+    def save(self, path=None):
+        """
+        Writes a new snapshot version and then swaps the CURRENT pointer atomically
+        (readers never see a half-written snapshot). Keeps the last KEEP_VERSIONS builds.
+        """
+        root = path or self.PATH
+        version = datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        folder = os.path.join(root, version)
+        os.makedirs(folder, exist_ok=True)
+
+        matches = self.matches.copy()
+        if 'Date' in matches.columns:
+            matches['Date'] = pd.to_datetime(matches['Date'], errors='coerce')
+        # League partitions: each Div is a contiguous, date-sorted row range
+        matches['Div'] = matches['Div'].fillna('?') if 'Div' in matches.columns else '?'
+        sort_cols = ['Div', 'Date'] if 'Date' in matches.columns else ['Div']
+        matches = matches.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+        divs = matches['Div'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, divs[1:] != divs[:-1]]) if len(divs) else np.array([], dtype=int)
+        ends = np.append(starts[1:], len(divs))
+
+        meta = {
+            'metadata': self.metadata,
+            'patterns_info': self.patterns_info,
+            'rows': len(matches),
+            'partitions': {str(divs[s]): [int(s), int(e)] for s, e in zip(starts, ends)},
+        }
+        meta.update(self._write_columns(matches, folder))
+        with open(os.path.join(folder, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, allow_nan=False, default=str)
+
+        tmp = os.path.join(root, 'CURRENT.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+        # Older builds are kept briefly for readers that resolved CURRENT before the swap
+        builds = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)) and d != version)
+        for old in builds[:max(0, len(builds) - (self.KEEP_VERSIONS - 1))]:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+        return folder
+
+    @classmethod
+    def _kind(cls, col):
+        """Storage kind of a column: float, int, bool, datetime, category, list or json."""
+        if pd.api.types.is_bool_dtype(col):
+            return 'bool'
+        if pd.api.types.is_integer_dtype(col):
+            return 'float' if col.isna().any() else 'int'
+        if pd.api.types.is_numeric_dtype(col):
+            return 'float'
+        if pd.api.types.is_datetime64_any_dtype(col):
+            return 'datetime'
+        values = col[col.map(lambda v: v is not None and not (isinstance(v, float) and np.isnan(v)))]
+        if values.map(lambda v: isinstance(v, str)).all():
+            return 'category'
+        if values.map(lambda v: isinstance(v, (bool, np.bool_))).all():
+            return 'bool'
+        if values.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))).all():
+            return 'float'
+        if values.map(lambda v: isinstance(v, list) and all(isinstance(x, str) for x in v)).all():
+            return 'list'
+        return 'json'
+
+    @classmethod
+    def _write_columns(cls, matches, folder):
+        """
+        Typed column blocks (one .npy matrix per type, row-major so a row range is contiguous):
+        float64 with NaN, int64, bool as int8 (-1 = null), datetime64, and int32 dictionary
+        codes (-1 = null) for strings and JSON-encoded objects. String lists (strategies)
+        are dictionary codes plus per-row offsets.
+        """
+        blocks = {k: [] for k in cls.BLOCKS}
+        columns = []
+        for name in matches.columns:
+            col = matches[name]
+            kind = cls._kind(col)
+            spec = {'name': str(name), 'kind': kind}
+            if kind == 'list':
+                lists = col.map(lambda v: v if isinstance(v, list) else [])
+                codes, categories = pd.factorize(pd.Series([x for v in lists for x in v], dtype=object))
+                offsets = np.r_[0, np.cumsum(lists.map(len).to_numpy())].astype('int64')
+                spec.update(file=f"list{len(columns)}", categories=list(categories))
+                np.save(os.path.join(folder, f"{spec['file']}_values.npy"), codes.astype('int32'))
+                np.save(os.path.join(folder, f"{spec['file']}_offsets.npy"), offsets)
+                columns.append(spec)
+                continue
+
+            if kind == 'float':
+                values = pd.to_numeric(col, errors='coerce').to_numpy(dtype='float64')
+            elif kind == 'int':
+                values = col.to_numpy(dtype='int64')
+            elif kind == 'bool':
+                spec['nullable'] = bool(col.isna().any())
+                values = np.where(col.isna().to_numpy(), -1, col.fillna(False).astype(bool).to_numpy()).astype('int8')
+            elif kind == 'datetime':
+                values = col.to_numpy(dtype='datetime64[ns]')
+            else:
+                if kind == 'json':
+                    col = col.map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v))
+                                  else json.dumps(cls._plain(v), allow_nan=False, default=str))
+                codes, categories = pd.factorize(col)
+                spec['categories'] = list(categories)
+                values = codes.astype('int32')
+            block = cls.BLOCK_OF[kind]
+            spec.update(block=block, pos=len(blocks[block]))
+            blocks[block].append(values)
+            columns.append(spec)
+
+        stored = []
+        for block, cols in blocks.items():
+            if cols:
+                np.save(os.path.join(folder, f"{block}.npy"), np.ascontiguousarray(np.column_stack(cols)))
+                stored.append(block)
+        return {'columns': columns, 'blocks': stored}
+
+    @classmethod
+    def _plain(cls, value):
+        """JSON-safe value: NaN/inf -> None, numpy scalars -> Python, timestamps -> ISO."""
+        if isinstance(value, (list, tuple)):
+            return [cls._plain(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): cls._plain(v) for k, v in value.items()}
+        if value is pd.NaT or value is pd.NA or value is None:
+            return None
+        if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
+
+    @classmethod
+    def load(cls, leagues=None, start=None, end=None, path=None, max_age_hours=None):
+        """
+        Loads and validates the snapshot, reading only the rows of `leagues` (default: all)
+        whose Date falls in [start, end] (calendar days, either bound optional).
+        Returns None (with the reason printed) if there is no snapshot, it is unreadable,
+        from another schema version or older than max_age_hours.
+        """
+        root = path or cls.PATH
+        max_age_hours = cls.MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+        try:
+            with open(os.path.join(root, 'CURRENT'), 'r', encoding='utf-8') as f:
+                folder = os.path.join(root, f.read().strip())
+            with open(os.path.join(folder, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"SlateSnapshot: unreadable snapshot in {root}: {e}")
+            return None
+
+        metadata = meta.get('metadata', {})
+        if metadata.get('schema_version') != cls.SCHEMA_VERSION:
+            print(f"SlateSnapshot: schema {metadata.get('schema_version')} != {cls.SCHEMA_VERSION}, ignoring {folder}.")
+            return None
+        names = [c['name'] for c in meta.get('columns', [])]
+        missing = [c for c in cls.REQUIRED_COLS if c not in names]
+        if meta.get('rows') and missing:
+            print(f"SlateSnapshot: missing columns {missing}, ignoring {folder}.")
+            return None
+
+        snapshot = cls(pd.DataFrame(), metadata, meta.get('patterns_info', {}))
+        if max_age_hours and snapshot.age > pd.Timedelta(hours=max_age_hours):
+            print(f"SlateSnapshot: {folder} is {snapshot.age} old (max {max_age_hours}h), ignoring.")
+            return None
+        try:
+            snapshot.matches = cls._read_columns(folder, meta, leagues, start, end)
+        except Exception as e:
+            print(f"SlateSnapshot: unreadable snapshot in {folder}: {e}")
+            return None
+        return snapshot
+
+    @classmethod
+    def _read_columns(cls, folder, meta, leagues, start, end):
+        names = [c['name'] for c in meta['columns']]
+        parts = meta['partitions']
+        ranges = [parts[l] for l in (parts if leagues is None else leagues) if l in parts]
+        if not meta['rows'] or not ranges:
+            return pd.DataFrame(columns=names + ['FromSnapshot'])
+
+        # Memory-mapped blocks: only the pages of the selected rows are read
+        blocks = {b: np.load(os.path.join(folder, f"{b}.npy"), mmap_mode='r') for b in meta['blocks']}
+        specs = {c['name']: c for c in meta['columns']}
+        rows = np.concatenate([np.arange(lo, hi) for lo, hi in ranges])
+        if (start is not None or end is not None) and 'Date' in specs:
+            date_spec = specs['Date']
+            dates = pd.to_datetime(blocks[date_spec['block']][rows, date_spec['pos']])
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= dates >= pd.Timestamp(start).normalize()
+            if end is not None:
+                keep &= dates < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            rows = rows[keep]
+
+        data = {b: np.asarray(block[rows]) for b, block in blocks.items()}
+        # Plain numeric blocks become frames in one go (hundreds of sparse odds columns)
+        frames = [pd.DataFrame(data[b], columns=[c['name'] for c in meta['columns'] if c.get('block') == b])
+                  for b in ['float', 'int', 'datetime'] if b in data]
+        out = {}
+        for spec in meta['columns']:
+            kind = spec['kind']
+            if kind == 'list':
+                codes = np.load(os.path.join(folder, f"{spec['file']}_values.npy"))
+                offsets = np.load(os.path.join(folder, f"{spec['file']}_offsets.npy"))
+                categories = np.array(spec['categories'], dtype=object)
+                values = np.empty(len(rows), dtype=object)
+                for i, r in enumerate(rows):
+                    values[i] = list(categories[codes[offsets[r]:offsets[r + 1]]])
+                out[spec['name']] = values
+                continue
+
+            if kind in ('float', 'int', 'datetime'):
+                continue
+            raw = data[spec['block']][:, spec['pos']]
+            if kind == 'bool':
+                values = pd.array(np.where(raw < 0, None, raw == 1), dtype='boolean') if spec.get('nullable') else raw == 1
+            elif kind in ('category', 'json'):
+                decoded = np.empty(len(spec['categories']) + 1, dtype=object) # Last slot: null (-1)
+                for i, c in enumerate(spec['categories']):
+                    decoded[i] = json.loads(c) if kind == 'json' else c
+                values = pd.Series(decoded[raw], dtype=object) # Keeps None (a str dtype would turn it into NaN)
+            out[spec['name']] = values
+
+        matches = pd.concat(frames + [pd.DataFrame(out)], axis=1)[names]
+        matches['FromSnapshot'] = True
+        return matches
+
+    # --- QUERY ---
+
+    @property
+    def last_updated(self):
+        return pd.to_datetime(self.metadata.get('last_updated'), errors='coerce')
+
+    @property
+    def age(self):
+        """Time since the snapshot was built (infinite if unknown)."""
+        ts = self.last_updated
+        return pd.Timestamp.now() - ts if pd.notna(ts) else pd.Timedelta.max
+
+    @property
+    def leagues(self):
+        """Leagues the snapshot covers (the leagues whose fixtures were fetched when it was built)."""
+        return set(self.metadata.get('leagues') or self.matches.get('Div', pd.Series(dtype=object)).dropna())
+
+    def missing_leagues(self, leagues):
+        """Requested leagues not covered by the snapshot (need live computation)."""
+        return [l for l in leagues if l not in self.leagues]
+
+    def for_leagues(self, leagues):
+        """Snapshot fixtures of the requested leagues."""
+        if self.matches.empty:
+            return self.matches
+        return self.matches[self.matches['Div'].isin(list(leagues))]
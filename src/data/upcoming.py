@@ -1,8 +1,10 @@
+import os
 import pandas as pd
 import requests
 import io
 import datetime
 import urllib3
+from src.utils.normalization import NameNormalizer
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class FixturesFetcher:
@@ -47,13 +49,8 @@ class FixturesFetcher:
                     df = df.rename(columns={'Home Team': 'HomeTeam', 'Away Team': 'AwayTeam'})
                     
                     # Normalize Team Names to match Historical Data
-                    import importlib
-                    import src.utils.normalization as norm_module
-                    importlib.reload(norm_module) # FORCE RELOAD to pick up 'Brighton' fix
-                    NameNormalizer = norm_module.NameNormalizer
-                    
-                    df['HomeTeam'] = df['HomeTeam'].apply(NameNormalizer.normalize)
-                    df['AwayTeam'] = df['AwayTeam'].apply(NameNormalizer.normalize)
+                    df['HomeTeam'] = NameNormalizer.normalize_series(df['HomeTeam'])
+                    df['AwayTeam'] = NameNormalizer.normalize_series(df['AwayTeam'])
                     df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
                     df['Time'] = df['Date'].dt.strftime('%H:%M')
                     df['Div'] = league_code
@@ -119,13 +116,10 @@ class FixturesFetcher:
                     scraped_df = scraper.scrape_next_matches(league_code=league_code)
                     if not scraped_df.empty:
                         # Normalize Scraper Names too!
-                        import src.utils.normalization as norm_module
-                        NameNormalizer = norm_module.NameNormalizer
-                        
                         if 'HomeTeam' in scraped_df.columns:
-                            scraped_df['HomeTeam'] = scraped_df['HomeTeam'].apply(NameNormalizer.normalize)
+                            scraped_df['HomeTeam'] = NameNormalizer.normalize_series(scraped_df['HomeTeam'])
                         if 'AwayTeam' in scraped_df.columns:
-                            scraped_df['AwayTeam'] = scraped_df['AwayTeam'].apply(NameNormalizer.normalize)
+                            scraped_df['AwayTeam'] = NameNormalizer.normalize_series(scraped_df['AwayTeam'])
                             
                         print(f"Fallback successful: {len(scraped_df)} matches (Normalized).")
                         upcoming_matches.append(scraped_df)
@@ -167,8 +161,8 @@ class FixturesFetcher:
                     # API now returns variable columns like B365_Over3.5, B365_Under1.5 etc.
                     # We merge ALL of them.
                     
-                    enrichment_df['HomeTeam'] = enrichment_df['HomeTeam'].apply(NameNormalizer.normalize)
-                    enrichment_df['AwayTeam'] = enrichment_df['AwayTeam'].apply(NameNormalizer.normalize)
+                    enrichment_df['HomeTeam'] = NameNormalizer.normalize_series(enrichment_df['HomeTeam'])
+                    enrichment_df['AwayTeam'] = NameNormalizer.normalize_series(enrichment_df['AwayTeam'])
                     
                     enrichment_df['MergeKey'] = enrichment_df['HomeTeam'] + "_" + enrichment_df['AwayTeam']
                     final_df['MergeKey'] = final_df['HomeTeam'] + "_" + final_df['AwayTeam']
@@ -211,7 +205,6 @@ class FixturesFetcher:
 
         # UNION with Real Odds CSV (Legacy/Manual Override)
         try:
-            import os
             real_odds_path = os.path.join(os.path.dirname(__file__), 'real_odds.csv')
             if os.path.exists(real_odds_path):
                 real_odds_df = pd.read_csv(real_odds_path)
@@ -276,7 +269,6 @@ class FixturesFetcher:
         """
         try:
             from src.data.odds_api_client import OddsApiClient
-            from src.utils.normalization import NameNormalizer
             
             client = OddsApiClient()
             
@@ -0,0 +1,173 @@
+import pandas as pd
+import numpy as np
+from src.engine.team_matches import TeamMatchTable
+from src.utils.cache import VersionedLRU
+
+
+class FeatureService:
+    """
+    Point-in-time team features: "what did we know about this team before `as_of`".
+
+    Played matches are kept per venue ('All', 'Home', 'Away') in (Team, Date) order
+    with prefix sums of every per-match value, so a last-n window ending before any
+    date is one binary search on the team's dates plus a subtraction. Only matches
+    strictly before `as_of` are used, which makes every query leak-free for backtests.
+
+    Build it through `FeatureService.get(df)`, which caches one service per data version.
+    """
+    VENUES = ['All', 'Home', 'Away']
+
+    # Per-match values (averaged over the window)
+    VALUES = ['GoalsFor', 'GoalsAgainst', 'ShotsFor', 'ShotsAgainst', 'ShotsTargetFor', 'ShotsTargetAgainst',
+              'CornersFor', 'CornersAgainst', 'CardsFor', 'CardsAgainst', 'FoulsFor', 'FoulsAgainst',
+              'Points', 'Win', 'Loss', 'BTTS', 'Over25', 'CleanSheet', 'FailedToScore', 'ZeroZero',
+              'TotalGoals', 'TotalGoalsSq']
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, df):
+        frame = TeamMatchTable.get(df).frame
+        played = frame[frame['GoalsFor'].notna() & frame['GoalsAgainst'].notna()]
+        if 'Date' in played.columns:
+            played = played[pd.to_datetime(played['Date'], errors='coerce').notna()]
+        self.blocks = {}
+        for venue in self.VENUES:
+            sub = played if venue == 'All' else played[played['Venue'] == venue]
+            self.blocks[venue] = self._build_block(sub.reset_index(drop=True))
+        self.teams = pd.Index(self.blocks['All']['offsets'].keys())
+
+    @classmethod
+    def get(cls, df):
+        """Shared service for this data (built once per data version)."""
+        return cls._cache.get_or_build(TeamMatchTable.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    @classmethod
+    def _values(cls, m):
+        """
+        Per-match values (NaN where the source lacks the stat). Window averages only
+        count the matches where a value is known, so a missing stat never reads as 0.
+        """
+        def stat(col):
+            return m[col].astype(float) if col in m.columns else pd.Series(np.nan, index=m.index)
+
+        def cards(side):
+            # Yellows + reds, known if either column is (a missing red column isn't a missing booking)
+            return pd.concat([stat(f'Yellow{side}'), stat(f'Red{side}')], axis=1).sum(axis=1, min_count=1)
+
+        gf, ga = m['GoalsFor'].astype(float), m['GoalsAgainst'].astype(float)
+        total = gf + ga
+        result = m['Result'] if 'Result' in m.columns else pd.Series(np.where(gf > ga, 'W', np.where(gf == ga, 'D', 'L')), index=m.index)
+        return pd.DataFrame({
+            'GoalsFor': gf,
+            'GoalsAgainst': ga,
+            'ShotsFor': stat('ShotsFor'),
+            'ShotsAgainst': stat('ShotsAgainst'),
+            'ShotsTargetFor': stat('ShotsTargetFor'),
+            'ShotsTargetAgainst': stat('ShotsTargetAgainst'),
+            'CornersFor': stat('CornersFor'),
+            'CornersAgainst': stat('CornersAgainst'),
+            'CardsFor': cards('For'),
+            'CardsAgainst': cards('Against'),
+            'FoulsFor': stat('FoulsFor'),
+            'FoulsAgainst': stat('FoulsAgainst'),
+            'Points': result.map({'W': 3.0, 'D': 1.0, 'L': 0.0}).fillna(0.0),
+            'Win': (result == 'W').astype(float),
+            'Loss': (result == 'L').astype(float),
+            'BTTS': ((gf > 0) & (ga > 0)).astype(float),
+            'Over25': (total > 2.5).astype(float),
+            'CleanSheet': (ga == 0).astype(float),
+            'FailedToScore': (gf == 0).astype(float),
+            'ZeroZero': ((gf == 0) & (ga == 0)).astype(float),
+            'TotalGoals': total,
+            'TotalGoalsSq': total ** 2,
+        })[cls.VALUES]
+
+    def _build_block(self, m):
+        values = self._values(m).to_numpy()
+        known = ~np.isnan(values)
+        zero = np.zeros((1, len(self.VALUES)))
+        # Prefix sums with a leading zero row: window (lo, hi] = cum[hi] - cum[lo]
+        sums = np.vstack([zero, np.cumsum(np.where(known, values, 0.0), axis=0)])
+        counts = np.vstack([zero, np.cumsum(known, axis=0)])
+
+        if 'Date' in m.columns:
+            dates = pd.to_datetime(m['Date']).to_numpy(dtype='datetime64[ns]')
+        else:
+            dates = np.zeros(len(m), dtype='datetime64[ns]')
+        teams = m['Team'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]]) if len(teams) else np.array([], dtype=int)
+        ends = np.append(starts[1:], len(teams))
+        return {
+            'sums': sums,
+            'counts': counts,
+            'dates': dates,
+            'offsets': dict(zip(teams[starts], zip(starts, ends))),
+        }
+
+    # --- QUERY ---
+
+    @staticmethod
+    def _as_of(as_of):
+        if as_of is None:
+            return np.datetime64(pd.Timestamp.now().to_datetime64(), 'ns')
+        ts = pd.to_datetime(as_of, errors='coerce')
+        if pd.isna(ts):
+            ts = pd.Timestamp.now()
+        return np.datetime64(ts.to_datetime64(), 'ns')
+
+    def resolve(self, team):
+        """Team name as indexed (exact, else the first name containing it), or None."""
+        if team in self.blocks['All']['offsets']:
+            return team
+        hits = [t for t in self.teams if isinstance(t, str) and str(team) in t]
+        return hits[0] if hits else None
+
+    def features(self, team, as_of=None, n=5, venue='All'):
+        """
+        Averages over the team's last n matches played strictly before `as_of`
+        (default: now). venue: 'All', 'Home' or 'Away'.
+        A stat with no known value in the window (e.g. no shots data) averages to NaN.
+        Returns {'Matches', 'LastDate', 'RestDays', 'Avg<Value>'..., 'StdDev_Goals'}
+        or None if the team has no earlier match.
+        """
+        block = self.blocks[venue]
+        start, end = block['offsets'].get(team, (0, 0))
+        when = self._as_of(as_of)
+        hi = start + int(np.searchsorted(block['dates'][start:end], when, side='left'))
+        lo = max(start, hi - n)
+        if hi == lo:
+            return None
+
+        sums = block['sums'][hi] - block['sums'][lo]
+        counts = block['counts'][hi] - block['counts'][lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        out = {f'Avg{name}': float(v) for name, v in zip(self.VALUES, means)}
+        c, s, sq = counts[-1], sums[-2], sums[-1]
+        out['StdDev_Goals'] = float(np.sqrt(max(sq - s * s / c, 0.0) / (c - 1))) if c > 1 else np.nan
+        out['Matches'] = int(hi - lo)
+
+        # Rest days always from the last match at any venue
+        all_block = self.blocks['All']
+        a_start, a_end = all_block['offsets'].get(team, (0, 0))
+        a_hi = a_start + int(np.searchsorted(all_block['dates'][a_start:a_end], when, side='left'))
+        last = pd.Timestamp(all_block['dates'][a_hi - 1]) if a_hi > a_start else None
+        out['LastDate'] = last
+        out['RestDays'] = (pd.Timestamp(when) - last).days if last is not None else None
+        return out
+
+    def features_for_fixture(self, home_team, away_team, as_of=None, n=5, venue_split=False):
+        """
+        Pre-match features of both teams, keys prefixed 'Home'/'Away'
+        (e.g. HomeAvgGoalsFor). venue_split uses home-only / away-only form.
+        Missing sides are left out.
+        """
+        out = {}
+        for prefix, team, venue in [('Home', home_team, 'Home'), ('Away', away_team, 'Away')]:
+            feats = self.features(team, as_of, n, venue if venue_split else 'All')
+            if feats:
+                out.update({f'{prefix}{k}': v for k, v in feats.items()})
+        return out
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from src.engine.team_matches import TeamMatchTable
 
 class FeatureEngineer:
     def __init__(self, df):
@@ -80,47 +81,12 @@ class FeatureEngineer:
             print("FeatureEngineer: Missing FTHG/FTAG, skipping Rolling Stats.")
             return self.df
 
-        # Expanded to include Cards (Yellow + Red)
-        possible_cols = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR']
-        
-        # Only select columns that actually exist in the dataframe
-        cols_needed = [c for c in possible_cols if c in self.df.columns]
-        
         # If critical columns like HomeTeam/AwayTeam are missing, we can't do anything (shouldn't happen)
-        if 'HomeTeam' not in cols_needed or 'AwayTeam' not in cols_needed:
+        if 'HomeTeam' not in self.df.columns or 'AwayTeam' not in self.df.columns:
             return self.df
             
-        home_cols = [c for c in cols_needed if c in ['Date', 'HomeTeam', 'FTHG', 'FTAG', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR']]
-        # For away cols, we need to map carefully.
-        # But for simpler logic: Split DF -> Rename -> Concat
-        
-        home_stats = self.df[cols_needed].copy()
-        # Rename for Home perspective (Safely)
-        rename_map_h = {
-            'HomeTeam': 'Team', 'AwayTeam': 'Opponent',
-            'FTHG': 'GoalsFor', 'FTAG': 'GoalsAgainst',
-            'HST': 'ShotsTargetFor', 'AST': 'ShotsTargetAgainst',
-            'HF': 'FoulsFor', 'AF': 'FoulsAgainst',
-            'HC': 'CornersFor', 'AC': 'CornersAgainst',
-            'HY': 'YellowFor', 'AY': 'YellowAgainst',
-            'HR': 'RedFor', 'AR': 'RedAgainst'
-        }
-        home_stats = home_stats.rename(columns={k:v for k,v in rename_map_h.items() if k in home_stats.columns})
-        
-        away_stats = self.df[cols_needed].copy()
-        # Rename for Away perspective
-        rename_map_a = {
-            'AwayTeam': 'Team', 'HomeTeam': 'Opponent',
-            'FTAG': 'GoalsFor', 'FTHG': 'GoalsAgainst',
-            'AST': 'ShotsTargetFor', 'HST': 'ShotsTargetAgainst',
-            'AF': 'FoulsFor', 'HF': 'FoulsAgainst',
-            'AC': 'CornersFor', 'HC': 'CornersAgainst',
-            'AY': 'YellowFor', 'HY': 'YellowAgainst',
-            'AR': 'RedFor', 'HR': 'RedAgainst'
-        }
-        away_stats = away_stats.rename(columns={k:v for k,v in rename_map_a.items() if k in away_stats.columns})
-        
-        all_stats = pd.concat([home_stats, away_stats]).sort_values(['Team', 'Date'])
+        # Positional write-back below relies on a clean 0..n-1 index
+        self.df = self.df.reset_index(drop=True)
         
         if 'Date' in self.df.columns:
             self.df['Month'] = self.df['Date'].dt.month
@@ -147,42 +113,19 @@ class FeatureEngineer:
                    'FoulsFor', 'FoulsAgainst', 'CornersFor', 'CornersAgainst',
                    'CardsFor', 'CardsAgainst',
                    'GoalsCappedFor', 'GoalsCappedAgainst', # NEW
-                   'DominanceFor', 'DominanceAgainst']      # NEW
-        
-        # Prepare Stats df with new metrics
-        home_cols_new = ['Date', 'HomeTeam', 'FTHG', 'FTAG', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR', 'FTHG_Capped', 'FTAG_Capped', 'HomeDominanceRaw', 'AwayDominanceRaw']
-        away_cols_new = ['Date', 'AwayTeam', 'FTAG', 'FTHG', 'AST', 'HST', 'AF', 'HF', 'AC', 'HC', 'AY', 'HY', 'AR', 'HR', 'FTAG_Capped', 'FTHG_Capped', 'AwayDominanceRaw', 'HomeDominanceRaw']
-        
-        # Safe selection of cols
-        h_sel = [c for c in home_cols_new if c in self.df.columns]
-        a_sel = [c for c in away_cols_new if c in self.df.columns]
-        
-        home_stats = self.df[h_sel].copy().rename(columns={
-            'HomeTeam': 'Team', 'AwayTeam': 'Opponent',
-            'FTHG': 'GoalsFor', 'FTAG': 'GoalsAgainst',
-            'FTHG_Capped': 'GoalsCappedFor', 'FTAG_Capped': 'GoalsCappedAgainst',
-            'HomeDominanceRaw': 'DominanceFor', 'AwayDominanceRaw': 'DominanceAgainst',
-             # ... (Keep existing rename logic implicitly handled by consistent structure if possible, but explicit is better)
-             'HST': 'ShotsTargetFor', 'AST': 'ShotsTargetAgainst',
-             'HF': 'FoulsFor', 'AF': 'FoulsAgainst',
-             'HC': 'CornersFor', 'AC': 'CornersAgainst',
-             'HY': 'YellowFor', 'AY': 'YellowAgainst',
-             'HR': 'RedFor', 'AR': 'RedAgainst'
-        })
-        
-        away_stats = self.df[a_sel].copy().rename(columns={
-            'AwayTeam': 'Team', 'HomeTeam': 'Opponent',
-            'FTAG': 'GoalsFor', 'FTHG': 'GoalsAgainst',
-            'FTAG_Capped': 'GoalsCappedFor', 'FTHG_Capped': 'GoalsCappedAgainst',
-            'AwayDominanceRaw': 'DominanceFor', 'HomeDominanceRaw': 'DominanceAgainst',
-             'AST': 'ShotsTargetFor', 'HST': 'ShotsTargetAgainst',
-             'AF': 'FoulsFor', 'HF': 'FoulsAgainst',
-             'AC': 'CornersFor', 'HC': 'CornersAgainst',
-             'AY': 'YellowFor', 'HY': 'YellowAgainst',
-             'AR': 'RedFor', 'HR': 'RedAgainst'
-        })
-        
-        all_stats = pd.concat([home_stats, away_stats]).sort_values(['Team', 'Date'])
+                   'DominanceFor', 'DominanceAgainst',      # NEW
+                   'HTGoalsFor', 'HTGoalsAgainst', '2HGoalsFor', '2HGoalsAgainst'] # Half splits
+        
+        # Per-team history from the shared team-match table (sorted by Team, Date)
+        table = TeamMatchTable.get(self.df)
+        all_stats = table.frame[[c for c in ['Team', 'Date', 'GoalsFor', 'GoalsAgainst', 'ShotsTargetFor', 'ShotsTargetAgainst',
+                                             'FoulsFor', 'FoulsAgainst', 'CornersFor', 'CornersAgainst',
+                                             'YellowFor', 'YellowAgainst', 'RedFor', 'RedAgainst',
+                                             'HTGoalsFor', 'HTGoalsAgainst'] + table.HALF_COLS if c in table.frame.columns]].copy()
+        all_stats['GoalsCappedFor'] = table.from_matches(self.df['FTHG_Capped'], self.df['FTAG_Capped'])
+        all_stats['GoalsCappedAgainst'] = table.from_matches(self.df['FTAG_Capped'], self.df['FTHG_Capped'])
+        all_stats['DominanceFor'] = table.from_matches(self.df['HomeDominanceRaw'], self.df['AwayDominanceRaw'])
+        all_stats['DominanceAgainst'] = table.from_matches(self.df['AwayDominanceRaw'], self.df['HomeDominanceRaw'])
         
         # Calculate Total Cards (Y + R) if columns indicate
         if 'YellowFor' in all_stats.columns:
@@ -192,40 +135,25 @@ class FeatureEngineer:
              all_stats['CardsFor'] = 0
              all_stats['CardsAgainst'] = 0
         
-        
         # --- NEW: Weighted Rolling Stats (Z-Score Prep) ---
-        for metric in metrics:
-            if metric in all_stats:
-                # Weighted Mean (EMA)
-                all_stats[f'Avg{metric}_{window}'] = all_stats.groupby('Team')[metric].transform(lambda x: x.shift(1).ewm(span=window, min_periods=1).mean())
-                
-                # Weighted StdDev (Rolling EWM Std is complex, use simple rolling std for stability or approximation)
-                # Approximation: EWM Var = EWM(x^2) - EWM(x)^2
-                # But simple rolling std is usually sufficient for Z-Score volatility check
-                # User asked for "Weighted StdDev".
-                # Pandas ewm().std() exists!
-                all_stats[f'Std{metric}_{window}'] = all_stats.groupby('Team')[metric].transform(lambda x: x.shift(1).ewm(span=window, min_periods=3).std())
-
+        # Previous-match values per team (no lookahead)
+        present = [m for m in metrics if m in all_stats]
+        shifted = all_stats.groupby('Team', sort=False)[present].shift(1)
         
-        # Merge back to main DF
+        # Weighted Mean (EMA) and Weighted StdDev (pandas ewm().std())
+        ewm = shifted.groupby(all_stats['Team'], sort=False).ewm(span=window, min_periods=1)
+        avg = ewm.mean().reset_index(level=0, drop=True).sort_index()
+        ewm_std = shifted.groupby(all_stats['Team'], sort=False).ewm(span=window, min_periods=3)
+        std = ewm_std.std().reset_index(level=0, drop=True).sort_index()
         
-        # For Home Team
-        home_merge_cols = ['Date', 'Team'] + [f'Avg{m}_{window}' for m in metrics if f'Avg{m}_{window}' in all_stats] + [f'Std{m}_{window}' for m in metrics if f'Std{m}_{window}' in all_stats]
-        self.df = self.df.merge(
-            all_stats[home_merge_cols].rename(columns={c: f'Home{c}' for c in home_merge_cols if c not in ['Date', 'Team']}),
-            left_on=['Date', 'HomeTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
+        rolled = pd.concat([avg.add_prefix('Avg').add_suffix(f'_{window}'), std.add_prefix('Std').add_suffix(f'_{window}')], axis=1)
         
-        # For Away Team
-        away_merge_cols = ['Date', 'Team'] +  [f'Avg{m}_{window}' for m in metrics if f'Avg{m}_{window}' in all_stats] + [f'Std{m}_{window}' for m in metrics if f'Std{m}_{window}' in all_stats]
-        self.df = self.df.merge(
-            all_stats[away_merge_cols].rename(columns={c: f'Away{c}' for c in away_merge_cols if c not in ['Date', 'Team']}),
-            left_on=['Date', 'AwayTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
+        # Write back to match rows (Home / Away perspective)
+        home_vals, away_vals = table.to_matches(rolled)
+        for c in rolled.columns:
+            self.df[f'Home{c}'] = home_vals[c].to_numpy()
+        for c in rolled.columns:
+            self.df[f'Away{c}'] = away_vals[c].to_numpy()
         
         # --- FIX: Alias columns without window suffix for compatibility with Strategies ---
         # e.g. HomeAvgGoalsFor_5 -> HomeAvgGoalsFor
@@ -246,47 +174,46 @@ class FeatureEngineer:
         all_stats['IsCleanSheet'] = (all_stats['GoalsAgainst'] == 0).astype(int)
         all_stats['IsWin'] = (all_stats['GoalsFor'] > all_stats['GoalsAgainst']).astype(int)
         all_stats['IsLoss'] = (all_stats['GoalsFor'] < all_stats['GoalsAgainst']).astype(int)
+        rate_cols = ['IsOver25', 'IsBTTS', 'IsCleanSheet', 'IsWin', 'IsLoss']
+        
+        # --- NEW: Half-time events (NaN where the half score is missing, so it doesn't count) ---
+        if 'HTGoalsFor' in all_stats.columns:
+            ht_total = all_stats['HTGoalsFor'] + all_stats['HTGoalsAgainst']
+            sh_total = all_stats['2HGoalsFor'] + all_stats['2HGoalsAgainst']
+            all_stats['IsHTOver05'] = (ht_total > 0.5).astype(float).where(ht_total.notna())
+            all_stats['IsHTScored'] = (all_stats['HTGoalsFor'] > 0).astype(float).where(ht_total.notna())
+            all_stats['Is2HOver05'] = (sh_total > 0.5).astype(float).where(sh_total.notna())
+            all_stats['Is2HOver15'] = (sh_total > 1.5).astype(float).where(sh_total.notna())
+            rate_cols += ['IsHTOver05', 'IsHTScored', 'Is2HOver05', 'Is2HOver15']
         
         # Calculate Rolling Means (Rates)
-        for metric in ['IsOver25', 'IsBTTS', 'IsCleanSheet', 'IsWin', 'IsLoss']:
-            all_stats[f'{metric}_Rate'] = all_stats.groupby('Team')[metric].transform(lambda x: x.shift(1).rolling(window=window, min_periods=3).mean())
+        rate_src = all_stats.groupby('Team', sort=False)[rate_cols].shift(1)
+        rolling = rate_src.groupby(all_stats['Team'], sort=False).rolling(window=window, min_periods=3)
+        rates = rolling.mean().reset_index(level=0, drop=True).sort_index()
+        sums = rolling.sum().reset_index(level=0, drop=True).sort_index()
         
         # Specific Aliases expected by Strategies
         # HomeOver25_Rate, HomeBTTS_Rate, HomeCleanSheet_Rate
         # HomeWinsLast5 -> Sum of IsWin
-        all_stats['WinsLast5'] = all_stats.groupby('Team')['IsWin'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=3).sum())
-        all_stats['LossesLast5'] = all_stats.groupby('Team')['IsLoss'].transform(lambda x: x.shift(1).rolling(window=window, min_periods=3).sum())
+        rate_feats = pd.DataFrame({
+            'Over25_Rate': rates['IsOver25'],
+            'BTTS_Rate': rates['IsBTTS'],
+            'CleanSheet_Rate': rates['IsCleanSheet'],
+            'WinsLast5': sums['IsWin'],
+            'LossesLast5': sums['IsLoss']
+        })
+        if 'IsHTOver05' in rates.columns:
+            rate_feats['HTOver05_Rate'] = rates['IsHTOver05']
+            rate_feats['HTScored_Rate'] = rates['IsHTScored']
+            rate_feats['2HOver05_Rate'] = rates['Is2HOver05']
+            rate_feats['2HOver15_Rate'] = rates['Is2HOver15']
         
         # Merge back Rate Features
-        rate_cols = ['IsOver25_Rate', 'IsBTTS_Rate', 'IsCleanSheet_Rate', 'WinsLast5', 'LossesLast5']
-        
-        # For Home
-        self.df = self.df.merge(
-             all_stats[['Date', 'Team'] + rate_cols].rename(columns={
-                 'IsOver25_Rate': 'HomeOver25_Rate',
-                 'IsBTTS_Rate': 'HomeBTTS_Rate', 
-                 'IsCleanSheet_Rate': 'HomeCleanSheet_Rate',
-                 'WinsLast5': 'HomeWinsLast5',
-                 'LossesLast5': 'HomeLossesLast5'
-             }),
-             left_on=['Date', 'HomeTeam'],
-             right_on=['Date', 'Team'],
-             how='left'
-        ).drop(columns=['Team'])
-        
-        # For Away
-        self.df = self.df.merge(
-             all_stats[['Date', 'Team'] + rate_cols].rename(columns={
-                 'IsOver25_Rate': 'AwayOver25_Rate',
-                 'IsBTTS_Rate': 'AwayBTTS_Rate', 
-                 'IsCleanSheet_Rate': 'AwayCleanSheet_Rate',
-                 'WinsLast5': 'AwayWinsLast5',
-                 'LossesLast5': 'AwayLossesLast5'
-             }),
-             left_on=['Date', 'AwayTeam'],
-             right_on=['Date', 'Team'],
-             how='left'
-        ).drop(columns=['Team'])
+        home_vals, away_vals = table.to_matches(rate_feats)
+        for c in rate_feats.columns:
+            self.df[f'Home{c}'] = home_vals[c].to_numpy()
+        for c in rate_feats.columns:
+            self.df[f'Away{c}'] = away_vals[c].to_numpy()
         
         # --- NEW: Aliases for Strategy Compatibility ---
         
@@ -328,37 +255,20 @@ class FeatureEngineer:
         """
         print(f"Calculating Recent Form PPG (Window={window})...")
         
-        # 1. Structure Data: Date, Team, Points
-        home_pts = self.df[['Date', 'HomeTeam', 'FTR']].copy()
-        home_pts['Points'] = home_pts['FTR'].map({'H': 3, 'D': 1, 'A': 0})
-        home_pts = home_pts.rename(columns={'HomeTeam': 'Team'})
-        
-        away_pts = self.df[['Date', 'AwayTeam', 'FTR']].copy()
-        away_pts['Points'] = away_pts['FTR'].map({'A': 3, 'D': 1, 'H': 0})
-        away_pts = away_pts.rename(columns={'AwayTeam': 'Team'})
-        
-        all_pts = pd.concat([home_pts[['Date', 'Team', 'Points']], away_pts[['Date', 'Team', 'Points']]])
-        all_pts = all_pts.sort_values(['Team', 'Date'])
+        # 1. Points per team-match from the shared table (sorted by Team, Date)
+        self.df = self.df.reset_index(drop=True)
+        table = TeamMatchTable.get(self.df)
+        all_pts = table.frame[['Team', 'Points']]
         
         # 2. Calculate Rolling PPG (Shift 1 to avoid lookahead) WITH EMA
-        all_pts['RollingPPG'] = all_pts.groupby('Team')['Points'].transform(lambda x: x.shift(1).ewm(span=window, min_periods=1).mean())
-        
-        # 3. Merge back
-        # Home Form
-        self.df = self.df.merge(
-            all_pts[['Date', 'Team', 'RollingPPG']].rename(columns={'RollingPPG': 'HomePPG'}),
-            left_on=['Date', 'HomeTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
+        shifted = all_pts.groupby('Team', sort=False)['Points'].shift(1)
+        rolling_ppg = shifted.groupby(all_pts['Team'], sort=False).ewm(span=window, min_periods=1).mean()
+        rolling_ppg = rolling_ppg.reset_index(level=0, drop=True).sort_index()
         
-        # Away Form
-        self.df = self.df.merge(
-            all_pts[['Date', 'Team', 'RollingPPG']].rename(columns={'RollingPPG': 'AwayPPG'}),
-            left_on=['Date', 'AwayTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
+        # 3. Write back (Home Form / Away Form)
+        home_vals, away_vals = table.to_matches(rolling_ppg.rename('RollingPPG'))
+        self.df['HomePPG'] = home_vals['RollingPPG'].to_numpy()
+        self.df['AwayPPG'] = away_vals['RollingPPG'].to_numpy()
         
         # Fill NA (First games) with 1.35 (roughly average)
         self.df[['HomePPG', 'AwayPPG']] = self.df[['HomePPG', 'AwayPPG']].fillna(1.35)
@@ -374,30 +284,22 @@ class FeatureEngineer:
         # We need a lookup of Team+Date -> RollingPPG (Entering the match)
         # We can use the already calculated 'HomePPG' and 'AwayPPG' but mapped to the team.
         
-        # 1. Create a "Team Performance" master list
-        h_perf = self.df[['Date', 'HomeTeam', 'AwayTeam', 'AwayPPG']].rename(columns={'HomeTeam': 'Team', 'AwayTeam': 'Opponent', 'AwayPPG': 'Opp_PPG'})
-        a_perf = self.df[['Date', 'AwayTeam', 'HomeTeam', 'HomePPG']].rename(columns={'AwayTeam': 'Team', 'HomeTeam': 'Opponent', 'HomePPG': 'Opp_PPG'})
-        
-        all_perf = pd.concat([h_perf, a_perf]).sort_values(['Team', 'Date'])
+        # 1. Opponent PPG (entering the match) for every team-match
+        self.df = self.df.reset_index(drop=True)
+        table = TeamMatchTable.get(self.df)
+        teams = table.frame['Team']
+        opp_ppg = pd.Series(table.from_matches(self.df['AwayPPG'], self.df['HomePPG']), dtype=float)
         
         # 2. Rolling Average of Opponent PPG (EMA)
         # "In the last 5 games, what was the weighted average strength of teams I played?"
-        all_perf['AvgOpponentStrength'] = all_perf.groupby('Team')['Opp_PPG'].transform(lambda x: x.shift(1).ewm(span=window, min_periods=1).mean())
-        
-        # 3. Merge back
-        self.df = self.df.merge(
-            all_perf[['Date', 'Team', 'AvgOpponentStrength']].rename(columns={'AvgOpponentStrength': 'HomeOppDifficulty'}),
-            left_on=['Date', 'HomeTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
-        
-        self.df = self.df.merge(
-            all_perf[['Date', 'Team', 'AvgOpponentStrength']].rename(columns={'AvgOpponentStrength': 'AwayOppDifficulty'}),
-            left_on=['Date', 'AwayTeam'],
-            right_on=['Date', 'Team'],
-            how='left'
-        ).drop(columns=['Team'])
+        shifted = opp_ppg.groupby(teams, sort=False).shift(1)
+        strength = shifted.groupby(teams, sort=False).ewm(span=window, min_periods=1).mean()
+        strength = strength.reset_index(level=0, drop=True).sort_index()
+        
+        # 3. Write back
+        home_vals, away_vals = table.to_matches(strength.rename('AvgOpponentStrength'))
+        self.df['HomeOppDifficulty'] = home_vals['AvgOpponentStrength'].to_numpy()
+        self.df['AwayOppDifficulty'] = away_vals['AvgOpponentStrength'].to_numpy()
         
         # Fill NA
         self.df[['HomeOppDifficulty', 'AwayOppDifficulty']] = self.df[['HomeOppDifficulty', 'AwayOppDifficulty']].fillna(1.35)
@@ -0,0 +1,259 @@
+import pandas as pd
+import numpy as np
+
+
+class GoalModel:
+    """
+    Dixon-Coles style goal model.
+
+    Each team gets an attack and a defence rating (plus a home advantage and a
+    low-score correlation rho per league):
+
+        HomeGoals ~ Poisson(home_adv * att[home] * def[away])
+        AwayGoals ~ Poisson(att[away] * def[home])
+
+    Predictions are full scoreline probability matrices, so every goals market
+    (1X2, totals, BTTS, team totals, correct score) is read from the same numbers.
+    """
+    MAX_GOALS = 10
+    DECAY_RATE = 0.003 # Same recency decay as MLEngine (match 1 year ago ~ 33% weight)
+    MAX_ITER = 200
+    TOL = 1e-6
+    RHO_GRID = np.linspace(-0.2, 0.2, 41)
+    TOTAL_LINES = [0.5, 1.5, 2.5, 3.5, 4.5]
+    TEAM_LINES = [0.5, 1.5, 2.5]
+
+    def __init__(self):
+        self.teams = pd.Index([])
+        self.att = np.array([])
+        self.defn = np.array([])
+        self.home_adv = np.array([]) # Per team, from its league
+        self.rho = np.array([])
+        self.league_params = {} # {Div: {'home_adv', 'rho', 'avg_goals', 'matches'}}
+        self.default_home_adv = 1.3
+        self.default_rho = 0.0
+        self.is_fitted = False
+
+    # --- FIT ---
+
+    def fit(self, df):
+        """
+        Fits ratings on played matches (one independent fit per Div if present).
+        Returns self.
+        """
+        if df.empty or 'FTHG' not in df.columns:
+            return self
+
+        played = df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+        if played.empty:
+            return self
+
+        if 'Date' in played.columns:
+            dates = pd.to_datetime(played['Date'], errors='coerce')
+            days_ago = (dates.max() - dates).dt.days.fillna(0).to_numpy(dtype=float)
+        else:
+            days_ago = np.zeros(len(played))
+        weights = np.exp(-self.DECAY_RATE * days_ago)
+
+        leagues = played['Div'].fillna('?').to_numpy() if 'Div' in played.columns else np.full(len(played), '?')
+
+        att, defn, home_adv, rho, names, last_seen = [], [], [], [], [], []
+        self.league_params = {}
+        for div in pd.unique(leagues):
+            mask = leagues == div
+            lg = played[mask]
+            res = self._fit_league(
+                lg['HomeTeam'].to_numpy(), lg['AwayTeam'].to_numpy(),
+                lg['FTHG'].to_numpy(dtype=float), lg['FTAG'].to_numpy(dtype=float),
+                weights[mask]
+            )
+            if res is None:
+                continue
+            teams, a, d, h, r = res
+            # Days since the team's last match in this league
+            ago = days_ago[mask]
+            seen = pd.concat([pd.Series(ago, index=lg['HomeTeam'].to_numpy()),
+                              pd.Series(ago, index=lg['AwayTeam'].to_numpy())]).groupby(level=0).min()
+            last_seen.extend(seen.reindex(teams).to_numpy())
+            names.extend(teams)
+            att.extend(a)
+            defn.extend(d)
+            home_adv.extend([h] * len(teams))
+            rho.extend([r] * len(teams))
+            self.league_params[div] = {'home_adv': h, 'rho': r, 'matches': int(mask.sum()),
+                                       'avg_goals': float((lg['FTHG'] + lg['FTAG']).mean())}
+
+        if not names:
+            return self
+
+        params = pd.DataFrame({'att': att, 'def': defn, 'home_adv': home_adv, 'rho': rho, 'ago': last_seen}, index=names)
+        # A team appearing in several leagues (promotion) keeps the fit of the league it played in last
+        params = params.sort_values('ago', ascending=False, kind='stable')
+        params = params[~params.index.duplicated(keep='last')]
+        self.teams = params.index
+        self.att = params['att'].to_numpy()
+        self.defn = params['def'].to_numpy()
+        self.home_adv = params['home_adv'].to_numpy()
+        self.rho = params['rho'].to_numpy()
+
+        lp = pd.DataFrame(self.league_params).T
+        self.default_home_adv = float(np.average(lp['home_adv'], weights=lp['matches']))
+        self.default_rho = float(np.average(lp['rho'], weights=lp['matches']))
+        self.is_fitted = True
+        return self
+
+    def _fit_league(self, home, away, hg, ag, w):
+        """
+        Weighted Poisson MLE by cyclic multiplicative updates (each step is the closed-form
+        optimum for one parameter block), then a grid search for rho.
+        """
+        codes, teams = pd.factorize(np.concatenate([home, away]))
+        n = len(home)
+        if n == 0 or len(teams) < 2:
+            return None
+        hi, ai = codes[:n], codes[n:]
+        k = len(teams)
+
+        # Weighted goals scored / conceded per team (fixed across iterations)
+        scored = np.bincount(hi, w * hg, k) + np.bincount(ai, w * ag, k)
+        conceded = np.bincount(hi, w * ag, k) + np.bincount(ai, w * hg, k)
+        total_hg, total_ag = (w * hg).sum(), (w * ag).sum()
+
+        att, defn = np.ones(k), np.ones(k)
+        home_adv = max(total_hg, 1e-9) / max(total_ag, 1e-9)
+        eps = 1e-9
+
+        for _ in range(self.MAX_ITER):
+            att_old, def_old = att, defn
+
+            # att_i = goals_i / sum over matches of (home_adv?) * def_opp
+            exposure = np.bincount(hi, w * home_adv * defn[ai], k) + np.bincount(ai, w * defn[hi], k)
+            att = scored / (exposure + eps)
+            att = att / att[att > 0].mean() if (att > 0).any() else np.ones(k)
+
+            exposure = np.bincount(hi, w * att[ai], k) + np.bincount(ai, w * home_adv * att[hi], k)
+            defn = conceded / (exposure + eps)
+
+            home_adv = total_hg / ((w * att[hi] * defn[ai]).sum() + eps)
+
+            if max(np.abs(att - att_old).max(), np.abs(defn - def_old).max()) < self.TOL:
+                break
+
+        # Teams that never scored/conceded would get a zero rate; keep a small floor
+        att = np.maximum(att, 0.05)
+        defn = np.maximum(defn, 0.05)
+
+        lam = home_adv * att[hi] * defn[ai]
+        mu = att[ai] * defn[hi]
+        rho = self._fit_rho(hg, ag, lam, mu, w)
+        return list(teams), att, defn, float(home_adv), rho
+
+    def _fit_rho(self, hg, ag, lam, mu, w):
+        """rho only enters the likelihood through tau on 0-0, 1-0, 0-1 and 1-1 scores."""
+        low = (hg <= 1) & (ag <= 1)
+        if not low.any():
+            return 0.0
+        x, y, l, m, ww = hg[low], ag[low], lam[low], mu[low], w[low]
+        r = self.RHO_GRID[:, None]
+        tau = np.where((x == 0) & (y == 0), 1 - l * m * r,
+              np.where((x == 0) & (y == 1), 1 + l * r,
+              np.where((x == 1) & (y == 0), 1 + m * r, 1 - r)))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ll = np.where(tau > 0, np.log(tau), -np.inf) @ ww
+        return float(self.RHO_GRID[np.argmax(ll)])
+
+    # --- PREDICT ---
+
+    def _lookup(self, teams):
+        idx = self.teams.get_indexer(pd.Index(teams))
+        known = idx >= 0
+        safe = np.where(known, idx, 0)
+        return safe, known
+
+    def expected_goals(self, home_teams, away_teams):
+        """Expected home/away goals arrays. Unknown teams get league-average ratings."""
+        home_teams, away_teams = np.atleast_1d(home_teams), np.atleast_1d(away_teams)
+        if not self.is_fitted:
+            n = len(home_teams)
+            return np.full(n, 1.5), np.full(n, 1.2), np.zeros(n)
+
+        h, h_ok = self._lookup(home_teams)
+        a, a_ok = self._lookup(away_teams)
+        att_h = np.where(h_ok, self.att[h], 1.0)
+        def_h = np.where(h_ok, self.defn[h], 1.0)
+        att_a = np.where(a_ok, self.att[a], 1.0)
+        def_a = np.where(a_ok, self.defn[a], 1.0)
+        home_adv = np.where(h_ok, self.home_adv[h], np.where(a_ok, self.home_adv[a], self.default_home_adv))
+        rho = np.where(h_ok, self.rho[h], np.where(a_ok, self.rho[a], self.default_rho))
+        return home_adv * att_h * def_a, att_a * def_h, rho
+
+    def score_matrix(self, home_teams, away_teams):
+        """
+        Scoreline probabilities, shape (n_fixtures, MAX_GOALS+1, MAX_GOALS+1).
+        [k, i, j] = P(home scores i, away scores j) for fixture k.
+        """
+        lam, mu, rho = self.expected_goals(home_teams, away_teams)
+        goals = np.arange(self.MAX_GOALS + 1)
+        log_fact = np.cumsum(np.log(np.maximum(goals, 1)))
+
+        def pmf(rate):
+            rate = np.maximum(rate, 1e-6)[:, None]
+            return np.exp(goals * np.log(rate) - rate - log_fact)
+
+        m = pmf(lam)[:, :, None] * pmf(mu)[:, None, :]
+
+        # Dixon-Coles correction of the low scores
+        m[:, 0, 0] *= 1 - lam * mu * rho
+        m[:, 0, 1] *= 1 + lam * rho
+        m[:, 1, 0] *= 1 + mu * rho
+        m[:, 1, 1] *= 1 - rho
+
+        m = np.clip(m, 0, None)
+        return m / m.sum(axis=(1, 2), keepdims=True)
+
+    def markets(self, home_teams, away_teams):
+        """
+        All goal markets for a slate of fixtures in one DataFrame (one row per fixture).
+        Probabilities are 0-1 floats.
+        """
+        home_teams, away_teams = np.atleast_1d(home_teams), np.atleast_1d(away_teams)
+        m = self.score_matrix(home_teams, away_teams)
+        n, g = m.shape[0], m.shape[1]
+        i, j = np.indices((g, g))
+
+        home_marg = m.sum(axis=2)
+        away_marg = m.sum(axis=1)
+        # Total goals distribution: sum each anti-diagonal
+        totals = m.reshape(n, -1) @ np.eye(2 * g - 1)[(i + j).ravel()]
+
+        out = {
+            'HomeTeam': home_teams,
+            'AwayTeam': away_teams,
+            'ExpHomeGoals': home_marg @ np.arange(g),
+            'ExpAwayGoals': away_marg @ np.arange(g),
+            'HomeWin': (m * (i > j)).sum(axis=(1, 2)),
+            'Draw': np.trace(m, axis1=1, axis2=2),
+            'AwayWin': (m * (i < j)).sum(axis=(1, 2)),
+            'BTTS': 1 - home_marg[:, 0] - away_marg[:, 0] + m[:, 0, 0],
+        }
+
+        total_cdf = np.cumsum(totals, axis=1)
+        for line in self.TOTAL_LINES:
+            out[f'Over{line}'] = 1 - total_cdf[:, int(line)]
+            out[f'Under{line}'] = total_cdf[:, int(line)]
+
+        home_cdf, away_cdf = np.cumsum(home_marg, axis=1), np.cumsum(away_marg, axis=1)
+        for line in self.TEAM_LINES:
+            out[f'HomeOver{line}'] = 1 - home_cdf[:, int(line)]
+            out[f'AwayOver{line}'] = 1 - away_cdf[:, int(line)]
+
+        # Most likely correct score
+        flat = m.reshape(n, -1).argmax(axis=1)
+        out['CS_Home'], out['CS_Away'] = np.divmod(flat, g)
+        out['CS_Prob'] = m.reshape(n, -1).max(axis=1)
+
+        return pd.DataFrame(out)
+
+    def predict(self, home_team, away_team):
+        """Markets dict for one fixture."""
+        return self.markets([home_team], [away_team]).iloc[0].to_dict()
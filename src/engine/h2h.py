@@ -1,66 +1,95 @@
-
 import pandas as pd
+import numpy as np
+from src.utils.cache import frame_version, VersionedLRU
 
 class H2HManager:
+    """
+    Head-to-head lookups over the match history.
+
+    Matches are indexed by unordered pair (min(team), max(team)) -> row positions
+    (newest first), and the pair summaries are aggregated once at build time,
+    so both lookups are a dict access. Use `H2HManager.get(data)` to share one
+    index per data version across renders.
+    """
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
     def __init__(self, data):
         self.data = data.copy()
+        if self.data.empty or 'HomeTeam' not in self.data.columns:
+            self._pairs, self._summaries = {}, {}
+            return
         # Ensure Date is datetime
-        if not pd.api.types.is_datetime64_any_dtype(self.data['Date']):
-            self.data['Date'] = pd.to_datetime(self.data['Date'], dayfirst=True)
+        if 'Date' in self.data.columns:
+            if not pd.api.types.is_datetime64_any_dtype(self.data['Date']):
+                self.data['Date'] = pd.to_datetime(self.data['Date'], dayfirst=True)
+            self.data = self.data.sort_values('Date', ascending=False, kind='stable')
+
+        home = self.data['HomeTeam'].astype(str).to_numpy()
+        away = self.data['AwayTeam'].astype(str).to_numpy()
+        lo, hi = np.where(home <= away, home, away), np.where(home <= away, away, home)
+        self._pairs = pd.Series(np.arange(len(self.data))).groupby([lo, hi]).indices
+        self._summaries = self._build_summaries(home, away, lo, hi)
+
+    @staticmethod
+    def version(data):
+        return frame_version(data, ['HomeTeam', 'AwayTeam', 'Date', 'FTHG', 'FTAG', 'FTR'])
+
+    @classmethod
+    def get(cls, data):
+        """Shared manager for this data (index built once per data version)."""
+        return cls._cache.get_or_build(cls.version(data), lambda: cls(data))
+
+    def _build_summaries(self, home, away, lo, hi):
+        """Per pair totals, oriented to the first team of the (lo, hi) key."""
+        lo_home = home == lo
+        hg = pd.to_numeric(self.data['FTHG'], errors='coerce').fillna(0).to_numpy() if 'FTHG' in self.data.columns else np.zeros(len(home))
+        ag = pd.to_numeric(self.data['FTAG'], errors='coerce').fillna(0).to_numpy() if 'FTAG' in self.data.columns else np.zeros(len(home))
+        ftr = self.data['FTR'].to_numpy() if 'FTR' in self.data.columns else np.full(len(home), None)
+
+        totals = pd.DataFrame({
+            'Matches': 1,
+            'LoWins': ((ftr == 'H') & lo_home) | ((ftr == 'A') & ~lo_home),
+            'HiWins': ((ftr == 'A') & lo_home) | ((ftr == 'H') & ~lo_home),
+            'Draws': ftr == 'D',
+            'LoGoals': np.where(lo_home, hg, ag),
+            'HiGoals': np.where(lo_home, ag, hg),
+        }).groupby([lo, hi]).sum()
+        return dict(zip(totals.index, totals.to_dict('records')))
+
+    def _key(self, team_a, team_b):
+        a, b = str(team_a), str(team_b)
+        return (a, b) if a <= b else (b, a)
 
     def get_h2h_matches(self, home_team, away_team):
         """
-        Retrieves all matches between two teams from the loaded history.
+        Retrieves all matches between two teams from the loaded history (newest first).
         """
-        mask = (
-            ((self.data['HomeTeam'] == home_team) & (self.data['AwayTeam'] == away_team)) |
-            ((self.data['HomeTeam'] == away_team) & (self.data['AwayTeam'] == home_team))
-        )
-        matches = self.data[mask].sort_values('Date', ascending=False)
-        return matches
+        rows = self._pairs.get(self._key(home_team, away_team))
+        if rows is None:
+            return self.data.iloc[0:0]
+        return self.data.iloc[rows]
 
     def get_h2h_summary(self, home_team, away_team):
         """
         Returns a summary dictionary (Wins, Draws, Goals).
         """
-        matches = self.get_h2h_matches(home_team, away_team)
-        if matches.empty:
+        key = self._key(home_team, away_team)
+        totals = self._summaries.get(key)
+        if totals is None:
             return None
 
-        summary = {
-            'Matches': len(matches),
-            'HomeWins': 0, # Wins for the requested 'home_team'
-            'AwayWins': 0, # Wins for the requested 'away_team'
-            'Draws': 0,
-            'HomeGoals': 0,
-            'AwayGoals': 0
+        # Home* refers to the requested 'home_team', whichever side it played on
+        first = key[0] == str(home_team)
+        return {
+            'Matches': int(totals['Matches']),
+            'HomeWins': int(totals['LoWins'] if first else totals['HiWins']),
+            'AwayWins': int(totals['HiWins'] if first else totals['LoWins']),
+            'Draws': int(totals['Draws']),
+            'HomeGoals': totals['LoGoals'] if first else totals['HiGoals'],
+            'AwayGoals': totals['HiGoals'] if first else totals['LoGoals']
         }
 
-        for _, row in matches.iterrows():
-            res = row['FTR']
-            h = row['HomeTeam']
-            a = row['AwayTeam']
-            hg = row['FTHG']
-            ag = row['FTAG']
-
-            # Goals
-            if h == home_team:
-                summary['HomeGoals'] += hg
-                summary['AwayGoals'] += ag
-            else:
-                summary['HomeGoals'] += ag
-                summary['AwayGoals'] += hg
-
-            # Result
-            if res == 'D':
-                summary['Draws'] += 1
-            elif (h == home_team and res == 'H') or (h == away_team and res == 'A'):
-                summary['HomeWins'] += 1
-            else:
-                summary['AwayWins'] += 1
-                
-        return summary
-
     def format_for_display(self, matches):
         """
         Returns a styled DataFrame for UI display (Spanish headers).
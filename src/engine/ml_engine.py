@@ -4,13 +4,33 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.impute import SimpleImputer
 import warnings
 import os
-import joblib
+import copy
+import hashlib
+import threading
+from src.engine.model_registry import ModelRegistry
+from src.engine.team_matches import TeamMatchTable
 
 # Suppress sklearn warnings for cleaner output
 warnings.filterwarnings('ignore')
 
 class MLEngine:
-    MODEL_PATH = os.path.join(os.path.dirname(__file__), 'trained_model.pkl')
+    # Forest hyperparameters (part of the registry schema hash)
+    CLF_PARAMS = {'max_depth': 8, 'min_samples_split': 10, 'random_state': 42}
+    REG_PARAMS = {'max_depth': 8, 'min_samples_leaf': 5, 'random_state': 42}
+    IMPUTER_KEY = '_imputer'
+    
+    # Training matrices (X, y) by data hash, shared across engine instances so a
+    # retrain on unchanged history skips feature generation.
+    _MATRIX_CACHE = {}
+    MATRIX_CACHE_SIZE = 2
+    STAT_COLS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HST', 'AST', 'HC', 'AC']
+    
+    # Forest size for a full retrain, and trees appended per incremental refresh
+    N_ESTIMATORS = 60
+    WARM_START_TREES = 10
+    # Incremental trees are grown on the new matchdays plus this much trailing history,
+    # so they don't overfit a single round of fixtures.
+    INCREMENTAL_WINDOW_DAYS = 180
     
     def __init__(self):
         self.models = {}
@@ -26,79 +46,71 @@ class MLEngine:
             'HomeExpG_Raw', 'AwayExpG_Raw',
             'IsTopClash', 'IsDefensiveLock'
         ]
+        # Targets are column expressions over the whole training frame
         self.targets = {
-            'ML_HomeWin': lambda row: 1 if row['FTHG'] > row['FTAG'] else 0,
-            'ML_AwayWin': lambda row: 1 if row['FTAG'] > row['FTHG'] else 0,
-            'ML_Draw': lambda row: 1 if row['FTHG'] == row['FTAG'] else 0,
-            'ML_Over25': lambda row: 1 if (row['FTHG'] + row['FTAG']) > 2.5 else 0,
-            'ML_Over15': lambda row: 1 if (row['FTHG'] + row['FTAG']) > 1.5 else 0,
-            'ML_BTTS': lambda row: 1 if (row['FTHG'] > 0) and (row['FTAG'] > 0) else 0
+            'ML_HomeWin': lambda df: (df['FTHG'] > df['FTAG']).astype(int),
+            'ML_AwayWin': lambda df: (df['FTAG'] > df['FTHG']).astype(int),
+            'ML_Draw': lambda df: (df['FTHG'] == df['FTAG']).astype(int),
+            'ML_Over25': lambda df: ((df['FTHG'] + df['FTAG']) > 2.5).astype(int),
+            'ML_Over15': lambda df: ((df['FTHG'] + df['FTAG']) > 1.5).astype(int),
+            'ML_BTTS': lambda df: ((df['FTHG'] > 0) & (df['FTAG'] > 0)).astype(int)
         }
         self.reg_targets = {
-            'REG_HomeGoals': lambda row: row['FTHG'],
-            'REG_AwayGoals': lambda row: row['FTAG']
+            'REG_HomeGoals': lambda df: df['FTHG'],
+            'REG_AwayGoals': lambda df: df['FTAG']
         }
         self.is_trained = False
         self.imputer = SimpleImputer(strategy='mean')
+        self.trained_until = None # Last match date seen by the current forests
+        self.data_range = None # Range of history the current forests were trained on
+        self.model_key = None # Registry version currently loaded/saved
+        self.registry = ModelRegistry()
+        
+        # Guards the model swap done by background retrains
+        self._lock = threading.Lock()
+        self._retrain_thread = None
 
     def _calculate_expanding_stats(self, df):
         """
         Calculates historical stats (PPG, AvgGoals) for training.
         This effectively replays history to generate stats 'as known before the match'.
         """
-        # We need to construct a dataset where each row has the stats ENTERING the match.
-        # This is expensive to do row-by-row.
-        # Optimized approach: Group by Team, calculate shifting expanding mean.
-        
-        # 1. Create long-form stats (one row per team per match)
-        home_cols = ['Date', 'HomeTeam', 'FTHG', 'FTAG', 'FTR', 'HST', 'AST', 'HC', 'AC']
-        away_cols = ['Date', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HST', 'AST', 'HC', 'AC']
-        
-        # Safe column selection (some CSVs might lack HST/AST/HC)
-        cols_available = df.columns.tolist()
-        h_sel = [c for c in home_cols if c in cols_available]
-        a_sel = [c for c in away_cols if c in cols_available]
-        
-        home_df = df[h_sel].rename(columns={'HomeTeam': 'Team', 'FTHG': 'GoalsFor', 'FTAG': 'GoalsAgainst', 'HST': 'ShotsFor', 'AST': 'ShotsAgainst', 'HC': 'CornersFor', 'AC': 'CornersAgainst'})
-        home_df['IsHome'] = 1
-        home_df['Points'] = home_df['FTR'].map({'H': 3, 'D': 1, 'A': 0}) if 'FTR' in df.columns else 0 # Fallback
-        
-        away_df = df[a_sel].rename(columns={'AwayTeam': 'Team', 'FTAG': 'GoalsFor', 'FTHG': 'GoalsAgainst', 'AST': 'ShotsFor', 'HST': 'ShotsAgainst', 'AC': 'CornersFor', 'HC': 'CornersAgainst'})
-        away_df['IsHome'] = 0
-        away_df['Points'] = df['FTR'].map({'A': 3, 'D': 1, 'H': 0}) if 'FTR' in df.columns else 0
-
-        # Combine
-        full_df = pd.concat([home_df, away_df]).sort_values('Date')
+        # Each row needs the stats ENTERING the match. On the shared team-match table
+        # (team blocks in date order) that is (cumsum - current) / (count - current).
+        n = len(df)
+        training_df = df.copy()
+        if n == 0:
+            return training_df
+            
+        table = TeamMatchTable.get(df)
         
-        # 2. Calculate Expanding Means (Shifted by 1 to exclude current match)
-        metrics = full_df.groupby('Team')[['GoalsFor', 'GoalsAgainst', 'Points', 'ShotsFor', 'CornersFor']].transform(
-            lambda x: x.expanding().mean().shift(1)
-        )
+        def col(name):
+            # Some CSVs lack HST/AST/HC
+            return pd.to_numeric(pd.Series(table.column(name)), errors='coerce').to_numpy(dtype=float)
         
-        full_df['AvgGoalsFor'] = metrics['GoalsFor']
-        full_df['AvgGoalsAgainst'] = metrics['GoalsAgainst']
-        full_df['PPG'] = metrics['Points'] 
-        full_df['AvgShots'] = metrics['ShotsFor']
-        if 'CornersFor' in metrics: full_df['AvgCornersFor'] = metrics['CornersFor']
-        else: full_df['AvgCornersFor'] = 0
+        points = col('Points') if 'FTR' in df.columns else np.zeros(len(table.frame))
+        values = np.column_stack([col('GoalsFor'), col('GoalsAgainst'), points, col('ShotsTargetFor'), col('CornersFor')])
         
-        # 3. Join back to original structure
-        stats_home = full_df[full_df['IsHome'] == 1][['AvgGoalsFor', 'AvgGoalsAgainst', 'PPG', 'AvgShots', 'AvgCornersFor']]
-        stats_home.columns = ['HomeAvgGoalsFor', 'HomeAvgGoalsAgainst', 'HomePPG', 'HomeAvgShots', 'HomeAvgCornersFor']
-        # Map ShotsFor to ShotsTarget for naming consistency with new feature list, 
-        # though HST is technically ShotsTarget, so naming it AvgShotsTargetFor is more accurate.
-        stats_home = stats_home.rename(columns={'HomeAvgShots': 'HomeAvgShotsTargetFor'}) 
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
         
-        stats_away = full_df[full_df['IsHome'] == 0][['AvgGoalsFor', 'AvgGoalsAgainst', 'PPG', 'AvgShots', 'AvgCornersFor']]
-        stats_away.columns = ['AwayAvgGoalsFor', 'AwayAvgGoalsAgainst', 'AwayPPG', 'AwayAvgShots', 'AwayAvgCornersFor']
-        stats_away = stats_away.rename(columns={'AwayAvgShots': 'AwayAvgShotsTargetFor'})
+        def prior_totals(x):
+            # Cumulative sum within each team block, excluding the current match
+            csum = np.cumsum(x, axis=0)
+            base = np.repeat(csum[table.starts] - x[table.starts], table.ends - table.starts, axis=0)
+            return csum - base - x
         
-        training_df = df.copy()
-        training_df = pd.merge(training_df, stats_home, left_index=True, right_index=True, how='left', suffixes=('', '_dup'))
-        training_df = training_df[[c for c in training_df.columns if not c.endswith('_dup')]]
+        prior_cnt = prior_totals(present.astype(float))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            prior_mean = np.where(prior_cnt > 0, prior_totals(filled) / prior_cnt, np.nan)
         
-        training_df = pd.merge(training_df, stats_away, left_index=True, right_index=True, how='left', suffixes=('', '_dup'))
-        training_df = training_df[[c for c in training_df.columns if not c.endswith('_dup')]]
+        names = ['AvgGoalsFor', 'AvgGoalsAgainst', 'PPG', 'AvgShotsTargetFor', 'AvgCornersFor']
+        home, away = table.to_matches(pd.DataFrame(prior_mean, columns=names))
+        for side, block in (('Home', home), ('Away', away)):
+            for name in names:
+                # Columns already present in the input win (same as the old merge + '_dup' strip)
+                if f"{side}{name}" not in training_df.columns:
+                    training_df[f"{side}{name}"] = block[name].to_numpy()
         
         # --- NEW FEATURES (Context) ---
         # 1. Expected Goals (Interaction)
@@ -114,76 +126,263 @@ class MLEngine:
         training_df = training_df.dropna(subset=['HomePPG', 'AwayPPG'])
         return training_df
         
-    def train_models(self, historical_data):
+    def _sample_weights(self, dates):
         """
-        Trains random forest models for all targets.
+        Time decay weights based on recency.
+        Weight = exp(-decay_rate * days_ago)
         """
-        if historical_data.empty:
-            return {"error": "No data"}
+        dates = pd.to_datetime(dates)
+        max_date = dates.max()
+        days_ago = (max_date - dates).dt.days
+        
+        # Decay Rate: 0.002 means a match 1 year ago has ~48% weight of today
+        # 0.001 means ~69%
+        # User wants "State of Form" -> Higher emphasis on recent. Let's use 0.003
+        decay_rate = 0.003 
+        return np.exp(-decay_rate * days_ago)
+
+    def _data_range(self, historical_data):
+        """Identifies the slice of history a model is trained on (first/last played date, match count)."""
+        played = historical_data.dropna(subset=['FTHG', 'FTAG']) if 'FTHG' in historical_data.columns else historical_data
+        dates = pd.to_datetime(played['Date'], errors='coerce')
+        leagues = sorted(played['Div'].dropna().astype(str).unique()) if 'Div' in played.columns else []
+        return {
+            'start': str(dates.min().date()) if dates.notna().any() else None,
+            'end': str(dates.max().date()) if dates.notna().any() else None,
+            'rows': int(len(played)),
+            'leagues': leagues
+        }
+
+    @staticmethod
+    def _covers(trained, requested):
+        """
+        True if a model trained on `trained` (a data_range) can serve `requested`: same
+        leagues, trained from the requested start or earlier and not past the requested end
+        (the newer matchdays are then added by the incremental path).
+        """
+        if not trained or not requested or not trained.get('leagues'):
+            return False
+        if trained['leagues'] != requested.get('leagues'):
+            return False
+        if None in (trained.get('start'), trained.get('end'), requested.get('start'), requested.get('end')):
+            return False
+        return trained['start'] <= requested['start'] and trained['end'] <= requested['end']
+
+    def schema_hash(self):
+        return ModelRegistry.schema_hash(
+            self.feature_cols,
+            list(self.targets) + list(self.reg_targets),
+            {'clf': self.CLF_PARAMS, 'reg': self.REG_PARAMS, 'n_estimators': self.N_ESTIMATORS,
+             'warm_start_trees': self.WARM_START_TREES, 'window_days': self.INCREMENTAL_WINDOW_DAYS}
+        )
+
+    def has_new_matchdays(self, historical_data):
+        """
+        True if the history contains finished matches played after the last training run.
+        """
+        if self.trained_until is None or historical_data.empty or 'Date' not in historical_data.columns:
+            return False
+        played = historical_data.dropna(subset=['FTHG', 'FTAG']) if 'FTHG' in historical_data.columns else historical_data
+        latest = pd.to_datetime(played['Date'], errors='coerce').max()
+        return pd.notna(latest) and latest > self.trained_until
+
+    def _data_hash(self, historical_data):
+        """Content hash of the columns the training matrix is built from."""
+        cols = [c for c in self.STAT_COLS + self.feature_cols if c in historical_data.columns]
+        row_hashes = pd.util.hash_pandas_object(historical_data[cols], index=False).to_numpy()
+        h = hashlib.sha256(row_hashes.tobytes())
+        h.update(self.schema_hash().encode('utf-8'))
+        return h.hexdigest()
+
+    def _training_matrix(self, historical_data):
+        """
+        Feature matrix, targets and match dates for training. Returns None if there is
+        nothing to train on. Cached by data hash.
+        """
+        key = self._data_hash(historical_data)
+        cached = self._MATRIX_CACHE.get(key)
+        if cached is not None:
+            print("Training ML Models... Reusing cached features.")
+            return cached
             
         print("Training ML Models... Generating Features...")
         df_train = self._calculate_expanding_stats(historical_data)
-        
         if df_train.empty:
+            return None
+            
+        matrix = {
+            'X': df_train.reindex(columns=self.feature_cols, fill_value=0.0),
+            'y': {name: func(df_train) for name, func in {**self.targets, **self.reg_targets}.items()},
+            'dates': pd.to_datetime(df_train['Date'])
+        }
+        
+        cache = MLEngine._MATRIX_CACHE
+        while len(cache) >= self.MATRIX_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[key] = matrix
+        return matrix
+
+    def train_models(self, historical_data, incremental=False):
+        """
+        Trains random forest models for all targets.
+        
+        incremental: If the engine is already trained, keep the existing forests and
+                     append WARM_START_TREES trees fitted on the new matchdays only.
+                     Falls back to a full retrain when there is nothing to warm start from.
+        """
+        if historical_data.empty:
+            return {"error": "No data"}
+            
+        matrix = self._training_matrix(historical_data)
+        if matrix is None:
             return
             
-        X = df_train[self.feature_cols].copy()
+        latest_date = matrix['dates'].max()
+        data_range = self._data_range(historical_data)
         
-        for c in self.feature_cols:
-            if c not in X.columns:
-                X[c] = 0.0
+        if incremental and self.is_trained and self.trained_until is not None:
+            return self._train_incremental(matrix, latest_date, data_range)
+            
+        X = matrix['X']
         
-        X_imputed = self.imputer.fit_transform(X)
+        imputer = SimpleImputer(strategy='mean')
+        X_imputed = imputer.fit_transform(X)
         
         # --- TIME DECAY WEIGHTS ---
-        # Calculate weights based on Recency
-        # Weight = exp(-decay_rate * days_ago)
         # Using a half-life of roughly 365 days (1 year) implies decay_rate ~ 0.002
-        dates = pd.to_datetime(df_train['Date'])
-        max_date = dates.max()
-        days_ago = (max_date - dates).dt.days
-        
-        # Decay Rate: 0.002 means a match 1 year ago has ~48% weight of today
-        # 0.001 means ~69%
-        # User wants "State of Form" -> Higher emphasis on recent. Let's use 0.003
-        decay_rate = 0.003 
-        sample_weights = np.exp(-decay_rate * days_ago)
+        sample_weights = self._sample_weights(matrix['dates'])
         
         # Normalize weights to sum to n_samples (optional, but good for RF)
         # sample_weights = sample_weights / sample_weights.mean() 
         
         scores = {}
+        models = {}
+        regressors = {}
         
-        for target_name, target_func in self.targets.items():
+        # Each forest grows its trees on all cores (n_jobs=-1), so the targets
+        # train back to back at full parallelism instead of one core each.
+        for target_name in self.targets:
             try:
-                y = df_train.apply(target_func, axis=1)
+                y = matrix['y'][target_name]
                 
                 # OPTIMIZED HYPERPARAMETERS
                 # Adding Sample Weights
-                clf = RandomForestClassifier(n_estimators=60, max_depth=8, min_samples_split=10, random_state=42)
+                clf = RandomForestClassifier(n_estimators=self.N_ESTIMATORS, n_jobs=-1, **self.CLF_PARAMS)
                 clf.fit(X_imputed, y, sample_weight=sample_weights)
                 
-                self.models[target_name] = clf
+                models[target_name] = clf
                 scores[target_name] = clf.score(X_imputed, y) 
             except Exception as e:
                 print(f"Failed to train {target_name}: {e}")
 
         # 2. Train Regressors (Correct Score)
-        for target_name, target_func in self.reg_targets.items():
+        for target_name in self.reg_targets:
             try:
-                y = df_train.apply(target_func, axis=1)
+                y = matrix['y'][target_name]
                 print(f"DEBUG: Training Regressor {target_name}. Mean Target: {y.mean():.4f}, Max: {y.max()}")
                 # Regressor needs to be slightly robust
-                reg = RandomForestRegressor(n_estimators=60, max_depth=8, min_samples_leaf=5, random_state=42)
+                reg = RandomForestRegressor(n_estimators=self.N_ESTIMATORS, n_jobs=-1, **self.REG_PARAMS)
                 reg.fit(X_imputed, y, sample_weight=sample_weights)
-                self.regressors[target_name] = reg
+                regressors[target_name] = reg
                 scores[target_name] = reg.score(X_imputed, y) 
             except Exception as e:
                 print(f"Failed to train Regressor {target_name}: {e}")
                 
-        self.is_trained = True
+        self._swap_models(models, regressors, imputer, latest_date, data_range)
         return scores
 
+    def _train_incremental(self, matrix, latest_date, data_range):
+        """
+        Warm starts every forest with extra trees fitted on matches played since the last run.
+        """
+        if latest_date <= self.trained_until:
+            print("ML Models up to date. No new matchdays.")
+            return {}
+            
+        window_start = self.trained_until - pd.Timedelta(days=self.INCREMENTAL_WINDOW_DAYS)
+        recent = (matrix['dates'] > window_start).to_numpy()
+        dates = matrix['dates'][recent]
+        n_new = int((dates > self.trained_until).sum())
+        print(f"Incremental Training: {n_new} new matches (+{len(dates) - n_new} trailing).")
+        
+        X = matrix['X'][recent]
+        # Keep the fitted imputer so old and new trees see the same feature scale
+        X_imputed = self.imputer.transform(X)
+        sample_weights = self._sample_weights(dates)
+        
+        # Work on copies so readers keep using the old forests until the swap
+        # (dict() also materializes lazily loaded registry models)
+        models = copy.deepcopy(dict(self.models))
+        regressors = copy.deepcopy(dict(self.regressors))
+        scores = {}
+        
+        def grow(est, y):
+            est.set_params(warm_start=True, n_estimators=est.n_estimators + self.WARM_START_TREES, n_jobs=-1)
+            est.fit(X_imputed, y, sample_weight=sample_weights)
+            return est.score(X_imputed, y)
+        
+        for target_name in self.targets:
+            clf = models.get(target_name)
+            if clf is None:
+                continue
+            try:
+                y = matrix['y'][target_name][recent]
+                # A forest can't change its class set mid-way
+                if set(np.unique(y)) != set(clf.classes_):
+                    print(f"Skipping warm start for {target_name}: new data lacks a class.")
+                    continue
+                scores[target_name] = grow(clf, y)
+            except Exception as e:
+                print(f"Failed to warm start {target_name}: {e}")
+                
+        for target_name in self.reg_targets:
+            reg = regressors.get(target_name)
+            if reg is None:
+                continue
+            try:
+                y = matrix['y'][target_name][recent]
+                scores[target_name] = grow(reg, y)
+            except Exception as e:
+                print(f"Failed to warm start Regressor {target_name}: {e}")
+                
+        self._swap_models(models, regressors, self.imputer, latest_date, data_range)
+        return scores
+
+    def _swap_models(self, models, regressors, imputer, trained_until, data_range=None, model_key=None):
+        """Publishes a freshly trained set of models in one step."""
+        with self._lock:
+            self.models = models
+            self.regressors = regressors
+            self.imputer = imputer
+            self.trained_until = trained_until
+            self.data_range = data_range
+            self.model_key = model_key
+            self.is_trained = bool(models)
+
+    def retrain_async(self, historical_data, incremental=False, save=True):
+        """
+        Retrains in a background thread. Predictions keep using the current models
+        until the new ones are swapped in. Returns the thread (or the running one).
+        """
+        if self.is_retraining:
+            return self._retrain_thread
+            
+        def job():
+            try:
+                self.train_models(historical_data, incremental=incremental)
+                if save and self.is_trained:
+                    self.save_model()
+            except Exception as e:
+                print(f"Background retrain failed: {e}")
+                
+        self._retrain_thread = threading.Thread(target=job, name="MLEngineRetrain", daemon=True)
+        self._retrain_thread.start()
+        return self._retrain_thread
+
+    @property
+    def is_retraining(self):
+        return self._retrain_thread is not None and self._retrain_thread.is_alive()
+
     def predict_row(self, row_stats):
         """
         Predicts outcomes for a single match row (dictionary of stats).
@@ -192,6 +391,10 @@ class MLEngine:
         if not self.is_trained:
             return {}
             
+        # Snapshot the models so a concurrent swap can't mix versions
+        with self._lock:
+            models, regressors, imputer = self.models, self.regressors, self.imputer
+            
         # Extract features in correct order
         input_data = []
         for feat in self.feature_cols:
@@ -204,10 +407,10 @@ class MLEngine:
             
         X_in = np.array([input_data])
         # Impute (though usually stats are full)
-        X_in = self.imputer.transform(X_in)
+        X_in = imputer.transform(X_in)
         
         results = {}
-        for name, clf in self.models.items():
+        for name, clf in models.items():
             try:
                 # Get probability of class 1 (True)
                 prob = clf.predict_proba(X_in)[0][1]
@@ -217,7 +420,7 @@ class MLEngine:
                 results[name] = 50 # Fallback
                 
         # Regressors
-        for name, reg in self.regressors.items():
+        for name, reg in regressors.items():
             try:
                 pred = reg.predict(X_in)[0]
                 print(f"DEBUG: {name} Raw Pred: {pred:.4f}")
@@ -228,26 +431,64 @@ class MLEngine:
         return results
 
     def save_model(self):
+        """Stores the current models as a new registry version."""
         try:
-            joblib.dump({
-                'models': self.models,
-                'regressors': self.regressors,
-                'imputer': self.imputer
-            }, self.MODEL_PATH)
-            print("Model saved to cache.")
+            with self._lock:
+                models, regressors, imputer = self.models, self.regressors, self.imputer
+                trained_until, data_range = self.trained_until, self.data_range
+            if not models or data_range is None:
+                return
+                
+            schema = self.schema_hash()
+            key = ModelRegistry.make_key(data_range, schema)
+            if self.registry.read_manifest(key) is None:
+                artifacts = {**models, **regressors, self.IMPUTER_KEY: imputer}
+                self.registry.save(key, artifacts, {
+                    'schema_hash': schema,
+                    'data_range': data_range,
+                    'trained_until': str(trained_until) if trained_until is not None else None,
+                    'feature_cols': self.feature_cols,
+                    'classifiers': list(models),
+                    'regressors': list(regressors)
+                })
+            with self._lock:
+                self.model_key = key
+            print(f"Model saved to registry ({key}).")
         except Exception as e:
             print(f"Failed to save model: {e}")
 
-    def load_model(self):
-        if os.path.exists(self.MODEL_PATH):
-            try:
-                data = joblib.load(self.MODEL_PATH)
-                self.models = data.get('models', {})
-                self.regressors = data.get('regressors', {})
-                self.imputer = data.get('imputer')
-                if self.models:
-                    self.is_trained = True
-                    return True
-            except Exception as e:
-                print(f"Failed to load model: {e}")
+    def load_model(self, historical_data=None):
+        """
+        Loads a registry version matching the current feature schema.
+        With historical_data, prefers the version trained on exactly that history, else
+        the newest one whose leagues and dates cover it (see `_covers`); anything else is
+        a miss, so the caller retrains instead of serving forests from another selection.
+        Without historical_data, the newest compatible version. Forests are loaded lazily on first use.
+        """
+        schema = self.schema_hash()
+        try:
+            if historical_data is not None and not historical_data.empty:
+                requested = self._data_range(historical_data)
+                manifest = self.registry.read_manifest(ModelRegistry.make_key(requested, schema))
+                if manifest is None:
+                    manifest = next((m for m in self.registry.list_versions(schema)
+                                     if self._covers(m.get('data_range'), requested)), None)
+                    if manifest is not None:
+                        print(f"No model for this exact history; using {manifest['key']} "
+                              f"(trained {manifest['data_range']['start']}..{manifest['data_range']['end']})")
+            else:
+                manifest = self.registry.latest(schema)
+            if manifest is None or not manifest.get('classifiers'):
+                return False
+                
+            key = manifest['key']
+            imputer = self.registry.open(key, [self.IMPUTER_KEY])[self.IMPUTER_KEY]
+            models = self.registry.open(key, manifest['classifiers'])
+            regressors = self.registry.open(key, manifest.get('regressors', []))
+            trained_until = pd.Timestamp(manifest['trained_until']) if manifest.get('trained_until') else None
+            self._swap_models(models, regressors, imputer, trained_until, manifest.get('data_range'), key)
+            print(f"Model loaded from registry ({key}).")
+            return True
+        except Exception as e:
+            print(f"Failed to load model: {e}")
         return False
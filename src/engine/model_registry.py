@@ -0,0 +1,165 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+
+import joblib
+
+
+class LazyModels(Mapping):
+    """
+    Read-only {target_name: estimator} mapping that loads each model from disk
+    the first time it is accessed.
+    """
+
+    def __init__(self, paths, mmap_mode='r'):
+        self._paths = dict(paths)
+        self._mmap_mode = mmap_mode
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name not in self._paths:
+            raise KeyError(name)
+        model = self._loaded.get(name)
+        if model is None:
+            with self._lock:
+                model = self._loaded.get(name)
+                if model is None:
+                    # mmap_mode: numpy buffers are mapped from the page cache, so several
+                    # Streamlit workers loading the same version share the file pages.
+                    model = joblib.load(self._paths[name], mmap_mode=self._mmap_mode)
+                    self._loaded[name] = model
+        return model
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+
+class ModelRegistry:
+    """
+    Versioned on-disk store for trained MLEngine models.
+
+    Each version lives in its own directory named after a hash of
+    (training data range, feature schema, hyperparameters):
+
+        data_cache/models/<key>/manifest.json
+        data_cache/models/<key>/<target>.joblib
+
+    Versions are written to a temp directory and renamed into place, so a reader
+    never sees a partial version. Several versions are kept side by side.
+    """
+    ROOT = os.path.join("data_cache", "models")
+    MANIFEST = "manifest.json"
+
+    def __init__(self, root=None, keep_versions=5):
+        self.root = root or self.ROOT
+        self.keep_versions = keep_versions
+        os.makedirs(self.root, exist_ok=True)
+
+    # --- KEYS ---
+
+    @staticmethod
+    def _hash(payload):
+        raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()[:16]
+
+    @classmethod
+    def schema_hash(cls, feature_cols, targets, params):
+        """Hash of everything that makes a model (in)compatible with the predictor's inputs."""
+        return cls._hash({'features': list(feature_cols), 'targets': sorted(targets), 'params': params})
+
+    @classmethod
+    def make_key(cls, data_range, schema_hash):
+        """Version key: schema + the exact slice of history the model was trained on."""
+        return cls._hash({'data': data_range, 'schema': schema_hash})
+
+    # --- WRITE ---
+
+    def save(self, key, models, manifest):
+        """
+        Writes one version. models is {name: object} (estimators, imputer...).
+        manifest is any JSON-serializable metadata; file names are added to it.
+        """
+        final_dir = os.path.join(self.root, key)
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=f".{key}-")
+        try:
+            files = {}
+            for name, obj in models.items():
+                fname = f"{name}.joblib"
+                # Uncompressed so the arrays can be memory-mapped on load
+                joblib.dump(obj, os.path.join(tmp_dir, fname))
+                files[name] = fname
+
+            manifest = dict(manifest)
+            manifest.update({'key': key, 'files': files, 'created_at': datetime.now().isoformat()})
+            with open(os.path.join(tmp_dir, self.MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, default=str)
+
+            if os.path.exists(final_dir):
+                # Same key means same data + schema: keep the existing version
+                shutil.rmtree(tmp_dir)
+            else:
+                os.replace(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.prune()
+        return final_dir
+
+    def prune(self):
+        """Deletes the oldest versions beyond keep_versions."""
+        versions = self.list_versions()
+        for manifest in versions[self.keep_versions:]:
+            shutil.rmtree(os.path.join(self.root, manifest['key']), ignore_errors=True)
+
+    # --- READ ---
+
+    def read_manifest(self, key):
+        path = os.path.join(self.root, key, self.MANIFEST)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Corrupt model manifest {key}: {e}")
+            return None
+
+    def list_versions(self, schema_hash=None):
+        """Manifests of all complete versions, newest first. Optionally only one schema."""
+        versions = []
+        for entry in os.listdir(self.root):
+            if entry.startswith('.'):
+                continue # In-flight temp dirs
+            manifest = self.read_manifest(entry)
+            if manifest is None:
+                continue
+            if schema_hash and manifest.get('schema_hash') != schema_hash:
+                continue
+            versions.append(manifest)
+        return sorted(versions, key=lambda m: m.get('created_at', ''), reverse=True)
+
+    def latest(self, schema_hash=None):
+        versions = self.list_versions(schema_hash)
+        return versions[0] if versions else None
+
+    def open(self, key, names, mmap_mode='r'):
+        """LazyModels view over the given artifact names of a version."""
+        manifest = self.read_manifest(key)
+        if manifest is None:
+            raise KeyError(key)
+        files = manifest.get('files', {})
+        base = os.path.join(self.root, key)
+        return LazyModels({n: os.path.join(base, files[n]) for n in names if n in files}, mmap_mode=mmap_mode)
@@ -1,18 +1,37 @@
 import pandas as pd
 import numpy as np
 from src.engine.ml_engine import MLEngine
+from src.engine.goal_model import GoalModel
+from src.engine.referee import RefereeIndex
+from src.engine.feature_service import FeatureService
 from src.utils.normalization import NameNormalizer
 
 class Predictor:
-    def __init__(self, historical_df):
+    def __init__(self, historical_df, background_training=False):
+        """
+        background_training: Train/refresh the ML models in a background thread instead of
+                             blocking here. Predictions omit ML outputs until the first model
+                             is ready (dashboard use). Scripts keep the blocking default.
+        """
         self.history = historical_df.copy()
-        
+
         # Initialize and Train ML Engine
         self.ml_engine = MLEngine()
-        
-        # Try to load cached model first
-        if not self.ml_engine.load_model():
-             if not self.history.empty:
+
+        # Try to load cached model first (the registry version trained on this history, if any)
+        if self.ml_engine.load_model(historical_df):
+            # Cached model: only append trees when new matchdays have been played
+            if self.ml_engine.has_new_matchdays(historical_df):
+                if background_training:
+                    self.ml_engine.retrain_async(historical_df, incremental=True)
+                else:
+                    self.ml_engine.train_models(historical_df, incremental=True)
+                    self.ml_engine.save_model()
+        elif not self.history.empty:
+            if background_training:
+                # Don't block the first render on a full fit
+                self.ml_engine.retrain_async(historical_df)
+            else:
                 # Train immediately on load (fast enough for prototype)
                 self.ml_engine.train_models(self.history)
                 self.ml_engine.save_model() # Cache for next time
@@ -24,10 +43,22 @@ class Predictor:
         # Standardize Columns
         self.history = self.history.rename(columns={'Home Team': 'HomeTeam', 'Away Team': 'AwayTeam'})
         
+        # Historical names are the reference: confirm them before normalizing, so they
+        # never reach the unknown-names audit
+        NameNormalizer.register_known(pd.unique(self.history[['HomeTeam', 'AwayTeam']].to_numpy().ravel()))
         # KEY FIX: Normalize names in the DataFrame itself so lookups match
         # Now using Centralized Normalizer
-        self.history['HomeTeam'] = self.history['HomeTeam'].apply(self.normalize_name)
-        self.history['AwayTeam'] = self.history['AwayTeam'].apply(self.normalize_name)
+        self.history['HomeTeam'] = NameNormalizer.normalize_series(self.history['HomeTeam'])
+        self.history['AwayTeam'] = NameNormalizer.normalize_series(self.history['AwayTeam'])
+        
+        # Analytic goal model (fits in well under a second, no caching needed)
+        self.goal_model = GoalModel().fit(self.history)
+
+        # Point-in-time team features (last-n windows before any date)
+        self.features = FeatureService.get(self.history)
+
+        # Referee profiles (shared with the referee tab)
+        self.ref_index = RefereeIndex.get(self.history)
         
     def normalize_name(self, name):
         """
@@ -36,143 +67,57 @@ class Predictor:
         """
         return NameNormalizer.normalize(name)
 
+    def resolve_team(self, team):
+        """Team name as indexed in the history (normalized, else first name containing it), or None."""
+        return self.features.resolve(self.normalize_name(team))
 
-    def get_latest_stats(self, team):
+    def get_latest_stats(self, team, as_of=None):
         """
-        Finds the most recent match for a team and returns its stats (Rolling avgs, etc).
+        Stats of a team's last 5 matches played before `as_of` (default: now), from the
+        point-in-time feature service, so past dates can be replayed without leakage.
         ROBUST VERSION: Returns League Average defaults if team not found.
         """
-        team_norm = self.normalize_name(team)
-        
-        # Search in Home matches
-        home_matches = self.history[self.history['HomeTeam'] == team_norm]
-        
-        # FALLBACK: If exact match failed, try containing
-        if home_matches.empty:
-             home_matches = self.history[self.history['HomeTeam'].astype(str).str.contains(team_norm, regex=False, na=False)]
-             if not home_matches.empty:
-                 # Found fuzzy match, use it
-                 team_norm = home_matches.iloc[0]['HomeTeam'] 
-
-        latest_home = home_matches.iloc[-1] if not home_matches.empty else None
-        
-        # Search in Away matches
-        away_matches = self.history[self.history['AwayTeam'] == team_norm]
-        if away_matches.empty:
-             away_matches = self.history[self.history['AwayTeam'].astype(str).str.contains(team_norm, regex=False, na=False)]
-             
-        latest_away = away_matches.iloc[-1] if not away_matches.empty else None
-        
-        # Determine Last Match Date
-        last_match_date = pd.Timestamp.min
-        if latest_home is not None: last_match_date = max(last_match_date, latest_home['Date'])
-        if latest_away is not None: last_match_date = max(last_match_date, latest_away['Date'])
+        # Exact name, else first indexed name containing it
+        team_norm = self.resolve_team(team)
+        feats = self.features.features(team_norm, as_of, n=5) if team_norm is not None else None
         
         # If absolutely no history, return Default Stats (League Average Proxy)
-        if latest_home is None and latest_away is None:
-            # print(f"[WARN] No history for {team}. Using defaults.") 
+        if not feats:
             return self._get_default_stats()
 
-        # Helper to get last N matches from history (Raw stats)
-        def get_team_rolling_stats(team_name, n=5):
-            # Filter all matches for this team
-            matches = self.history[(self.history['HomeTeam'] == team_name) | (self.history['AwayTeam'] == team_name)].sort_values('Date')
-            
-            if matches.empty:
-                return self._get_default_stats()
-            
-            # Take last n
-            last_n = matches.tail(n)
-            
-            # Calculate means manually (robustly)
-            def safe_mean(series):
-                m = series.mean()
-                return m if pd.notna(m) else 0.0
+        def avg(name):
+            v = feats[f'Avg{name}']
+            return v if pd.notna(v) else 0.0
 
-            # Goals
-            goals_for = safe_mean(last_n.apply(lambda x: x['FTHG'] if x['HomeTeam'] == team_name else x['FTAG'], axis=1))
-            goals_ag = safe_mean(last_n.apply(lambda x: x['FTAG'] if x['HomeTeam'] == team_name else x['FTHG'], axis=1))
-            
-            # Shots Target
-            st_for = safe_mean(last_n.apply(lambda x: x.get('HST', 0) if x['HomeTeam'] == team_name else x.get('AST', 0), axis=1))
-            st_ag = safe_mean(last_n.apply(lambda x: x.get('AST', 0) if x['HomeTeam'] == team_name else x.get('HST', 0), axis=1))
-
-            # Corners
-            c_for = safe_mean(last_n.apply(lambda x: x.get('HC', 0) if x['HomeTeam'] == team_name else x.get('AC', 0), axis=1))
-            c_ag = safe_mean(last_n.apply(lambda x: x.get('AC', 0) if x['HomeTeam'] == team_name else x.get('HC', 0), axis=1))
-            
-            # Cards
-            cards_for = safe_mean(last_n.apply(lambda x: (x.get('HY',0) + x.get('HR',0)) if x['HomeTeam'] == team_name else (x.get('AY',0) + x.get('AR',0)), axis=1))
-            
-            # Fouls
-            avg_fouls = safe_mean(last_n.apply(lambda x: x.get('HF', 0) if x['HomeTeam'] == team_name else x.get('AF', 0), axis=1))
-            
-            # PPG (Form)
-            pts = safe_mean(last_n.apply(lambda x: 3 if (x['HomeTeam'] == team_name and x['FTR'] == 'H') or (x['AwayTeam'] == team_name and x['FTR'] == 'A') else (1 if x['FTR'] == 'D' else 0), axis=1))
-            
-            # Form Details (Wins/Losses count)
-            wins = last_n.apply(lambda x: 1 if (x['HomeTeam'] == team_name and x['FTR'] == 'H') or (x['AwayTeam'] == team_name and x['FTR'] == 'A') else 0, axis=1).sum()
-            losses = last_n.apply(lambda x: 1 if (x['HomeTeam'] == team_name and x['FTR'] == 'A') or (x['AwayTeam'] == team_name and x['FTR'] == 'H') else 0, axis=1).sum()
+        n = feats['Matches']
+        goals_for, goals_ag = avg('GoalsFor'), avg('GoalsAgainst')
+        st_for, st_ag = avg('ShotsTargetFor'), avg('ShotsTargetAgainst')
+        c_for, c_ag = avg('CornersFor'), avg('CornersAgainst')
+        cards_for, avg_fouls = avg('CardsFor'), avg('FoulsFor')
 
-            # Attack Strength fallback
-            att_strength = 1.0
-            
-            # Consistency Metrics
-            # BTTS Rate
-            btts_rate = safe_mean(last_n.apply(lambda x: 1 if (x['FTHG'] > 0 and x['FTAG'] > 0) else 0, axis=1))
-            
-            # Over 2.5 Rate
-            over25_rate = safe_mean(last_n.apply(lambda x: 1 if (x['FTHG'] + x['FTAG'] > 2.5) else 0, axis=1))
-            
-            # Clean Sheet Rate
-            cs_count = last_n.apply(lambda x: 1 if ((x['HomeTeam'] == team_name and x['FTAG'] == 0) or 
-                                                    (x['AwayTeam'] == team_name and x['FTHG'] == 0)) else 0, axis=1).sum()
-            cs_rate = cs_count / len(last_n) if len(last_n) > 0 else 0
-            
-            # Failed to Score Rate
-            failed_score = safe_mean(last_n.apply(lambda x: 1 if ((x['HomeTeam'] == team_name and x['FTHG'] == 0) or
-                                                        (x['AwayTeam'] == team_name and x['FTAG'] == 0)) else 0, axis=1))
-                                                        
-            # Standard Deviation of Total Goals
-            match_goals = last_n.apply(lambda x: x['FTHG'] + x['FTAG'], axis=1)
-            std_dev_goals = match_goals.std() if len(match_goals) > 1 else 1.0 # Default 1.0 stability
-            
-            # Zero Zeros
-            draw_zeros = last_n.apply(lambda x: 1 if (x['FTHG'] == 0 and x['FTAG'] == 0) else 0, axis=1).sum()
-
-            stats = {
-                'AvgGoalsFor': goals_for if goals_for > 0 else 1.0, # Prevent strict 0 for unknown
-                'AvgGoalsAgainst': goals_ag if goals_ag > 0 else 1.2,
-                'AvgShotsTargetFor': st_for if st_for > 0 else 3.5,
-                'AvgShotsTargetAgainst': st_ag if st_ag > 0 else 4.0,
-                'AvgCornersFor': c_for if c_for > 0 else 4.5,
-                'AvgCornersAgainst': c_ag if c_ag > 0 else 5.0,
-                'AvgCardsFor': cards_for if cards_for > 0 else 1.5,
-                'AvgFouls': avg_fouls if avg_fouls > 0 else 10.0,
-                'PPG': pts,
-                'WinsLast5': wins,
-                'LossesLast5': losses,
-                'AttackStrength': att_strength,
-                'BTTS_Rate': btts_rate,
-                'Over25_Rate': over25_rate,
-                'CleanSheet_Rate': cs_rate,
-                'FailedToScore_Rate': failed_score,
-                'StdDev_Goals': std_dev_goals,
-                'ZeroZero_Count': draw_zeros
-            }
-            return stats
-
-        stats = get_team_rolling_stats(team_norm)
-        
-        # Add Rest Days
-        if last_match_date != pd.Timestamp.min:
-            stats['RestDays'] = (pd.Timestamp.now() - last_match_date).days
-        else:
-            stats['RestDays'] = 7 # Default
-        
-        # Add Opp Difficulty Proxy (Default 1.35)
-        stats['OppDifficulty'] = 1.35 
-        
+        stats = {
+            'AvgGoalsFor': goals_for if goals_for > 0 else 1.0, # Prevent strict 0 for unknown
+            'AvgGoalsAgainst': goals_ag if goals_ag > 0 else 1.2,
+            'AvgShotsTargetFor': st_for if st_for > 0 else 3.5,
+            'AvgShotsTargetAgainst': st_ag if st_ag > 0 else 4.0,
+            'AvgCornersFor': c_for if c_for > 0 else 4.5,
+            'AvgCornersAgainst': c_ag if c_ag > 0 else 5.0,
+            'AvgCardsFor': cards_for if cards_for > 0 else 1.5,
+            'AvgFouls': avg_fouls if avg_fouls > 0 else 10.0,
+            'PPG': avg('Points'),
+            'WinsLast5': int(round(avg('Win') * n)),
+            'LossesLast5': int(round(avg('Loss') * n)),
+            'AttackStrength': 1.0,
+            'BTTS_Rate': avg('BTTS'),
+            'Over25_Rate': avg('Over25'),
+            'CleanSheet_Rate': avg('CleanSheet'),
+            'FailedToScore_Rate': avg('FailedToScore'),
+            'StdDev_Goals': feats['StdDev_Goals'] if n > 1 and pd.notna(feats['StdDev_Goals']) else 1.0, # Default 1.0 stability
+            'ZeroZero_Count': int(round(avg('ZeroZero') * n)),
+            'RestDays': feats['RestDays'] if feats['RestDays'] is not None else 7,
+            # Opp Difficulty Proxy (Default 1.35)
+            'OppDifficulty': 1.35
+        }
         return stats
         
     def _get_default_stats(self):
@@ -192,31 +137,42 @@ class Predictor:
 
     def get_ref_stats(self, ref_name):
         """
-        Calculates rolling stats for a referee.
+        Rolling stats for a referee (last 20 matches, from the referee index).
         """
         if not ref_name: return {'AvgCards': 4.0} # Default
         
-        if 'Referee' not in self.history.columns:
+        profile = self.ref_index.profile(ref_name, 'L20')
+        if profile is None:
             return {'AvgCards': 4.0}
             
-        ref_matches = self.history[self.history['Referee'] == ref_name]
-        
-        if ref_matches.empty:
-             ref_matches = self.history[self.history['Referee'].astype(str).str.contains(ref_name, na=False, regex=False)]
-             
-        if ref_matches.empty:
-            return {'AvgCards': 4.0}
-            
-        recent = ref_matches.tail(20)
-        
-        cards_list = recent.apply(lambda x: x.get('HY',0) + x.get('AY',0) + x.get('HR',0) + x.get('AR',0), axis=1)
-        avg_cards = cards_list.mean()
-        
-        return {'AvgCards': avg_cards if pd.notna(avg_cards) else 4.0, 'Matches': len(recent)}
+        avg_cards = profile['AvgCards']
+        return {
+            'AvgCards': avg_cards if pd.notna(avg_cards) else 4.0,
+            'Matches': profile['Matches'],
+            'AvgFouls': profile['AvgFouls'],
+            'HomeBias': profile['HomeBias']
+        }
 
-    def predict_match_safe(self, home_team, away_team, referee=None, match_date=None, known_odds=None): 
-        home_stats = self.get_latest_stats(home_team)
-        away_stats = self.get_latest_stats(away_team)
+    def goal_markets(self, home_teams, away_teams):
+        """
+        Goal model markets for a whole slate in one pass (one row per fixture, same order).
+        Rows can be handed to predict_match_safe(goal_markets=...) to skip the per-fixture fit lookup.
+        """
+        def resolve(teams):
+            return [self.resolve_team(t) or self.normalize_name(t) for t in teams]
+        return self.goal_model.markets(resolve(home_teams), resolve(away_teams))
+
+    def predict_match_safe(self, home_team, away_team, referee=None, match_date=None, known_odds=None, goal_markets=None): 
+        """
+        Full prediction row for one fixture.
+        goal_markets: This fixture's row of `goal_markets` when the slate was scored in batch.
+        """
+        # State before kick-off (live fixtures: everything played so far)
+        as_of = pd.to_datetime(match_date, errors='coerce') if match_date is not None else pd.NaT
+        if pd.isna(as_of): as_of = pd.Timestamp.now()
+        
+        home_stats = self.get_latest_stats(home_team, as_of)
+        away_stats = self.get_latest_stats(away_team, as_of)
         
         # Ref Stats
         ref_stats = self.get_ref_stats(referee)
@@ -242,7 +198,7 @@ class Predictor:
         z_away_xg = (away_stats.get('DominanceFor', 20.0) - 20.0) / 10.0
 
         # --- TRAP FLAGS ---
-        idx_date = pd.Timestamp.now()
+        idx_date = as_of
         is_late_season = idx_date.month in [4, 5]
         ppg_diff = abs(home_stats['PPG'] - away_stats['PPG'])
         is_close_rivals = ppg_diff < 0.3
@@ -353,22 +309,19 @@ class Predictor:
             row['B365A'] = None
             row['B365D'] = None
         
-        # 2. Over 2.5 Odds (Derived)
-        exp_g = (row['HomeAvgGoalsFor'] + row['AwayAvgGoalsFor'] + 
-                 row['HomeAvgGoalsAgainst'] + row['AwayAvgGoalsAgainst']) / 2
-        
-        if exp_g < 0.1: exp_g = 0.1
-        est_odd_over = 2.0 * ((2.7 / exp_g) ** 1.2)
-        if est_odd_over < 1.05: est_odd_over = 1.05
-        
-        row['B365>2.5'] = round(est_odd_over, 2)
+        # --- GOAL MODEL (Dixon-Coles) ---
+        # Scoreline-based probabilities for every goals market (GM_ prefix, 0-1 floats)
+        # Ratings are keyed by the normalized history names (unknown teams get league-average ratings)
+        gm = goal_markets if goal_markets is not None else self.goal_markets([home_team], [away_team]).iloc[0].to_dict()
+        for k, v in gm.items():
+            if k not in ('HomeTeam', 'AwayTeam'):
+                row[f'GM_{k}'] = v
+        row['GM_CorrectScore'] = f"{int(gm['CS_Home'])}-{int(gm['CS_Away'])}"
+        
+        # 2. Over 2.5 / Over 1.5 Odds (fair odds from the goal model)
+        row['B365>2.5'] = round(1 / max(gm['Over2.5'], 0.02), 2)
         row['Avg>2.5'] = row['B365>2.5']
-        
-        # 3. Over 1.5 Odds
-        est_odd_over15 = 1.0 + (est_odd_over - 1.0) * 0.45 
-        if est_odd_over15 < 1.01: est_odd_over15 = 1.01
-        
-        row['B365>1.5'] = round(est_odd_over15, 2)
+        row['B365>1.5'] = round(1 / max(gm['Over1.5'], 0.02), 2)
         
         return row
 
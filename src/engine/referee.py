@@ -1,7 +1,23 @@
 import pandas as pd
 import numpy as np
+from src.utils.cache import frame_version, VersionedLRU
+
+class RefereeIndex:
+    """
+    Referee lookup and profiles, built once per data version (`RefereeIndex.get(df)`).
+
+    Names are normalized once per distinct raw value and mapped to an integer ID.
+    Card, foul and home-bias aggregates are precomputed per referee for the last
+    10 / 20 matches, the referee's latest season and the whole history, so
+    `profile(name)` is a dict lookup. `summary` is the per (Referee, Div) table
+    behind RefereeAnalyzer.get_summary.
+    """
+    WINDOWS = {'L10': 10, 'L20': 20}
+    SUMMARY_COLS = ['HY', 'AY', 'HR', 'AR', 'HF', 'AF']
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
 
-class RefereeAnalyzer:
     def __init__(self, df):
         self.df = df.copy()
         
@@ -12,16 +28,31 @@ class RefereeAnalyzer:
             else:
                 self.df['Referee'] = self.df['Ref']
         
+        self.names = pd.Index([])
+        self.ids = {}
+        self.aliases = {}
+        self.profiles = {}
+        self._records = {}
+        self._rows = {}
+        self.summary = pd.DataFrame()
+
         # Ensure Referee column exists and is clean
-        if 'Referee' in self.df.columns:
-            self.df = self.df.dropna(subset=['Referee'])
-            # Normalize Names
-            self.df['Referee'] = self.df['Referee'].apply(self._normalize_name)
-        else:
+        if 'Referee' not in self.df.columns:
             print("Warning: No 'Referee' column found in data.")
             self.df = pd.DataFrame()
+            return
+            
+        self.df = self.df.dropna(subset=['Referee'])
+        # Normalize each distinct raw name once
+        self.aliases = {raw: self.normalize_name(raw) for raw in pd.unique(self.df['Referee'])}
+        self.df['Referee'] = self.df['Referee'].map(self.aliases)
 
-    def _normalize_name(self, name):
+        codes, self.names = pd.factorize(self.df['Referee'])
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._build(codes)
+
+    @staticmethod
+    def normalize_name(name):
         if pd.isna(name) or name == 0 or str(name).strip() == "":
             return None
         
@@ -48,39 +79,74 @@ class RefereeAnalyzer:
         
         return name_str
 
-    def get_summary(self, min_matches=5):
-        """
-        Returns a DataFrame with summary stats for all referees.
-        """
-        if self.df.empty:
-            return pd.DataFrame()
+    # --- CACHE ---
 
-        # Group by Referee and League (Div)
-        # We need columns: HY (Home Yellow), AY (Away Yellow), HR (Home Red), AR (Away Red), HF (Home Fouls), AF (Away Fouls)
-        # Check available columns
-        cols = self.df.columns
-        stats_cols = {
-            'HY': 'HomeYellow', 'AY': 'AwayYellow',
-            'HR': 'HomeRed', 'AR': 'AwayRed',
-            'HF': 'HomeFouls', 'AF': 'AwayFouls'
-        }
-        
-        # Filter for existing columns only
-        agg_dict = {}
-        for short, original in stats_cols.items():
-            if short in cols:
-                agg_dict[short] = 'mean'
-            elif original in cols: # Sometimes names differ
-                 pass # We rely on standard names usually (HY, AY) in football-data.co.uk
-        
-        # Standard football-data.co.uk columns for cards/fouls are:
-        # HY, AY, HR, AR, HF, AF
-        
-        required_cols = ['HY', 'AY', 'HR', 'AR', 'HF', 'AF']
-        available_cols = [c for c in required_cols if c in self.df.columns]
-        
+    @staticmethod
+    def version(df):
+        return frame_version(df, ['Referee', 'Ref', 'Date', 'Div', 'Season', 'FTR'] + RefereeIndex.SUMMARY_COLS)
+
+    @classmethod
+    def get(cls, df):
+        """Shared index for this data (built once per data version)."""
+        return cls._cache.get_or_build(cls.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    def _build(self, codes):
+        df = self.df
+        valid = codes >= 0
+        dates = pd.to_datetime(df['Date'], errors='coerce') if 'Date' in df.columns else pd.Series(pd.NaT, index=df.index)
+
+        # Matches of each referee, newest first (later rows first on the same date)
+        stamp = dates.to_numpy(dtype='datetime64[ns]').astype('int64')
+        stamp = np.where(dates.isna().to_numpy(), np.iinfo('int64').min + 1, stamp) # Undated rows sort oldest
+        order = np.lexsort((-np.arange(len(df)), -stamp, codes))
+        order = order[valid[order]]
+        grouped = pd.Series(order).groupby(codes[order])
+        self._rows = {self.names[c]: rows.to_numpy() for c, rows in grouped}
+
+        def col(name):
+            return pd.to_numeric(df[name], errors='coerce') if name in df.columns else pd.Series(0.0, index=df.index)
+
+        home_cards, away_cards = col('HY') + col('HR'), col('AY') + col('AR')
+        values = pd.DataFrame({
+            'AvgCards': home_cards + away_cards,
+            'AvgYellows': col('HY') + col('AY'),
+            'AvgReds': col('HR') + col('AR'),
+            'AvgFouls': col('HF') + col('AF'),
+            'HomeCardsAvg': home_cards,
+            'AwayCardsAvg': away_cards,
+            'HomeFoulsAvg': col('HF'),
+            'AwayFoulsAvg': col('AF'),
+            # > 0: visitors get booked more than the home side
+            'HomeBias': away_cards - home_cards,
+            'HomeWinRate': (df['FTR'] == 'H').astype(float).where(df['FTR'].notna()) if 'FTR' in df.columns else np.nan,
+        }).iloc[order].reset_index(drop=True)
+        ref = pd.Series(codes[order])
+        age = ref.groupby(ref).cumcount().to_numpy()
+
+        subsets = {w: age < n for w, n in self.WINDOWS.items()}
+        if 'Season' in df.columns:
+            season = df['Season'].to_numpy()[order]
+            latest = pd.Series(season).groupby(ref.to_numpy()).transform('first').to_numpy()
+            subsets['Season'] = season == latest
+        subsets['All'] = np.ones(len(order), dtype=bool)
+
+        for window, keep in subsets.items():
+            prof = values[keep].groupby(ref[keep].to_numpy()).mean()
+            prof.insert(0, 'Matches', ref[keep].value_counts().reindex(prof.index).to_numpy())
+            prof.index = self.names[prof.index]
+            prof.index.name = 'Referee'
+            self.profiles[window] = prof
+            self._records[window] = prof.to_dict('index')
+
+        self.summary = self._build_summary()
+
+    def _build_summary(self):
+        """Per (Referee, Div) count/mean/sum of the card and foul columns."""
+        available_cols = [c for c in self.SUMMARY_COLS if c in self.df.columns]
         if not available_cols:
-             return pd.DataFrame()
+            return pd.DataFrame()
 
         # Group by Referee AND League
         if 'Div' in self.df.columns:
@@ -109,15 +175,69 @@ class RefereeAnalyzer:
             
         if 'HF_mean' in summary.columns and 'AF_mean' in summary.columns:
             summary['AvgFouls'] = summary['HF_mean'] + summary['AF_mean']
-            # Bias: (Home Fouls - Away Fouls) / Total Fouls roughly?
-            # Or simplified: Home Fouls per Game vs Away Fouls per Game
+            # Home Fouls per Game vs Away Fouls per Game
             summary['HomeFoulsAvg'] = summary['HF_mean']
             summary['AwayFoulsAvg'] = summary['AF_mean']
             
-        # Filter by min matches
-        summary = summary[summary['Matches'] >= min_matches].sort_values('Matches', ascending=False)
-        
         return summary
 
+    # --- QUERY ---
+
+    def lookup(self, name):
+        """Canonical referee name for a raw or normalized name (None if unknown)."""
+        if name is None or (not isinstance(name, str) and pd.isna(name)):
+            return None
+        if name in self.ids:
+            return name
+        norm = self.aliases.get(name) or self.normalize_name(name)
+        if norm in self.ids:
+            return norm
+        # Partial names ("Oliver" for "Michael Oliver"): search the distinct names only
+        if norm:
+            hits = [n for n in self.names if norm in n]
+            if hits:
+                return hits[0]
+        return None
+
+    def profile(self, name, window='L20'):
+        """Aggregates of one referee over a window ('L10', 'L20', 'Season', 'All'), or None."""
+        ref = self.lookup(name)
+        if ref is None:
+            return None
+        record = self._records.get(window, {}).get(ref)
+        return dict(record, Referee=ref) if record is not None else None
+
+    def matches(self, name):
+        """Matches of one referee, newest first."""
+        ref = self.lookup(name)
+        if ref is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[self._rows[ref]]
+
+
+class RefereeAnalyzer:
+    def __init__(self, df):
+        # Shared, precomputed index (normalization and aggregates run once per data version)
+        self.index = RefereeIndex.get(df)
+        self.df = self.index.df
+
+    def _normalize_name(self, name):
+        return RefereeIndex.normalize_name(name)
+
+    def get_summary(self, min_matches=5):
+        """
+        Returns a DataFrame with summary stats for all referees.
+        """
+        summary = self.index.summary
+        if summary.empty:
+            return pd.DataFrame()
+            
+        # Filter by min matches
+        return summary[summary['Matches'] >= min_matches].sort_values('Matches', ascending=False)
+
+    def get_profile(self, referee_name, window='L20'):
+        """Rolling card/foul/home-bias profile ('L10', 'L20', 'Season' or 'All')."""
+        return self.index.profile(referee_name, window)
+
     def get_referee_matches(self, referee_name):
-        return self.df[self.df['Referee'] == referee_name].sort_values('Date', ascending=False)
+        return self.index.matches(referee_name)
@@ -1,104 +1,186 @@
+import threading
+import time
+
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from src.engine.value_engine import ValueEngine
+
+# ValueEngine suggestion label (as saved from the dashboard) -> market key
+MARKET_BY_LABEL = {label.lower(): key for key, label, _, _ in ValueEngine.MARKETS}
 
 class BetSettler:
     """
-    Handles automatic settlement of bets based on historical match results.
+    Settles pending bets against match results, for every user at once.
+
+    Pending bets are joined to the played results in one keyed join on
+    (home, away) with the nearest result within DATE_TOLERANCE of the bet's
+    match date; the market rules run vectorized over the joined frame and all
+    updates are committed in a single transaction. Meant to run as a scheduled
+    job (`start_schedule` / tools/settle_bets.py), not on page load.
     """
-    
+    DATE_TOLERANCE = pd.Timedelta(days=3)
+    INTERVAL_MINUTES = 30
+
     @staticmethod
-    def settle_user_bets(user_manager, username, historical_data):
+    def results(historical_data):
+        """Played matches as (home, away, match_date, fthg, ftag), without touching the source frame."""
+        cols = ['HomeTeam', 'AwayTeam', 'Date', 'FTHG', 'FTAG']
+        if historical_data is None or historical_data.empty or not set(cols) <= set(historical_data.columns):
+            return pd.DataFrame(columns=['home', 'away', 'match_date', 'fthg', 'ftag'])
+        res = historical_data[cols].rename(columns={'HomeTeam': 'home', 'AwayTeam': 'away', 'Date': 'match_date',
+                                                    'FTHG': 'fthg', 'FTAG': 'ftag'})
+        res = res.assign(match_date=pd.to_datetime(res['match_date'], errors='coerce'))
+        return res.dropna(subset=['home', 'away', 'fthg', 'ftag'])
+
+    @classmethod
+    def match_results(cls, bets, results, tolerance=None):
         """
-        Scans pending bets for the user and checks if they can be settled.
-        Returns a summary of settled bets.
+        Joins bets (home_team, away_team, match_date) to results: nearest result of the same
+        fixture within the tolerance; bets without a usable match date take the pair's latest result.
+        Returns bets with fthg/ftag (NaN where no result was found).
         """
-        pm = user_manager.portfolio_manager
-        bets = pm.get_user_bets(username)
-        pending_bets = [b for b in bets if b['status'] == 'Pending']
-        
-        if not pending_bets or historical_data.empty:
+        tolerance = cls.DATE_TOLERANCE if tolerance is None else tolerance
+        # Stored match dates mix naive and tz-aware strings: read them all as UTC, then drop the zone
+        bets = bets.assign(_date=pd.to_datetime(bets['match_date'], errors='coerce', format='mixed', utc=True).dt.tz_convert(None).astype('datetime64[ns]'),
+                           _pos=np.arange(len(bets)))
+        res = results.dropna(subset=['match_date']).assign(_date=lambda r: r['match_date'].astype('datetime64[ns]'))
+        out = pd.DataFrame({'fthg': np.nan, 'ftag': np.nan}, index=range(len(bets)))
+
+        dated = bets[bets['_date'].notna()].sort_values('_date')
+        if not dated.empty and not res.empty:
+            joined = pd.merge_asof(dated, res[['home', 'away', '_date', 'fthg', 'ftag']].sort_values('_date'),
+                                   on='_date', left_by=['home_team', 'away_team'], right_by=['home', 'away'],
+                                   tolerance=tolerance, direction='nearest')
+            out.loc[joined['_pos'].to_numpy(), ['fthg', 'ftag']] = joined[['fthg', 'ftag']].to_numpy(dtype=float)
+
+        undated = bets[bets['_date'].isna()]
+        if not undated.empty and not results.empty:
+            latest = results.sort_values('match_date', kind='stable').drop_duplicates(['home', 'away'], keep='last')
+            joined = undated.merge(latest, left_on=['home_team', 'away_team'], right_on=['home', 'away'], how='left')
+            out.loc[joined['_pos'].to_numpy(), ['fthg', 'ftag']] = joined[['fthg', 'ftag']].to_numpy(dtype=float)
+
+        return bets.drop(columns=['_date', '_pos']).assign(fthg=out['fthg'].to_numpy(), ftag=out['ftag'].to_numpy())
+
+    @staticmethod
+    def market_keys(bets):
+        """
+        ValueEngine market key per bet ('Home', 'Draw', 'Away', 'BTTS_Yes', 'BTTS_No', 'Over2.5',
+        'Under2.5', 'HomeOver1.5', 'AwayOver0.5', ...): the stored `market` when present, else the
+        selection read as a ValueEngine.MARKETS label, else the legacy English keywords
+        (Over/Under X, Home/Away Win, Draw/Empate, BTTS Yes/No). None where unrecognised.
+        """
+        sel = bets['selection'].fillna('').astype(str).str.strip().str.lower()
+        stored = bets['market'] if 'market' in bets.columns else pd.Series(None, index=bets.index, dtype=object)
+        by_label = sel.map(MARKET_BY_LABEL)
+
+        line = sel.str.extract(r'(\d+\.?\d*)', expand=False)
+        is_over = sel.str.contains('over').to_numpy()
+        is_under = sel.str.contains('under').to_numpy() & ~is_over
+        rest = ~is_over & ~is_under
+        is_home = rest & sel.str.contains('home').to_numpy() & sel.str.contains('win').to_numpy()
+        rest &= ~is_home
+        is_away = rest & sel.str.contains('away').to_numpy() & sel.str.contains('win').to_numpy()
+        rest &= ~is_away
+        is_draw = rest & sel.str.contains('draw|empate').to_numpy()
+        rest &= ~is_draw
+        is_btts = rest & sel.str.contains('btts|both teams').to_numpy()
+        btts_yes = is_btts & sel.str.contains('yes').to_numpy()
+        btts_no = is_btts & ~btts_yes & sel.str.contains('no').to_numpy()
+        # Over/Under without a line stay unrecognised (as before)
+        legacy = np.select(
+            [is_over & line.notna().to_numpy(), is_under & line.notna().to_numpy(), is_home, is_away, is_draw, btts_yes, btts_no],
+            ['Over' + line.fillna(''), 'Under' + line.fillna(''), 'Home', 'Away', 'Draw', 'BTTS_Yes', 'BTTS_No'],
+            default='')
+        legacy = pd.Series(legacy, index=bets.index).replace('', None)
+
+        return stored.where(stored.notna() & (stored != ''), by_label.where(by_label.notna(), legacy))
+
+    @classmethod
+    def outcomes(cls, joined):
+        """
+        'Won' / 'Lost' per row of joined bets (None where the market isn't recognised or
+        there is no result yet). See `market_keys` for the markets understood.
+        """
+        keys = cls.market_keys(joined).fillna('').astype(str)
+        parts = keys.str.extract(r'^(Home|Draw|Away|BTTS_Yes|BTTS_No|HomeOver|AwayOver|Over|Under)(\d+\.?\d*)?$')
+        kind = parts[0].fillna('').to_numpy()
+        line = parts[1].astype(float).to_numpy()
+        hg, ag = joined['fthg'].to_numpy(dtype=float), joined['ftag'].to_numpy(dtype=float)
+        total = hg + ag
+        btts = (hg > 0) & (ag > 0)
+
+        rules = {
+            'Home': hg > ag, 'Away': ag > hg, 'Draw': hg == ag,
+            'BTTS_Yes': btts, 'BTTS_No': ~btts,
+            'Over': total > line, 'Under': total < line,
+            'HomeOver': hg > line, 'AwayOver': ag > line,
+        }
+        won = np.select([kind == k for k in rules], list(rules.values()), default=False)
+        needs_line = np.isin(kind, ['Over', 'Under', 'HomeOver', 'AwayOver'])
+        known = (kind != '') & ~(needs_line & np.isnan(line)) & ~np.isnan(hg) & ~np.isnan(ag)
+        return pd.Series(np.where(known, np.where(won, 'Won', 'Lost'), None), index=joined.index, dtype=object)
+
+    @classmethod
+    def settle_pending(cls, store, historical_data, usernames=None, tolerance=None):
+        """
+        Settles the pending bets of every user (or only `usernames`) in one pass and one transaction.
+        Returns the number of bets settled.
+        """
+        sql = "SELECT seq, username, home_team, away_team, match_date, selection, market FROM bets WHERE status = 'Pending'"
+        params = []
+        if usernames is not None:
+            sql += f" AND username IN ({', '.join('?' * len(usernames))})"
+            params = list(usernames)
+        rows = store.execute(sql, params).fetchall()
+        if not rows:
+            return 0
+        results = cls.results(historical_data)
+        if results.empty:
             return 0
-            
-        settled_count = 0
-        
-        # Ensure Historical Data has necessary columns and date format
-        if 'Date' in historical_data.columns:
-            historical_data['Date'] = pd.to_datetime(historical_data['Date'])
-            
-        now = datetime.now()
-        
-        for bet in pending_bets:
-            try:
-                # 1. Match Identification
-                # Naive matching: HomeTeam, AwayTeam. 
-                # Ideally, we should store a unique match_id in the bet, but for now names are key.
-                
-                # Filter by teams
-                match = historical_data[
-                    (historical_data['HomeTeam'] == bet['home_team']) & 
-                    (historical_data['AwayTeam'] == bet['away_team'])
-                ]
-                
-                # Check Date (Match must be in the past)
-                # bet['match_date'] is string, need to ensure match result is actually FROM that match
-                # If multiple matches (rare), take the one closest to bet date.
-                
-                if match.empty:
-                    continue
-                    
-                # Get the result row (assuming single match found or taking last if repeats)
-                res = match.iloc[-1]
-                
-                # Verify match has finished (FTHG/FTAG present)
-                if pd.isna(res.get('FTHG')) or pd.isna(res.get('FTAG')):
-                    continue
-                    
-                # 2. Evaluate Outcome
-                selection = bet['selection'].lower()
-                fthg = int(res['FTHG'])
-                ftag = int(res['FTAG'])
-                total_goals = fthg + ftag
-                outcome = None # 'Won' or 'Lost'
-                
-                # Logic: Over/Under
-                if 'over' in selection:
-                    # Extract line, e.g. "Over 2.5" -> 2.5
-                    import re
-                    line_match = re.search(r'(\d+\.?\d*)', selection)
-                    if line_match:
-                        line = float(line_match.group(1))
-                        outcome = 'Won' if total_goals > line else 'Lost'
-                        
-                elif 'under' in selection:
-                    import re
-                    line_match = re.search(r'(\d+\.?\d*)', selection)
-                    if line_match:
-                        line = float(line_match.group(1))
-                        outcome = 'Won' if total_goals < line else 'Lost'
-                        
-                # Logic: 1X2 / Moneyline
-                elif 'home' in selection and 'win' in selection: # Home Win
-                    outcome = 'Won' if fthg > ftag else 'Lost'
-                elif 'away' in selection and 'win' in selection: # Away Win
-                    outcome = 'Won' if ftag > fthg else 'Lost'
-                elif 'draw' in selection or 'empate' in selection:
-                    outcome = 'Won' if fthg == ftag else 'Lost'
-                    
-                # Logic: BTTS
-                elif 'btts' in selection or 'both teams' in selection:
-                    btts_happened = (fthg > 0 and ftag > 0)
-                    if 'yes' in selection:
-                        outcome = 'Won' if btts_happened else 'Lost'
-                    elif 'no' in selection:
-                        outcome = 'Won' if not btts_happened else 'Lost'
-                
-                # 3. Update Status
-                if outcome:
-                    pm.update_bet_status(username, bet['id'], outcome)
-                    settled_count += 1
-                    
-            except Exception as e:
-                print(f"Error settling bet {bet['id']}: {e}")
-                continue
-                
-        return settled_count
+
+        pending = pd.DataFrame([dict(r) for r in rows])
+        joined = cls.match_results(pending, results, tolerance)
+        joined['outcome'] = cls.outcomes(joined)
+        settled = joined[joined['outcome'].notna()]
+        if settled.empty:
+            return 0
+
+        with store.transaction() as conn:
+            # status guard: a bet settled or edited meanwhile is left alone
+            cur = conn.executemany(
+                "UPDATE bets SET status = ?, result_amount = CASE ? WHEN 'Won' THEN stake * odds - stake ELSE -stake END "
+                "WHERE seq = ? AND status = 'Pending'",
+                [(o, o, int(s)) for o, s in zip(settled['outcome'], settled['seq'])])
+            count = cur.rowcount
+        print(f"BetSettler: settled {count} of {len(pending)} pending bets")
+        return count
+
+    @classmethod
+    def settle_user_bets(cls, user_manager, username, historical_data):
+        """
+        Settles one user's pending bets (same batch path, restricted to the user).
+        Returns the number of bets settled.
+        """
+        pm = user_manager.portfolio_manager
+        return cls.settle_pending(pm.store, historical_data, usernames=[pm._key(username)])
+
+    @classmethod
+    def start_schedule(cls, store, load_history, interval_minutes=None):
+        """
+        Background job: settles every user's pending bets now and then every interval.
+        load_history: callable returning the current results frame (called on each run).
+        Returns the daemon thread.
+        """
+        interval = (interval_minutes or cls.INTERVAL_MINUTES) * 60
+
+        def run():
+            while True:
+                try:
+                    cls.settle_pending(store, load_history())
+                except Exception as e:
+                    print(f"BetSettler: scheduled run failed: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="bet-settlement", daemon=True)
+        thread.start()
+        return thread
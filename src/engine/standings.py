@@ -0,0 +1,194 @@
+import bisect
+import threading
+
+import pandas as pd
+import numpy as np
+from src.utils.cache import frame_version, VersionedLRU
+
+
+class StandingsEngine:
+    """
+    League tables per (Div, Season), kept as running totals per team.
+
+    Each team stores the date of every result and the cumulative STATS after it,
+    so the current table is the last row of each team (O(teams)) and an
+    "as of date" table is one bisect per team. `add_result` folds in a new result
+    without touching the rest of the league.
+
+    Build it through `StandingsEngine.get(df)`, which caches one engine per data version.
+    """
+    STATS = ['Played', 'Won', 'Drawn', 'Lost', 'GoalsFor', 'GoalsAgainst', 'Points',
+             'HomePlayed', 'HomeWon', 'HomeDrawn', 'HomeLost', 'HomeGoalsFor', 'HomeGoalsAgainst', 'HomePoints',
+             'AwayPlayed', 'AwayWon', 'AwayDrawn', 'AwayLost', 'AwayGoalsFor', 'AwayGoalsAgainst', 'AwayPoints']
+    FORM_LENGTH = 5
+    NO_SEASON = 'All'
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, df=None):
+        # {(div, season): {team: {'dates': [...], 'cum': ndarray (n, STATS), 'results': [...]}}}
+        self.leagues = {}
+        self._lock = threading.Lock()
+        if df is not None and not df.empty:
+            self._build(df)
+
+    # --- CACHE ---
+
+    @staticmethod
+    def version(df):
+        return frame_version(df, ['Div', 'Season', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+
+    @classmethod
+    def get(cls, df):
+        """Shared engine for this data (built once per data version)."""
+        return cls._cache.get_or_build(cls.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    @classmethod
+    def _deltas(cls, gf, ga, is_home):
+        """Per team-match contribution to every STATS column, shape (n, len(STATS))."""
+        won, drawn, lost = gf > ga, gf == ga, gf < ga
+        overall = np.column_stack([np.ones_like(gf), won, drawn, lost, gf, ga, 3 * won + drawn]).astype(float)
+        home = overall * is_home[:, None]
+        away = overall * ~is_home[:, None]
+        return np.hstack([overall, home, away])
+
+    def _build(self, df):
+        played = df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+        if played.empty:
+            return
+        n = len(played)
+        div = played['Div'].to_numpy() if 'Div' in played.columns else np.full(n, None)
+        season = played['Season'].to_numpy() if 'Season' in played.columns else np.full(n, self.NO_SEASON)
+        dates = pd.to_datetime(played['Date'], errors='coerce') if 'Date' in played.columns else pd.Series(pd.NaT, index=played.index)
+        hg, ag = played['FTHG'].to_numpy(dtype=float), played['FTAG'].to_numpy(dtype=float)
+
+        long = pd.DataFrame({
+            'Div': np.concatenate([div, div]),
+            'Season': np.concatenate([season, season]),
+            'Team': np.concatenate([played['HomeTeam'].to_numpy(), played['AwayTeam'].to_numpy()]),
+            'Date': np.concatenate([dates.to_numpy(), dates.to_numpy()]),
+            'Order': np.tile(np.arange(n), 2),
+        })
+        gf, ga = np.concatenate([hg, ag]), np.concatenate([ag, hg])
+        is_home = np.repeat([True, False], n)
+        long['Result'] = np.where(gf > ga, 'W', np.where(gf == ga, 'D', 'L'))
+        deltas = pd.DataFrame(self._deltas(gf, ga, is_home), columns=self.STATS)
+
+        order = long.sort_values(['Div', 'Season', 'Team', 'Date', 'Order'], kind='stable').index.to_numpy()
+        long, deltas = long.iloc[order].reset_index(drop=True), deltas.iloc[order].reset_index(drop=True)
+        keys = [long['Div'].fillna('?'), long['Season'].fillna(self.NO_SEASON), long['Team']]
+        cum = deltas.groupby(keys).cumsum().to_numpy()
+
+        for (d, s, team), rows in long.groupby(keys, sort=False).indices.items():
+            self.leagues.setdefault((d, s), {})[team] = {
+                'dates': long['Date'].iloc[rows].tolist(),
+                'cum': cum[rows],
+                'results': list(long['Result'].to_numpy()[rows]),
+            }
+
+    def add_result(self, div, season, date, home_team, away_team, home_goals, away_goals):
+        """Folds one new result into its league table (only the two teams are touched)."""
+        if pd.isna(home_goals) or pd.isna(away_goals):
+            return
+        div = '?' if div is None or pd.isna(div) else div
+        season = self.NO_SEASON if season is None or pd.isna(season) else season
+        date = pd.Timestamp(date) if date is not None else pd.NaT
+        hg, ag = float(home_goals), float(away_goals)
+        deltas = self._deltas(np.array([hg, ag]), np.array([ag, hg]), np.array([True, False]))
+
+        with self._lock:
+            league = self.leagues.setdefault((div, season), {})
+            for team, delta, gf, ga in [(home_team, deltas[0], hg, ag), (away_team, deltas[1], ag, hg)]:
+                entry = league.setdefault(team, {'dates': [], 'cum': np.zeros((0, len(self.STATS))), 'results': []})
+                result = 'W' if gf > ga else ('D' if gf == ga else 'L')
+                pos = len(entry['dates'])
+                if pos and pd.notna(date) and pd.notna(entry['dates'][-1]) and date < entry['dates'][-1]:
+                    # Late result: insert in date order and re-accumulate this team only
+                    pos = bisect.bisect_right(entry['dates'], date)
+                    steps = np.diff(np.vstack([np.zeros(len(self.STATS)), entry['cum']]), axis=0)
+                    steps = np.insert(steps, pos, delta, axis=0)
+                    entry['cum'] = np.cumsum(steps, axis=0)
+                else:
+                    prev = entry['cum'][-1] if pos else np.zeros(len(self.STATS))
+                    entry['cum'] = np.vstack([entry['cum'], prev + delta])
+                entry['dates'].insert(pos, date)
+                entry['results'].insert(pos, result)
+
+    def update(self, new_matches):
+        """Folds a frame of new results (football-data columns) into the tables."""
+        for row in new_matches.itertuples(index=False):
+            self.add_result(getattr(row, 'Div', None), getattr(row, 'Season', None), getattr(row, 'Date', None),
+                            row.HomeTeam, row.AwayTeam, row.FTHG, row.FTAG)
+        return self
+
+    # --- QUERY ---
+
+    def seasons(self, div):
+        """Seasons available for a league, oldest first."""
+        return sorted(s for d, s in self.leagues if d == div)
+
+    def latest_season(self, div):
+        seasons = self.seasons(div)
+        return seasons[-1] if seasons else None
+
+    def table(self, div, season=None, as_of=None, strict=False):
+        """
+        League table sorted by Points, GoalDiff, GoalsFor (Position is 1-based).
+        season: Defaults to the latest season of the league.
+        as_of: Only results up to this date (before it if strict), for backtesting.
+        Columns: Position, Team, STATS..., GoalDiff, Form (newest first, e.g. 'W-D-L-W-W').
+        """
+        season = self.latest_season(div) if season is None else season
+        league = self.leagues.get((div, season))
+        if not league:
+            return pd.DataFrame(columns=['Position', 'Team'] + self.STATS + ['GoalDiff', 'Form'])
+
+        as_of = pd.Timestamp(as_of) if as_of is not None else None
+        teams, rows, forms = [], [], []
+        for team, entry in league.items():
+            n = len(entry['dates'])
+            if as_of is not None:
+                side = bisect.bisect_left if strict else bisect.bisect_right
+                n = side(entry['dates'], as_of)
+            teams.append(team)
+            rows.append(entry['cum'][n - 1] if n else np.zeros(len(self.STATS)))
+            forms.append('-'.join(entry['results'][max(0, n - self.FORM_LENGTH):n][::-1]))
+
+        table = pd.DataFrame(np.vstack(rows), columns=self.STATS).astype(int)
+        table.insert(0, 'Team', teams)
+        table['GoalDiff'] = table['GoalsFor'] - table['GoalsAgainst']
+        table['Form'] = forms
+        table = table.sort_values(['Points', 'GoalDiff', 'GoalsFor', 'Team'],
+                                  ascending=[False, False, False, True], kind='stable').reset_index(drop=True)
+        table.insert(0, 'Position', np.arange(1, len(table) + 1))
+        return table
+
+    def positions(self, div, season=None, as_of=None, strict=True):
+        """{team: position} as of a date (before it by default)."""
+        table = self.table(div, season, as_of, strict)
+        return dict(zip(table['Team'], table['Position']))
+
+    def position_features(self, matches):
+        """
+        Pre-match standings of both teams for every row of `matches`
+        (Div, Season, Date, HomeTeam, AwayTeam): HomePosition, AwayPosition,
+        HomeLeaguePoints, AwayLeaguePoints. One snapshot per (Div, Season, Date).
+        """
+        out = pd.DataFrame(index=matches.index, columns=['HomePosition', 'AwayPosition', 'HomeLeaguePoints', 'AwayLeaguePoints'], dtype=float)
+        if matches.empty:
+            return out
+        keys = pd.DataFrame({
+            'Div': matches['Div'] if 'Div' in matches.columns else '?',
+            'Season': matches['Season'] if 'Season' in matches.columns else self.NO_SEASON,
+            'Date': pd.to_datetime(matches['Date'], errors='coerce'),
+        }, index=matches.index)
+        for (div, season, date), idx in keys.groupby(['Div', 'Season', 'Date']).groups.items():
+            table = self.table(div, season, as_of=date, strict=True).set_index('Team')
+            for side in ['Home', 'Away']:
+                teams = matches.loc[idx, f'{side}Team']
+                out.loc[idx, f'{side}Position'] = table['Position'].reindex(teams).to_numpy()
+                out.loc[idx, f'{side}LeaguePoints'] = table['Points'].reindex(teams).to_numpy()
+        return out
@@ -0,0 +1,206 @@
+import operator
+import threading
+
+import pandas as pd
+import numpy as np
+from src.engine.team_matches import TeamMatchTable
+from src.utils.cache import VersionedLRU
+
+
+class TeamStatsCube:
+    """
+    Precomputed team x venue x window x period averages of every searchable stat.
+
+    Each slice (venue, window, period) is a DataFrame indexed by Team with one
+    column per stat (mean over the team's last `window` played matches), plus
+    Div and Matches. Rates (Over05, BTTS, ...) are means of 0/1 flags.
+    Compound queries are a single boolean filter over one slice.
+
+    Build it through `TeamStatsCube.get(df)`, which caches one cube per data version.
+    """
+    VENUES = ['All', 'Home', 'Away']
+    WINDOWS = [2, 3, 5, 10, 20]
+    PERIODS = ['Full', '1H', '2H']
+
+    # Stat name -> team-match column (Full time only)
+    TEAM_STATS = {
+        'Córners': 'CornersFor',
+        'Córners Recibidos': 'CornersAgainst',
+        'Tiros': 'ShotsFor',
+        'Tiros a Puerta': 'ShotsTargetFor',
+        'Faltas': 'FoulsFor',
+        'Tarjetas Amarillas': 'YellowFor',
+        'Tarjetas Rojas': 'RedFor',
+    }
+    GOAL_LINES = {'Over05': 0.5, 'Over15': 1.5, 'Over25': 2.5, 'Over35': 3.5}
+    STATS = ['Goles', 'Goles Recibidos', 'Goles Totales'] + list(GOAL_LINES) + ['BTTS', 'Victorias', 'Puntos'] + list(TEAM_STATS)
+
+    OPERATORS = {
+        '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+        '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+    }
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, df):
+        self.table = TeamMatchTable.get(df)
+        frame = self.table.frame
+        # Only played matches count towards the averages
+        self.played = frame[frame['GoalsFor'].notna() & frame['GoalsAgainst'].notna()].reset_index(drop=True)
+        teams = self.played['Team'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]]) if len(teams) else np.array([], dtype=int)
+        ends = np.append(starts[1:], len(teams))
+        self._offsets = dict(zip(teams[starts], zip(starts, ends)))
+        self.values = {period: self._values(period) for period in self.PERIODS}
+        self.slices = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, df):
+        """Shared cube for this data (built once per data version)."""
+        return cls._cache.get_or_build(TeamMatchTable.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    def _values(self, period):
+        """Per team-match value of every stat for one period (NaN where not available)."""
+        m = self.played
+        nan = pd.Series(np.nan, index=m.index)
+        gf, ga = m['GoalsFor'].astype(float), m['GoalsAgainst'].astype(float)
+        if period != 'Full':
+            ht_f = m['HTGoalsFor'].astype(float) if 'HTGoalsFor' in m.columns else nan
+            ht_a = m['HTGoalsAgainst'].astype(float) if 'HTGoalsAgainst' in m.columns else nan
+            gf, ga = (ht_f, ht_a) if period == '1H' else (gf - ht_f, ga - ht_a)
+
+        def flag(mask, valid):
+            return mask.astype(float).where(valid)
+
+        known = gf.notna() & ga.notna()
+        total = gf + ga
+        out = {
+            'Goles': gf,
+            'Goles Recibidos': ga,
+            'Goles Totales': total,
+            'BTTS': flag((gf > 0) & (ga > 0), known),
+            'Victorias': flag(gf > ga, known),
+            'Puntos': pd.Series(np.where(gf > ga, 3.0, np.where(gf == ga, 1.0, 0.0)), index=m.index).where(known),
+        }
+        for name, line in self.GOAL_LINES.items():
+            out[name] = flag(total > line, known)
+        for name, col in self.TEAM_STATS.items():
+            out[name] = m[col].astype(float) if period == 'Full' and col in m.columns else nan
+        return pd.DataFrame(out)[self.STATS]
+
+    def _build_slice(self, venue, window, period):
+        m = self.played
+        sel = np.ones(len(m), dtype=bool) if venue == 'All' else (m['Venue'] == venue).to_numpy()
+        sub = m[sel]
+        teams = sub['Team']
+        # Rows are in (Team, Date) order: age 0 = newest match
+        age = teams.groupby(teams).cumcount(ascending=False).to_numpy()
+        recent = age < window
+
+        values = self.values[period][sel][recent]
+        out = values.groupby(teams[recent].to_numpy()).mean()
+        out.index.name = 'Team'
+        out['Matches'] = teams[recent].value_counts().reindex(out.index).to_numpy()
+        newest = sub[age == 0].set_index('Team')
+        out['Div'] = newest['Div'].reindex(out.index) if 'Div' in newest.columns else 'Unk'
+        return out
+
+    def slice(self, venue='All', window=10, period='Full'):
+        """Per-team averages over the last `window` matches (built on first use for new windows)."""
+        key = (venue, int(window), period)
+        with self._lock:
+            out = self.slices.get(key)
+        if out is None:
+            out = self._build_slice(*key)
+            with self._lock:
+                self.slices[key] = out
+        return out
+
+    def precompute(self):
+        """Builds every default slice up front."""
+        for venue in self.VENUES:
+            for window in self.WINDOWS:
+                for period in self.PERIODS:
+                    self.slice(venue, window, period)
+        return self
+
+    # --- QUERY ---
+
+    def query(self, criteria, window=10, venue='All', period='Full', min_matches=None, divs=None,
+              sort_by=None, ascending=False, top_k=None, page=None, page_size=20):
+        """
+        Teams matching ALL criteria, e.g.
+            query([('Over25', '>=', 0.8), ('Córners', '>=', 5)], window=10, venue='Away')
+
+        criteria: list of (stat, operator, value). A stat may carry its own venue/window
+            as (stat, operator, value, venue, window) to mix slices in one query.
+        min_matches: Minimum matches in the window (default: the full window).
+        sort_by: Stat to rank by (default: first criterion); top_k keeps the first k.
+        page: 1-based page of page_size rows (None = all rows).
+        Returns a DataFrame [Team, Div, Matches, <stats>]; attrs['total'] and
+        attrs['pages'] hold the size of the full result.
+        """
+        base = self.slice(venue, window, period)
+        min_matches = window if min_matches is None else min_matches
+        mask = (base['Matches'] >= min_matches).to_numpy().copy()
+        if divs:
+            mask &= base['Div'].isin(divs).to_numpy()
+
+        cols = {}
+        for crit in criteria:
+            stat, op, value = crit[:3]
+            if stat not in self.STATS:
+                raise ValueError(f"Estadística desconocida: {stat}")
+            if op not in self.OPERATORS:
+                raise ValueError(f"Operador desconocido: {op}")
+            c_venue = crit[3] if len(crit) > 3 else venue
+            c_window = crit[4] if len(crit) > 4 else window
+            col = self.slice(c_venue, c_window, period)[stat].reindex(base.index)
+            mask &= self.OPERATORS[op](col, value).fillna(False).to_numpy(dtype=bool)
+            cols[stat if (c_venue, c_window) == (venue, window) else f"{stat} ({c_venue} L{c_window})"] = col
+
+        res = base.loc[mask, ['Div', 'Matches']].copy()
+        for name, col in cols.items():
+            res[name] = col[mask]
+
+        sort_by = sort_by or (next(iter(cols)) if cols else None)
+        if sort_by:
+            if sort_by not in res.columns:
+                res[sort_by] = base.loc[mask, sort_by]
+            res = res.sort_values(sort_by, ascending=ascending, kind='stable')
+        if top_k:
+            res = res.head(top_k)
+
+        total = len(res)
+        if page:
+            start = (page - 1) * page_size
+            res = res.iloc[start:start + page_size]
+
+        res = res.reset_index()
+        res.attrs['total'] = total
+        res.attrs['pages'] = max(1, -(-total // page_size))
+        return res
+
+    def last_matches(self, team, n, stat, venue='All', period='Full'):
+        """Newest-first list of {Date, Opponent, Result, Venue, Value} for one team."""
+        start, end = self._offsets.get(team, (0, 0))
+        block = self.played.iloc[start:end]
+        values = self.values[period].loc[block.index, stat]
+        if venue != 'All':
+            keep = block['Venue'] == venue
+            block, values = block[keep], values[keep]
+        block, values = block.iloc[::-1].head(n), values.iloc[::-1].head(n)
+
+        gf, ga = block['GoalsFor'].to_numpy(), block['GoalsAgainst'].to_numpy()
+        results = np.where(gf > ga, 'W', np.where(gf == ga, 'D', 'L'))
+        return [
+            {'Date': d, 'Opponent': o, 'Result': r, 'Venue': v, 'Value': val}
+            for d, o, r, v, val in zip(
+                block['Date'] if 'Date' in block.columns else [None] * len(block),
+                block['Opponent'], results, block['Venue'], values.round(2).tolist()
+            )
+        ]
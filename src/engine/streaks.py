@@ -1,127 +1,90 @@
 import pandas as pd
 import numpy as np
+from src.engine.team_matches import TeamMatchTable
 
 class StreakAnalyzer:
+    # (Tipo, condition over the team-match table, minimum active length to report)
+    STREAK_RULES = [
+        ('Victorias Consecutivas', lambda m: m['Result'] == 'W', 3),
+        ('Partidos Sin Perder', lambda m: m['Result'] != 'L', 5),
+        ('Derrotas Consecutivas', lambda m: m['Result'] == 'L', 3),
+        ('Partidos Sin Ganar', lambda m: m['Result'] != 'W', 5),
+        ('Partidos Marcando', lambda m: m['GoalsFor'] > 0, 5),
+        ('Partidos Encajando', lambda m: m['GoalsAgainst'] > 0, 5),
+    ]
+    for _t in [1.5, 2.5, 3.5]:
+        STREAK_RULES += [
+            (f'Más de {_t} Goles (Total)', lambda m, t=_t: (m['GoalsFor'] + m['GoalsAgainst']) > t, 4),
+            (f'Menos de {_t} Goles (Total)', lambda m, t=_t: (m['GoalsFor'] + m['GoalsAgainst']) < t, 5),
+            (f'Equipo Marca > {_t}', lambda m, t=_t: m['GoalsFor'] > t, 3),
+        ]
+    del _t
+
     def __init__(self, df):
         self.df = df.copy()
         
     def _get_team_matches(self):
         """
-        Transforms the main dataframe into a long format where each row is a team-match.
+        Shared long-form table (one row per team-match, sorted by Team, Date).
         Includes Goals, Corners, and Cards.
         """
-        # Define available columns to fetch if they exist
-        cols = ['Date', 'Div', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']
-        extra_cols = ['HC', 'AC', 'HY', 'AY', 'HR', 'AR']
-        cols_to_use = cols + [c for c in extra_cols if c in self.df.columns]
-        
-        df = self.df[cols_to_use].copy()
-        
-        # Prepare Map
-        home_renames = {
-            'HomeTeam': 'Team', 'FTHG': 'GoalsFor', 'FTAG': 'GoalsAgainst',
-            'HC': 'CornersFor', 'AC': 'CornersAgainst',
-            'HY': 'YellowsFor', 'AY': 'YellowsAgainst',
-            'HR': 'RedsFor', 'AR': 'RedsAgainst'
-        }
-        away_renames = {
-            'AwayTeam': 'Team', 'FTAG': 'GoalsFor', 'FTHG': 'GoalsAgainst',
-            'AC': 'CornersFor', 'HC': 'CornersAgainst',
-            'AY': 'YellowsFor', 'HY': 'YellowsAgainst',
-            'AR': 'RedsFor', 'HR': 'RedsAgainst'
-        }
-        
-        # HOME transform
-        home = df.copy()
-        home = home.rename(columns={k:v for k,v in home_renames.items() if k in home.columns})
-        home['Opponent'] = df['AwayTeam']
-        home['Venue'] = 'Home'
-        home['Result'] = home['FTR'].map({'H': 'W', 'D': 'D', 'A': 'L'})
-        
-        # AWAY transform
-        away = df.copy()
-        away = away.rename(columns={k:v for k,v in away_renames.items() if k in away.columns})
-        away['Opponent'] = df['HomeTeam']
-        away['Venue'] = 'Away'
-        away['Result'] = away['FTR'].map({'H': 'L', 'D': 'D', 'A': 'W'})
-        
-        matches = pd.concat([home, away], ignore_index=True).sort_values(['Team', 'Date'], ascending=[True, False])
-        return matches
+        return TeamMatchTable.get(self.df)
 
-    def get_active_streaks(self):
+    @staticmethod
+    def _run_lengths(conditions, starts):
+        """
+        Run length of True values ending at each row, for several conditions at once.
+        conditions: bool array (n_rows, n_conditions), rows grouped by team in date order.
+        starts: first row index of each team block.
+        Returns (runs per row, current run per team, max run per team).
+        """
+        n = len(conditions)
+        pos = np.arange(n)[:, None]
+        # Position of the last False so far; team starts count as a break just before the block
+        last_break = np.where(conditions, -1, pos)
+        last_break[starts] = np.where(conditions[starts], (starts - 1)[:, None], starts[:, None])
+        last_break = np.maximum.accumulate(last_break, axis=0)
+        runs = pos - last_break
+
+        ends = np.append(starts[1:], n) - 1
+        return runs, runs[ends], np.maximum.reduceat(runs, starts, axis=0)
+
+    def get_active_streaks(self, thresholds=None):
         """
         Calculates active streaks for all teams.
-        Returns a DataFrame with Team, StreakType, Count.
+        Returns a DataFrame with Team, Liga, Tipo, Cantidad, Fecha Ultimo and
+        Maximo Historico (longest run of the same type in the loaded history).
+        
+        thresholds: Optional {Tipo: minimum length} overriding STREAK_RULES.
         """
-        matches = self._get_team_matches()
+        table = self._get_team_matches()
+        matches = table.frame
         if matches.empty:
             return pd.DataFrame()
-
-        streaks = []
-        
-        for team, group in matches.groupby('Team'):
-            group = group.sort_values('Date', ascending=False) # Newest first
             
-            # Helper to count streak
-            def count_streak(condition_series):
-                count = 0
-                for val in condition_series:
-                    if val:
-                        count += 1
-                    else:
-                        break
-                return count
-
-            # Define conditions
-            # 1. Winning Streak
-            win_streak = count_streak(group['Result'] == 'W')
-            if win_streak >= 3:
-                streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Victorias Consecutivas', 'Cantidad': win_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-                
-            # 2. Unbeaten Streak (Not Loss)
-            unbeaten_streak = count_streak(group['Result'] != 'L')
-            if unbeaten_streak >= 5:
-                 streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Partidos Sin Perder', 'Cantidad': unbeaten_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-                 
-            # 3. Losing Streak
-            lose_streak = count_streak(group['Result'] == 'L')
-            if lose_streak >= 3:
-                streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Derrotas Consecutivas', 'Cantidad': lose_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-
-            # 4. No Win Streak
-            no_win_streak = count_streak(group['Result'] != 'W')
-            if no_win_streak >= 5:
-                streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Partidos Sin Ganar', 'Cantidad': no_win_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-
-            # 5. Scoring Streak (GoalsFor > 0)
-            scoring_streak = count_streak(group['GoalsFor'] > 0)
-            if scoring_streak >= 5:
-                streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Partidos Marcando', 'Cantidad': scoring_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-                
-            # 6. Conceding Streak (GoalsAgainst > 0)
-            conceding_streak = count_streak(group['GoalsAgainst'] > 0)
-            if conceding_streak >= 5:
-                 streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': 'Partidos Encajando', 'Cantidad': conceding_streak, 'Fecha Ultimo': group.iloc[0]['Date']})
-                 
-            # 7. Goal Streaks Loop (Total Over/Under)
-            # Thresholds: 1.5, 2.5, 3.5
-            for threshold in [1.5, 2.5, 3.5]:
-                # Over Total
-                streak_over = count_streak((group['GoalsFor'] + group['GoalsAgainst']) > threshold)
-                if streak_over >= 4:
-                     streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': f'Más de {threshold} Goles (Total)', 'Cantidad': streak_over, 'Fecha Ultimo': group.iloc[0]['Date']})
-                
-                # Under Total
-                streak_under = count_streak((group['GoalsFor'] + group['GoalsAgainst']) < threshold)
-                if streak_under >= 5:
-                     streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': f'Menos de {threshold} Goles (Total)', 'Cantidad': streak_under, 'Fecha Ultimo': group.iloc[0]['Date']})
-
-                # Team Scored Over
-                streak_team_over = count_streak(group['GoalsFor'] > threshold)
-                if streak_team_over >= 3:
-                     streaks.append({'Team': team, 'Liga': group.iloc[0]['Div'], 'Tipo': f'Equipo Marca > {threshold}', 'Cantidad': streak_team_over, 'Fecha Ultimo': group.iloc[0]['Date']})
+        thresholds = thresholds or {}
+        
+        names = [name for name, _, _ in self.STREAK_RULES]
+        mins = np.array([thresholds.get(name, min_len) for name, _, min_len in self.STREAK_RULES])
+        conditions = np.column_stack([cond(matches).fillna(False).to_numpy(dtype=bool) for _, cond, _ in self.STREAK_RULES])
+        
+        _, active, longest = self._run_lengths(conditions, table.starts)
+        
+        # Latest match of each team
+        last = matches.iloc[table.ends - 1]
         
-        return pd.DataFrame(streaks).sort_values(['Tipo', 'Cantidad'], ascending=[True, False])
+        t_idx, r_idx = np.nonzero(active >= mins)
+        streaks = pd.DataFrame({
+            'Team': last['Team'].to_numpy()[t_idx],
+            'Liga': last['Div'].to_numpy()[t_idx],
+            'Tipo': np.array(names, dtype=object)[r_idx],
+            'Cantidad': active[t_idx, r_idx],
+            'Fecha Ultimo': last['Date'].to_numpy()[t_idx],
+            'Maximo Historico': longest[t_idx, r_idx],
+        })
+        if streaks.empty:
+            return streaks
+        return streaks.sort_values(['Tipo', 'Cantidad'], ascending=[True, False], kind='stable').reset_index(drop=True)
 
     def get_detailed_trends(self, team, n=6, context=None):
         """
@@ -130,15 +93,15 @@ class StreakAnalyzer:
         
         context: 'Home' or 'Away' (optional, to filter venue specific trends)
         """
-        all_matches = self._get_team_matches()
+        table = self._get_team_matches()
         
         # 1. Global Form
-        global_matches = all_matches[all_matches['Team'] == team].sort_values('Date', ascending=False).head(n)
+        global_matches = table.last(team, n)
         
         # 2. Context Form (Home/Away)
         context_matches = pd.DataFrame()
         if context:
-            context_matches = all_matches[(all_matches['Team'] == team) & (all_matches['Venue'] == context)].sort_values('Date', ascending=False).head(n)
+            context_matches = table.last(team, n, venue=context)
             
         trends = []
         
@@ -179,10 +142,10 @@ class StreakAnalyzer:
                 check(df['CornersFor'] > df['CornersAgainst'], "Más Córners que rival")
                 
             # --- CARDS ---
-            if 'YellowsFor' in df.columns:
-                total_cards = df['YellowsFor'] + df['YellowsAgainst'] # Approx
+            if 'YellowFor' in df.columns:
+                total_cards = df['YellowFor'] + df['YellowAgainst'] # Approx
                 check(total_cards >= 4, "+3.5 Tarjetas")
-                check(df['YellowsFor'] >= 2, "Recibe +1.5 Tarjetas")
+                check(df['YellowFor'] >= 2, "Recibe +1.5 Tarjetas")
         
         # Analyze Global
         analyze_subset(global_matches, "(Global)")
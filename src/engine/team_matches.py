@@ -0,0 +1,142 @@
+import pandas as pd
+import numpy as np
+from src.utils.cache import frame_version, VersionedLRU
+
+
+class TeamMatchTable:
+    """
+    Canonical long-form view of the match history: one row per team per match.
+
+    Rows are sorted by (Team, Date) and each team's matches are a contiguous block,
+    so `team(name)` is an O(1) slice. `Row` is the position of the match in the
+    source frame, used to write per-team results back onto match rows.
+
+    Build it through `TeamMatchTable.get(df)`, which caches one table per data version.
+    """
+    # (home column, away column, 'For' name, 'Against' name)
+    STAT_PAIRS = [
+        ('FTHG', 'FTAG', 'GoalsFor', 'GoalsAgainst'),
+        ('HTHG', 'HTAG', 'HTGoalsFor', 'HTGoalsAgainst'),
+        ('HS', 'AS', 'ShotsFor', 'ShotsAgainst'),
+        ('HST', 'AST', 'ShotsTargetFor', 'ShotsTargetAgainst'),
+        ('HF', 'AF', 'FoulsFor', 'FoulsAgainst'),
+        ('HC', 'AC', 'CornersFor', 'CornersAgainst'),
+        ('HY', 'AY', 'YellowFor', 'YellowAgainst'),
+        ('HR', 'AR', 'RedFor', 'RedAgainst'),
+    ]
+    META_COLS = ['Date', 'Div', 'Season', 'Referee']
+    # Derived when both FTHG/FTAG and HTHG/HTAG are present
+    HALF_COLS = ['2HGoalsFor', '2HGoalsAgainst']
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, df):
+        self.n_matches = len(df)
+        self.frame = self._explode(df)
+
+        teams = self.frame['Team'].to_numpy()
+        if len(teams):
+            self.starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]])
+        else:
+            self.starts = np.array([], dtype=int)
+        self.ends = np.append(self.starts[1:], len(teams)).astype(int)
+        self.teams = pd.Index(teams[self.starts])
+        self._offsets = dict(zip(self.teams, zip(self.starts, self.ends)))
+
+    # --- CACHE ---
+
+    @classmethod
+    def version(cls, df):
+        """Content hash of the columns the table is built from."""
+        cols = ['HomeTeam', 'AwayTeam', 'FTR'] + cls.META_COLS + [c for h, a, _, _ in cls.STAT_PAIRS for c in (h, a)]
+        return frame_version(df, cols)
+
+    @classmethod
+    def get(cls, df):
+        """Shared table for this data (built once per data version)."""
+        return cls._cache.get_or_build(cls.version(df), lambda: cls(df))
+
+    # --- BUILD ---
+
+    def _explode(self, df):
+        n = len(df)
+        data = {}
+        data['Team'] = np.concatenate([df['HomeTeam'].to_numpy(), df['AwayTeam'].to_numpy()])
+        data['Opponent'] = np.concatenate([df['AwayTeam'].to_numpy(), df['HomeTeam'].to_numpy()])
+        data['Venue'] = np.repeat(np.array(['Home', 'Away'], dtype=object), n)
+        data['IsHome'] = np.repeat([True, False], n)
+        data['Row'] = np.tile(np.arange(n), 2)
+        for col in self.META_COLS:
+            if col in df.columns:
+                vals = df[col].to_numpy()
+                data[col] = np.concatenate([vals, vals])
+
+        for h, a, f, ag in self.STAT_PAIRS:
+            if h in df.columns and a in df.columns:
+                hv, av = df[h].to_numpy(), df[a].to_numpy()
+                data[f] = np.concatenate([hv, av])
+                data[ag] = np.concatenate([av, hv])
+
+        # Second-half goals derived from full time minus half time
+        if 'HTGoalsFor' in data and 'GoalsFor' in data:
+            for full, half in [('GoalsFor', 'HTGoalsFor'), ('GoalsAgainst', 'HTGoalsAgainst')]:
+                data[f'2H{full}'] = np.clip(data[full].astype(float) - data[half].astype(float), 0, None)
+
+        if 'FTR' in df.columns:
+            ftr = df['FTR']
+            data['Result'] = np.concatenate([
+                ftr.map({'H': 'W', 'D': 'D', 'A': 'L'}).to_numpy(),
+                ftr.map({'H': 'L', 'D': 'D', 'A': 'W'}).to_numpy()
+            ])
+            data['Points'] = np.concatenate([
+                ftr.map({'H': 3, 'D': 1, 'A': 0}).to_numpy(dtype=float),
+                ftr.map({'A': 3, 'D': 1, 'H': 0}).to_numpy(dtype=float)
+            ])
+
+        frame = pd.DataFrame(data)
+        sort_cols = ['Team', 'Date'] if 'Date' in frame.columns else ['Team']
+        return frame.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+    # --- ACCESS ---
+
+    def team(self, team, venue=None):
+        """All matches of one team in date order (optionally only 'Home' or 'Away')."""
+        start, end = self._offsets.get(team, (0, 0))
+        block = self.frame.iloc[start:end]
+        if venue:
+            block = block[block['Venue'] == venue]
+        return block
+
+    def last(self, team, n, venue=None):
+        """Last n matches of one team, newest first."""
+        return self.team(team, venue).iloc[::-1].head(n)
+
+    def column(self, name, default=np.nan):
+        """Column as an array aligned to the table rows (default if the source lacked it)."""
+        if name in self.frame.columns:
+            return self.frame[name].to_numpy()
+        return np.full(len(self.frame), default)
+
+    def from_matches(self, home_values, away_values):
+        """
+        Per-row array picking home_values[row] for home rows and away_values[row] for away rows
+        (both aligned to the source matches). E.g. from_matches(df['AwayPPG'], df['HomePPG'])
+        is the opponent's PPG for every team-match.
+        """
+        rows = self.frame['Row'].to_numpy()
+        home_values, away_values = np.asarray(home_values), np.asarray(away_values)
+        return np.where(self.frame['IsHome'].to_numpy(), home_values[rows], away_values[rows])
+
+    def to_matches(self, values):
+        """
+        Writes per-row values back onto the source matches.
+        values: DataFrame aligned to the table rows.
+        Returns (home, away) DataFrames indexed by source row position.
+        """
+        values = pd.DataFrame(values).reset_index(drop=True)
+        rows = self.frame['Row'].to_numpy()
+        is_home = self.frame['IsHome'].to_numpy()
+        home = values[is_home].set_axis(rows[is_home]).reindex(range(self.n_matches))
+        away = values[~is_home].set_axis(rows[~is_home]).reindex(range(self.n_matches))
+        return home, away
@@ -0,0 +1,206 @@
+import pandas as pd
+import numpy as np
+from src.engine.team_matches import TeamMatchTable
+from src.utils.cache import VersionedLRU
+
+
+def _popcount(values):
+    """Number of set bits of each uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(int)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    bits = np.unpackbits(values.view(np.uint8).reshape(*values.shape, 8), axis=-1)
+    return bits.sum(axis=-1).astype(int)
+
+
+class TrendIndex:
+    """
+    Outcome of every trend condition for the last WINDOW matches of each team,
+    packed as one uint64 per (team, condition) and venue ('All', 'Home', 'Away').
+
+    Bit 0 is the newest match, so "hits in the last n" is
+    popcount(bits & (2**n - 1)) and an "L8/10 +1.5 Goles" query costs a few
+    integer operations instead of a pass over the history.
+
+    Build it through `TrendIndex.get(df)`. When df is a cached version plus newer
+    rows appended at the end, the cached index is shifted forward with only the
+    new matches instead of being rebuilt.
+    """
+    WINDOW = 64
+    VENUES = ['All', 'Home', 'Away']
+
+    # Thresholds per metric ('metric>t' conditions), plus a few unders and flags
+    OVERS = {
+        'TotalGoals': [0.5, 1.5, 2.5, 3.5],
+        'GoalsFor': [0.5, 1.5, 2.5],
+        'TotalCorners': [7.5, 8.5, 9.5, 10.5],
+        'CornersFor': [3.5, 4.5, 5.5],
+        'TotalCards': [2.5, 3.5, 4.5, 5.5],
+        'CardsFor': [0.5, 1.5, 2.5],
+    }
+    UNDERS = {
+        'TotalGoals': [2.5, 3.5],
+    }
+    FLAGS = ['BTTS', 'CleanSheet', 'Win', 'NotLose', 'MoreCorners', 'MoreCards']
+
+    CONDITIONS = [f'{m}>{t}' for m, ts in OVERS.items() for t in ts]
+    CONDITIONS += [f'{m}<{t}' for m, ts in UNDERS.items() for t in ts]
+    CONDITIONS += FLAGS
+
+    CACHE_SIZE = 4
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, table=None):
+        self.teams = pd.Index([])
+        self.bits = {v: np.zeros((0, len(self.CONDITIONS)), dtype=np.uint64) for v in self.VENUES}
+        self.counts = {v: np.zeros(0, dtype=int) for v in self.VENUES}
+        self.n_matches = 0
+        self.last_date = None
+        self.version = None
+        if table is not None:
+            self._add(table)
+
+    # --- CACHE ---
+
+    @classmethod
+    def get(cls, df):
+        """Shared index for this data (built once per data version, extended when rows are appended)."""
+        key = TeamMatchTable.version(df)
+        index = cls._cache.get(key)
+        if index is not None:
+            return index
+
+        index = cls._extend(cls._cache.latest(), df)
+        if index is None:
+            index = cls(TeamMatchTable.get(df))
+            index.n_matches = len(df)
+        index.version = key
+        return cls._cache.put(key, index)
+
+    @classmethod
+    def _extend(cls, base, df):
+        """base + the rows appended to df since, or None if df is not an extension of base."""
+        if base is None or len(df) <= base.n_matches:
+            return None
+        new = df.iloc[base.n_matches:]
+        if base.last_date is not None and 'Date' in df.columns:
+            if (pd.to_datetime(new['Date'], errors='coerce') < base.last_date).any():
+                return None
+        if TeamMatchTable.version(df.iloc[:base.n_matches]) != base.version:
+            return None
+
+        index = base.copy()
+        index._add(TeamMatchTable(new))
+        index.n_matches = len(df)
+        return index
+
+    def copy(self):
+        other = TrendIndex()
+        other.teams = self.teams
+        other.bits = {v: b.copy() for v, b in self.bits.items()}
+        other.counts = {v: c.copy() for v, c in self.counts.items()}
+        other.n_matches = self.n_matches
+        other.last_date = self.last_date
+        other.version = self.version
+        return other
+
+    # --- BUILD ---
+
+    @classmethod
+    def _outcomes(cls, frame):
+        """Bool matrix (rows, CONDITIONS) over a team-match frame. Missing stats count as 0."""
+        def stat(col):
+            return frame[col] if col in frame.columns else pd.Series(0, index=frame.index)
+
+        gf, ga = frame['GoalsFor'], frame['GoalsAgainst']
+        cf, ca = stat('CornersFor'), stat('CornersAgainst')
+        cards_f = stat('YellowFor') + stat('RedFor')
+        cards_a = stat('YellowAgainst') + stat('RedAgainst')
+        result = stat('Result')
+        metrics = {
+            'TotalGoals': gf + ga,
+            'GoalsFor': gf,
+            'TotalCorners': cf + ca,
+            'CornersFor': cf,
+            'TotalCards': cards_f + cards_a,
+            'CardsFor': cards_f,
+            'BTTS': (gf > 0) & (ga > 0),
+            'CleanSheet': ga == 0,
+            'Win': result == 'W',
+            'NotLose': result != 'L',
+            'MoreCorners': cf > ca,
+            'MoreCards': cards_f > cards_a,
+        }
+        cols = []
+        for m, ts in cls.OVERS.items():
+            cols += [metrics[m] > t for t in ts]
+        for m, ts in cls.UNDERS.items():
+            cols += [metrics[m] < t for t in ts]
+        cols += [metrics[f] for f in cls.FLAGS]
+        return np.column_stack([c.fillna(False).to_numpy(dtype=bool) for c in cols])
+
+    def _add(self, table):
+        """
+        Shifts the newer matches of `table` into the index. Every match in `table`
+        must be newer than the ones already indexed (a fresh index takes any table).
+        """
+        frame = table.frame
+        if frame.empty:
+            return
+
+        new_teams = pd.Index(table.teams).difference(self.teams)
+        if len(new_teams):
+            self.teams = self.teams.append(new_teams)
+            for v in self.VENUES:
+                self.bits[v] = np.vstack([self.bits[v], np.zeros((len(new_teams), len(self.CONDITIONS)), dtype=np.uint64)])
+                self.counts[v] = np.append(self.counts[v], np.zeros(len(new_teams), dtype=int))
+
+        outcomes = self._outcomes(frame).astype(np.uint64)
+        codes = self.teams.get_indexer(frame['Team'])
+        venues = frame['Venue'].to_numpy()
+        n_teams = len(self.teams)
+
+        for v in self.VENUES:
+            sel = np.ones(len(frame), dtype=bool) if v == 'All' else venues == v
+            c, o = codes[sel], outcomes[sel]
+            # Rows are in (Team, Date) order: age 0 = newest match of each team
+            age = pd.Series(c).groupby(c).cumcount(ascending=False).to_numpy()
+            keep = age < self.WINDOW
+            packed = np.zeros((n_teams, len(self.CONDITIONS)), dtype=np.uint64)
+            np.bitwise_or.at(packed, c[keep], o[keep] << age[keep].astype(np.uint64)[:, None])
+
+            added = np.bincount(c, minlength=n_teams)
+            shift = np.minimum(added, self.WINDOW - 1).astype(np.uint64)[:, None]
+            old = np.where(added[:, None] >= self.WINDOW, np.uint64(0), self.bits[v] << shift)
+            self.bits[v] = old | packed
+            self.counts[v] = np.minimum(self.counts[v] + added, self.WINDOW)
+
+        if 'Date' in frame.columns:
+            last = pd.to_datetime(frame['Date'], errors='coerce').max()
+            if pd.notna(last):
+                self.last_date = last if self.last_date is None else max(self.last_date, last)
+
+    # --- QUERY ---
+
+    def count(self, team, venue='All'):
+        """Indexed matches of a team (capped at WINDOW)."""
+        i = self.teams.get_indexer([team])[0]
+        return int(self.counts[venue][i]) if i >= 0 else 0
+
+    def window(self, team, n=10, venue='All'):
+        """
+        Hits of every condition over the team's last n matches.
+        Returns ({condition: hits}, total) where total = min(n, matches played).
+        """
+        n = min(n, self.WINDOW)
+        i = self.teams.get_indexer([team])[0]
+        if i < 0 or n <= 0:
+            return {c: 0 for c in self.CONDITIONS}, 0
+        mask = np.uint64((1 << n) - 1)
+        hits = _popcount(self.bits[venue][i] & mask)
+        return dict(zip(self.CONDITIONS, hits.tolist())), min(n, int(self.counts[venue][i]))
+
+    def hits(self, team, condition, n=10, venue='All'):
+        """(hits, total) of one condition, e.g. hits(team, 'TotalGoals>1.5', 10)."""
+        window, total = self.window(team, n, venue)
+        return window[condition], total
@@ -0,0 +1,116 @@
+import pandas as pd
+import numpy as np
+
+
+class ValueEngine:
+    """
+    Finds value bets on a slate of predicted matches.
+
+    Joins the goal model probabilities (GM_* columns from Predictor.predict_match_safe)
+    to every bookmaker odds column available for the same market, then computes
+    edge, expected value and fractional Kelly stakes for the whole slate at once.
+    """
+    # (market key, suggestion label, probability column, odds columns in order of preference)
+    MARKETS = [
+        ('Home', 'Victoria Local', 'GM_HomeWin', ['B365H', 'AvgH']),
+        ('Draw', 'Empate', 'GM_Draw', ['B365D', 'AvgD']),
+        ('Away', 'Victoria Visitante', 'GM_AwayWin', ['B365A', 'AvgA']),
+        ('BTTS_Yes', 'Ambos Marcan (Sí)', 'GM_BTTS', ['B365_BTTS_Yes', 'B365GG']),
+        ('BTTS_No', 'Ambos Marcan (No)', 'GM_BTTS_No', ['B365_BTTS_No', 'B365NG']),
+    ]
+    for _line in [0.5, 1.5, 2.5, 3.5, 4.5]:
+        MARKETS.append((f'Over{_line}', f'Más de {_line} Goles', f'GM_Over{_line}', [f'B365_Over{_line}']))
+        MARKETS.append((f'Under{_line}', f'Menos de {_line} Goles', f'GM_Under{_line}', [f'B365_Under{_line}']))
+    for _line in [0.5, 1.5, 2.5]:
+        MARKETS.append((f'HomeOver{_line}', f'Local: Más de {_line} Goles', f'GM_HomeOver{_line}', [f'B365_HomeTeam_Goals_Over{_line}']))
+        MARKETS.append((f'AwayOver{_line}', f'Visitante: Más de {_line} Goles', f'GM_AwayOver{_line}', [f'B365_AwayTeam_Goals_Over{_line}']))
+    del _line
+
+    def __init__(self, kelly_fraction=0.25, min_edge=0.03, min_odd=1.25, max_odd=8.0,
+                 max_stake=0.05, max_match_exposure=0.08, max_matchday_exposure=0.25):
+        """
+        Stakes are fractions of the bankroll.
+        kelly_fraction: Share of the full Kelly stake to bet (0.25 = quarter Kelly).
+        max_stake / max_match_exposure / max_matchday_exposure: Caps per bet, per match
+            and per matchday (all bets on the same date).
+        """
+        self.kelly_fraction = kelly_fraction
+        self.min_edge = min_edge
+        self.min_odd = min_odd
+        self.max_odd = max_odd
+        self.max_stake = max_stake
+        self.max_match_exposure = max_match_exposure
+        self.max_matchday_exposure = max_matchday_exposure
+
+    def _matrices(self, slate):
+        """Probability and odds matrices, shape (n_matches, n_markets). NaN where unavailable."""
+        n = len(slate)
+        if 'GM_BTTS' in slate.columns and 'GM_BTTS_No' not in slate.columns:
+            slate = slate.assign(GM_BTTS_No=1 - slate['GM_BTTS'])
+
+        probs = np.full((n, len(self.MARKETS)), np.nan)
+        odds = np.full((n, len(self.MARKETS)), np.nan)
+        for k, (_, _, prob_col, odd_cols) in enumerate(self.MARKETS):
+            if prob_col in slate.columns:
+                probs[:, k] = pd.to_numeric(slate[prob_col], errors='coerce').to_numpy()
+            for col in odd_cols:
+                if col in slate.columns:
+                    vals = pd.to_numeric(slate[col], errors='coerce').to_numpy()
+                    odds[:, k] = np.where(np.isnan(odds[:, k]), vals, odds[:, k])
+        return probs, odds
+
+    def evaluate(self, slate):
+        """
+        slate: DataFrame, one row per match (prediction row + odds columns).
+        Returns the value bets ranked by EV, one row per (match, market):
+            match_idx, HomeTeam, AwayTeam, Date, Div, market, suggestion,
+            prob, odd, fair_odd, edge, kelly, stake
+        """
+        cols = ['match_idx', 'HomeTeam', 'AwayTeam', 'Date', 'Div', 'market', 'suggestion',
+                'prob', 'odd', 'fair_odd', 'edge', 'kelly', 'stake']
+        if slate is None or slate.empty:
+            return pd.DataFrame(columns=cols)
+
+        slate = slate.reset_index(drop=True)
+        probs, odds = self._matrices(slate)
+
+        # Edge = EV per unit staked; Kelly fraction f* = edge / (odd - 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            edge = probs * odds - 1
+            kelly = edge / (odds - 1)
+        valid = (edge >= self.min_edge) & (odds >= self.min_odd) & (odds <= self.max_odd) & (probs > 0)
+
+        rows, mkts = np.nonzero(valid)
+        if len(rows) == 0:
+            return pd.DataFrame(columns=cols)
+
+        meta = slate.reindex(columns=['HomeTeam', 'AwayTeam', 'Date', 'Div']).iloc[rows].reset_index(drop=True)
+        bets = pd.DataFrame({
+            'match_idx': rows,
+            'HomeTeam': meta['HomeTeam'],
+            'AwayTeam': meta['AwayTeam'],
+            'Date': meta['Date'],
+            'Div': meta['Div'],
+            'market': [self.MARKETS[k][0] for k in mkts],
+            'suggestion': [self.MARKETS[k][1] for k in mkts],
+            'prob': probs[rows, mkts],
+            'odd': odds[rows, mkts],
+            'fair_odd': 1 / probs[rows, mkts],
+            'edge': edge[rows, mkts],
+            'kelly': kelly[rows, mkts],
+        })
+        bets['stake'] = np.minimum(bets['kelly'] * self.kelly_fraction, self.max_stake)
+        bets = self._apply_caps(bets)
+        return bets.sort_values(['edge', 'prob'], ascending=False).reset_index(drop=True)[cols]
+
+    def _apply_caps(self, bets):
+        """Scales stakes down proportionally so each match and each matchday stays under its cap."""
+        def scale(keys, cap):
+            total = bets.groupby(keys)['stake'].transform('sum')
+            return np.where(total > cap, cap / total, 1.0)
+
+        bets['stake'] = bets['stake'] * scale(bets['match_idx'], self.max_match_exposure)
+        day = pd.to_datetime(bets['Date'], errors='coerce').dt.normalize().fillna(pd.Timestamp(0))
+        bets['stake'] = bets['stake'] * scale(day, self.max_matchday_exposure)
+        bets['stake'] = bets['stake'].round(4)
+        return bets
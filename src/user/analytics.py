@@ -0,0 +1,151 @@
+import pandas as pd
+import numpy as np
+from src.user.store import Store
+from src.utils.cache import VersionedLRU
+
+SETTLED = ['Won', 'Lost', 'Void']
+ODDS_BANDS = [1.0, 1.5, 2.0, 3.0, 5.0, np.inf]
+ODDS_LABELS = ['1.00-1.49', '1.50-1.99', '2.00-2.99', '3.00-4.99', '5.00+']
+
+
+class PortfolioAnalytics:
+    """
+    Vectorized portfolio analytics of one user's ledger (no row loops).
+
+    - summary: P/L, staked/returned, ROI, yield, win/hit rate, max drawdown
+    - curve: bankroll after each settled real-money bet (in match order)
+    - by_strategy / by_league / by_odds: the same KPIs per group
+
+    Money figures count real bets only (stake > 0); win/hit rates also count
+    tracking predictions. ROI = profit / staked (every settled stake, as the
+    portfolio page always showed it); yield = profit / stake at risk (voids
+    excluded); hit rate = won / (won + lost).
+
+    Use `PortfolioAnalytics.get(store, username)`: reports are cached per
+    (user, ledger version), so rerenders cost one version lookup until a bet changes.
+    """
+    CACHE_SIZE = 64
+    _cache = VersionedLRU(CACHE_SIZE)
+
+    def __init__(self, bets, start_balance=0.0):
+        self.start_balance = float(start_balance or 0.0)
+        self.bets = self._prepare(bets)
+        settled = self.bets[self.bets['status'].isin(SETTLED)]
+        self.curve = self._curve(settled[settled['stake'] > 0])
+        self.summary = self._summary(self.bets, self.curve)
+        self.by_strategy = self.breakdown('strategy')
+        self.by_league = self.breakdown('league')
+        self.by_odds = self.breakdown('odds_band')
+
+    @classmethod
+    def get(cls, store, username):
+        """Cached report of the user's current ledger (username already cleaned)."""
+        key = (store.path, username, store.ledger_version(username))
+        report = cls._cache.get(key)
+        if report is not None:
+            return report
+
+        rows = store.execute("SELECT * FROM bets WHERE username = ? ORDER BY seq", (username,)).fetchall()
+        balance = store.execute("SELECT balance FROM portfolios WHERE username = ?", (username,)).fetchone()
+        report = cls([Store.bet_dict(r) for r in rows], balance['balance'] if balance else 0.0)
+
+        # Older versions of this user are dead entries now
+        cls._cache.discard(lambda k: k[:2] == key[:2])
+        return cls._cache.put(key, report)
+
+    @staticmethod
+    def _prepare(bets):
+        """Bets frame with numeric stake/odds and per-bet profit/returned (explicit result_amount wins)."""
+        df = pd.DataFrame(bets)
+        for col in Store.BET_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+        df['stake'] = pd.to_numeric(df['stake'], errors='coerce').fillna(0.0)
+        df['odds'] = pd.to_numeric(df['odds'], errors='coerce')
+        df['status'] = df['status'].fillna('Pending')
+        df['league'] = df['league'].fillna('Unknown')
+        df['strategy'] = df['strategy'].fillna('Manual')
+        df['odds_band'] = pd.cut(df['odds'], ODDS_BANDS, labels=ODDS_LABELS, right=False).astype(object).fillna('N/A')
+
+        won, lost, void = (df['status'] == s for s in SETTLED)
+        # Won/Lost P/L from stake x odds; result_amount only when set explicitly (add_bet and the
+        # legacy JSON store 0.0 as a placeholder, so 0.0 on a Won/Lost bet isn't a real amount)
+        computed = np.select([won, lost], [df['stake'] * df['odds'] - df['stake'], -df['stake']], default=0.0)
+        amount = pd.to_numeric(df['result_amount'], errors='coerce')
+        explicit = (won | lost) & amount.notna() & (amount != 0.0)
+        df['profit'] = np.where(explicit, amount, computed)
+        df['returned'] = np.select([won, void], [df['stake'] + df['profit'], df['stake']], default=0.0)
+        # Stored dates mix naive and tz-aware strings: read them all as UTC, then drop the zone
+        df['match_dt'] = pd.to_datetime(df['match_date'], errors='coerce', format='mixed', utc=True).dt.tz_convert(None)
+        df['placed_at'] = pd.to_datetime(df['date'], errors='coerce', format='mixed', utc=True).dt.tz_convert(None)
+        return df
+
+    def _curve(self, real_settled):
+        """Bankroll after each settled real bet, with its running peak and drawdown."""
+        curve = real_settled.sort_values('match_dt', kind='stable')[['match_dt', 'home_team', 'away_team', 'profit']]
+        curve = curve.reset_index(drop=True)
+        curve['bankroll'] = self.start_balance + curve['profit'].cumsum()
+        curve['peak'] = np.maximum(curve['bankroll'].cummax(), self.start_balance)
+        curve['drawdown'] = curve['peak'] - curve['bankroll']
+        return curve
+
+    def _summary(self, df, curve):
+        settled = df['status'].isin(SETTLED)
+        real = settled & (df['stake'] > 0)
+        won = (df['status'] == 'Won')
+        decided = won | (df['status'] == 'Lost')
+
+        staked = float(df.loc[real, 'stake'].sum())
+        at_risk = float(df.loc[real & decided, 'stake'].sum())
+        profit = float(df.loc[real, 'profit'].sum())
+        n_settled = int(settled.sum())
+
+        max_dd = float(curve['drawdown'].max()) if not curve.empty else 0.0
+        dd_at = curve['drawdown'].idxmax() if not curve.empty else None
+        max_dd_pct = float(max_dd / curve.at[dd_at, 'peak'] * 100) if dd_at is not None and curve.at[dd_at, 'peak'] > 0 else 0.0
+
+        return {
+            "total_bets": len(df),
+            "settled_bets": n_settled,
+            "pending_bets": len(df) - n_settled,
+            "win_rate": round(float(won.sum() / n_settled * 100), 2) if n_settled else 0,
+            "hit_rate": round(float(won.sum() / decided.sum() * 100), 2) if decided.any() else 0,
+            "roi": round(profit / staked * 100, 2) if staked > 0 else 0,
+            "yield": round(profit / at_risk * 100, 2) if at_risk > 0 else 0,
+            "total_profit": round(profit, 2),
+            "total_staked": round(staked, 2) if n_settled else round(float(df['stake'].sum()), 2),
+            "total_returned": round(float(df.loc[real, 'returned'].sum()), 2),
+            "bankroll": round(self.start_balance + profit, 2),
+            "max_drawdown": round(max_dd, 2),
+            "max_drawdown_pct": round(max_dd_pct, 2),
+        }
+
+    def breakdown(self, by):
+        """KPIs per value of `by` (strategy / league / odds_band), one groupby pass."""
+        df = self.bets
+        if df.empty:
+            return pd.DataFrame(columns=['Volumen', 'Apuestas (Real)', 'Predicciones', 'Liquidadas',
+                                         'Win Rate %', 'Beneficio', 'ROI %'])
+        settled = df['status'].isin(SETTLED)
+        real = df['stake'] > 0
+        parts = pd.DataFrame({
+            'group': df[by],
+            'real': real,
+            'settled': settled,
+            'won': df['status'] == 'Won',
+            'staked': df['stake'].where(settled & real, 0.0),
+            'profit': df['profit'].where(settled & real, 0.0),
+        })
+        g = parts.groupby('group', sort=True, observed=True).sum()
+        counts = parts.groupby('group', sort=True, observed=True).size()
+        out = pd.DataFrame({
+            'Volumen': counts,
+            'Apuestas (Real)': g['real'].astype(int),
+            'Predicciones': (counts - g['real']).astype(int),
+            'Liquidadas': g['settled'].astype(int),
+            'Win Rate %': (g['won'] / g['settled'].where(g['settled'] > 0) * 100).fillna(0.0).round(1),
+            'Beneficio': g['profit'].round(2),
+            'ROI %': (g['profit'] / g['staked'].where(g['staked'] > 0) * 100).fillna(0.0).round(1),
+        })
+        out.index.name = by
+        return out
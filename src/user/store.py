@@ -0,0 +1,245 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class Store:
+    """
+    Embedded transactional store (SQLite in WAL mode) for users, preferences and bets.
+
+    One connection per thread; readers never block the writer and every write is a
+    single-row statement inside a transaction, so concurrent sessions can't lose
+    each other's updates. `migrate_users` / `migrate_portfolios` import the legacy
+    JSON files once (recorded in the meta table; the files are left untouched).
+
+    Every write to a user's bets bumps their ledger version (triggers), so caches
+    of derived data can check `ledger_version(username)` instead of re-reading bets.
+
+    Use `Store.get(path)` to share one store per database file.
+    """
+    DEFAULT_PATH = "data/app.db"
+
+    BET_COLUMNS = ['id', 'username', 'date', 'match_date', 'league', 'home_team', 'away_team', 'selection', 'market',
+                   'odds', 'stake', 'potential_return', 'strategy', 'status', 'result_amount']
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL,
+        name TEXT,
+        surname TEXT,
+        email TEXT,
+        joined_at TEXT,
+        extra TEXT
+    );
+    CREATE TABLE IF NOT EXISTS preferences (
+        username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+        key TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (username, key)
+    );
+    CREATE TABLE IF NOT EXISTS portfolios (
+        username TEXT PRIMARY KEY,
+        balance REAL DEFAULT 0.0,
+        currency TEXT DEFAULT '€',
+        created_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS bets (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL,
+        username TEXT NOT NULL,
+        date TEXT,
+        match_date TEXT,
+        league TEXT,
+        home_team TEXT,
+        away_team TEXT,
+        selection TEXT,
+        market TEXT,
+        odds REAL,
+        stake REAL,
+        potential_return REAL,
+        strategy TEXT,
+        status TEXT,
+        result_amount REAL,
+        extra TEXT,
+        UNIQUE (username, id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_bets_user_status ON bets (username, status);
+    CREATE INDEX IF NOT EXISTS idx_bets_match ON bets (home_team, away_team, match_date);
+    CREATE INDEX IF NOT EXISTS idx_bets_pending ON bets (home_team, away_team, match_date) WHERE status = 'Pending';
+    CREATE TABLE IF NOT EXISTS ledger (
+        username TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER IF NOT EXISTS bets_ledger_insert AFTER INSERT ON bets BEGIN
+        INSERT INTO ledger (username, version) VALUES (NEW.username, 1)
+        ON CONFLICT(username) DO UPDATE SET version = version + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS bets_ledger_update AFTER UPDATE ON bets BEGIN
+        INSERT INTO ledger (username, version) VALUES (NEW.username, 1)
+        ON CONFLICT(username) DO UPDATE SET version = version + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS bets_ledger_delete AFTER DELETE ON bets BEGIN
+        INSERT INTO ledger (username, version) VALUES (OLD.username, 1)
+        ON CONFLICT(username) DO UPDATE SET version = version + 1;
+    END;
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        # Columns added after the first release of the schema
+        bet_cols = {r['name'] for r in conn.execute("PRAGMA table_info(bets)")}
+        if 'market' not in bet_cols:
+            conn.execute("ALTER TABLE bets ADD COLUMN market TEXT")
+
+    @classmethod
+    def get(cls, path=DEFAULT_PATH):
+        """Shared store for this database file."""
+        key = os.path.abspath(path)
+        with cls._stores_lock:
+            store = cls._stores.get(key)
+            if store is None:
+                store = cls._stores[key] = cls(path)
+        return store
+
+    def connection(self):
+        """This thread's connection (autocommit; group writes with `transaction()`)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT (rolled back on error)."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    # --- META ---
+
+    def get_meta(self, key):
+        row = self.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key, value, conn=None):
+        (conn or self.connection()).execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    def ledger_version(self, username):
+        """Changes whenever one of the user's bets is inserted, updated or deleted."""
+        row = self.execute("SELECT version FROM ledger WHERE username = ?", (username,)).fetchone()
+        return row['version'] if row else 0
+
+    # --- ROW HELPERS ---
+
+    @classmethod
+    def bet_row(cls, username, bet):
+        """Bet dict -> (columns..., extra JSON) for INSERT."""
+        known = [bet.get(c) if c != 'username' else username for c in cls.BET_COLUMNS]
+        extra = {k: v for k, v in bet.items() if k not in cls.BET_COLUMNS}
+        return known + [json.dumps(extra, default=str) if extra else None]
+
+    @classmethod
+    def bet_dict(cls, row):
+        """Row -> bet dict as the JSON portfolios had it (missing fields left out)."""
+        bet = {c: row[c] for c in cls.BET_COLUMNS if c != 'username' and row[c] is not None}
+        if row['extra']:
+            bet.update(json.loads(row['extra']))
+        return bet
+
+    def insert_bets(self, conn, username, bets):
+        cols = self.BET_COLUMNS + ['extra']
+        conn.executemany(
+            f"INSERT OR IGNORE INTO bets ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            [self.bet_row(username, b) for b in bets])
+
+    def insert_user(self, conn, user, replace=False):
+        extra = {k: v for k, v in user.items()
+                 if k not in ('username', 'password_hash', 'name', 'surname', 'email', 'joined_at', 'preferences')}
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        cur = conn.execute(
+            f"{verb} INTO users (username, password_hash, name, surname, email, joined_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user['username'], user.get('password_hash', ''), user.get('name'), user.get('surname'),
+             user.get('email'), user.get('joined_at'), json.dumps(extra) if extra else None))
+        if cur.rowcount:
+            self.set_preferences(conn, user['username'], user.get('preferences', {}))
+        return cur.rowcount > 0
+
+    @staticmethod
+    def set_preferences(conn, username, preferences):
+        conn.execute("DELETE FROM preferences WHERE username = ?", (username,))
+        conn.executemany("INSERT INTO preferences (username, key, value) VALUES (?, ?, ?)",
+                         [(username, k, json.dumps(v)) for k, v in (preferences or {}).items()])
+
+    # --- MIGRATION (one-shot) ---
+
+    def migrate_users(self, users_file):
+        """Imports data/users.json once. Returns the number of users imported."""
+        key = f"migrated:{os.path.abspath(users_file)}"
+        if self.get_meta(key) or not os.path.exists(users_file):
+            return 0
+        try:
+            with open(users_file, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+        except Exception as e:
+            print(f"Error reading {users_file} for migration: {e}")
+            return 0
+        with self.transaction() as conn:
+            count = sum(self.insert_user(conn, {**u, 'username': u.get('username', name)}) for name, u in users.items())
+            self.set_meta(key, str(count), conn)
+        print(f"Migrated {count} users from {users_file}")
+        return count
+
+    def migrate_portfolios(self, data_dir):
+        """Imports every data/portfolios/*.json once. Returns the number of bets imported."""
+        key = f"migrated:{os.path.abspath(data_dir)}"
+        if self.get_meta(key) or not os.path.isdir(data_dir):
+            return 0
+        total = 0
+        with self.transaction() as conn:
+            for fname in sorted(os.listdir(data_dir)):
+                if not fname.endswith('.json'):
+                    continue
+                username = fname[:-len('.json')]
+                try:
+                    with open(os.path.join(data_dir, fname), 'r', encoding='utf-8') as f:
+                        portfolio = json.load(f)
+                except Exception as e:
+                    print(f"Skipping {fname}: {e}")
+                    continue
+                conn.execute("INSERT OR IGNORE INTO portfolios (username, balance, currency, created_at) VALUES (?, ?, ?, ?)",
+                             (username, portfolio.get('balance', 0.0), portfolio.get('currency', '€'), portfolio.get('created_at')))
+                bets = portfolio.get('bets', [])
+                self.insert_bets(conn, username, bets)
+                total += len(bets)
+            self.set_meta(key, str(total), conn)
+        print(f"Migrated {total} bets from {data_dir}")
+        return total
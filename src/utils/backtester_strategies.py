@@ -8,6 +8,8 @@ sys.path.append(os.getcwd())
 import pandas as pd
 import numpy as np
 from src.engine.strategies import PREMATCH_PATTERNS
+from src.engine.feature_service import FeatureService
+from src.engine.standings import StandingsEngine
 from src.data.loader import DataLoader
 import streamlit as st
 
@@ -35,9 +37,10 @@ def run_strategy_backtest():
     
     results = []
     
-    # Tracking History
-    # Structure: {Team: [matches...]}
-    team_history = {}
+    # Team form before each match (point-in-time, leak-free)
+    features = FeatureService.get(data)
+    # League position / points of both teams before each match (as-of table snapshots)
+    positions = StandingsEngine.get(data).position_features(data)
     # Ref History: {Ref: [cards...]}
     ref_history = {}
     
@@ -51,69 +54,30 @@ def run_strategy_backtest():
         
         # Helper to get stats
         def get_team_stats(team, venue_filter=None, n=5):
-            hist = team_history.get(team, [])
-            if not hist: return None
-            if venue_filter:
-                hist = [m for m in hist if m['Venue'] == venue_filter]
-            if len(hist) < 3: return None
-            recent = hist[-n:]
-            # Avg Checks
-            avg_gf = sum(m['GF'] for m in recent) / len(recent)
-            avg_ga = sum(m['GA'] for m in recent) / len(recent)
-            avg_pts = sum(m['Pts'] for m in recent) / len(recent)
-            avg_shots = sum(m.get('Shots', 0) for m in recent) / len(recent)
+            venue = {'H': 'Home', 'A': 'Away'}.get(venue_filter, 'All')
+            feats = features.features(team, as_of=match_date, n=n, venue=venue)
+            if not feats or feats['Matches'] < 3: return None
             
-            # Momentum / Form Details (Wins/Losses count in last n)
-            wins = sum(1 for m in recent if m['Pts'] == 3)
-            losses = sum(1 for m in recent if m['Pts'] == 0)
-            
-            # Frequency Metrics (New)
-            # BTTS: Both scored > 0
-            btts_count = sum(1 for m in recent if m['GF'] > 0 and m['GA'] > 0)
-            btts_rate = btts_count / len(recent) if recent else 0
-            
-            # Over 2.5
-            over25_count = sum(1 for m in recent if (m['GF'] + m['GA']) > 2.5)
-            over25_rate = over25_count / len(recent) if recent else 0
-            
-            # Clean Sheet (GA == 0)
-            cs_count = sum(1 for m in recent if m['GA'] == 0)
-            cs_rate = cs_count / len(recent) if recent else 0
-            
-            # Failed Score
-            failed_score_rate = sum(1 for m in recent if m['GF'] == 0) / len(recent) if recent else 0
-            
-            # PRO METRICS (StdDev, ZeroZero)
-            avg_fouls = 0 # Placeholder if no fouls data
-            
-            # StdDev Goals (Volatility)
-            import numpy as np
-            if recent:
-                goals_list = [m['GF'] + m['GA'] for m in recent]
-                std_dev_goals = np.std(goals_list, ddof=1) if len(goals_list) > 1 else 0
-                zero_zeros = sum(1 for m in recent if m['GF'] == 0 and m['GA'] == 0)
-            else:
-                std_dev_goals = 0
-                zero_zeros = 0
-
-            last_match_date = hist[-1]['Date']
-            rest_days = (match_date - last_match_date).days
+            std_dev_goals = feats['StdDev_Goals'] if feats['Matches'] > 1 else 0
+            # Shots / fouls average to NaN without data; the patterns read that as 0
+            def known(name):
+                return feats[name] if pd.notna(feats[name]) else 0.0
             return {
-                'AvgGoalsFor': avg_gf,
-                'AvgGoalsAgainst': avg_ga,
-                'PPG': avg_pts,
-                'AvgShots': avg_shots,
-                'WinsLast5': wins,
-                'LossesLast5': losses,
-                'RestDays': rest_days,
-                'BTTS_Rate': btts_rate,
-                'Over25_Rate': over25_rate,
-                'CleanSheet_Rate': cs_rate,
-                'FailedScore_Rate': failed_score_rate,
+                'AvgGoalsFor': feats['AvgGoalsFor'],
+                'AvgGoalsAgainst': feats['AvgGoalsAgainst'],
+                'PPG': feats['AvgPoints'],
+                'AvgShots': known('AvgShotsTargetFor'),
+                'WinsLast5': round(feats['AvgWin'] * feats['Matches']),
+                'LossesLast5': round(feats['AvgLoss'] * feats['Matches']),
+                'RestDays': feats['RestDays'],
+                'BTTS_Rate': feats['AvgBTTS'],
+                'Over25_Rate': feats['AvgOver25'],
+                'CleanSheet_Rate': feats['AvgCleanSheet'],
+                'FailedScore_Rate': feats['AvgFailedToScore'],
                 
                 'StdDev_Goals': std_dev_goals,
-                'ZeroZero_Count': zero_zeros,
-                'AvgFouls': avg_fouls # Hard to get from minimal hist unless we store HF/AF
+                'ZeroZero_Count': round(feats['AvgZeroZero'] * feats['Matches']),
+                'AvgFouls': known('AvgFoulsFor')
             }
 
         # Helper Ref Stats
@@ -168,6 +132,9 @@ def run_strategy_backtest():
                 
                 # xG Proxy
                 'AwayAvgShotsTargetFor': a_stats['AvgShots'],
+
+                # Standings before kick-off
+                **positions.loc[idx].to_dict(),
             }
             
             # Apply Strategies
@@ -208,30 +175,14 @@ def run_strategy_backtest():
                 except Exception:
                     pass
         
-        # 2. Update History
-        # Home Update
-        home_cards = row.get('HY', 0) + row.get('HR', 0) # Home Yellow + Red? Usually HY, HR columns
+        # 2. Update Ref History
+        home_cards = row.get('HY', 0) + row.get('HR', 0) # Home Yellow + Red
         # Check columns existence
         if 'HY' not in row: home_cards = 0 # Safety
         
-        if home not in team_history: team_history[home] = []
-        team_history[home].append({
-            'Date': match_date, 'Venue': 'H', 'GF': row['FTHG'], 'GA': row['FTAG'],
-            'Pts': 3 if row['FTR'] == 'H' else (1 if row['FTR'] == 'D' else 0),
-            'Shots': row.get('HST', 0)
-        })
-        
-        # Away Update
         away_cards = row.get('AY', 0) + row.get('AR', 0)
         if 'AY' not in row: away_cards = 0
         
-        if away not in team_history: team_history[away] = []
-        team_history[away].append({
-            'Date': match_date, 'Venue': 'A', 'GF': row['FTAG'], 'GA': row['FTHG'],
-            'Pts': 3 if row['FTR'] == 'A' else (1 if row['FTR'] == 'D' else 0),
-            'Shots': row.get('AST', 0)
-        })
-        
         # Ref Update
         if ref:
             total_cards = home_cards + away_cards
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+# id(frame) -> (weakref to the frame, {(n_rows, columns): version})
+_frame_versions = {}
+_frame_lock = threading.Lock()
+
+
+def frame_version(df, cols):
+    """
+    Content hash of df[cols] (the columns present), computed once per frame object.
+
+    The shared engines are looked up with the same history frame over and over
+    (per team, per fixture); hashing it every time made each lookup O(history).
+    Frames handed to them are treated as read-only: a column edited in place after
+    the first lookup keeps the old version (assign a new frame instead, e.g. `df.assign`).
+    """
+    cols = tuple(c for c in cols if c in df.columns)
+    shape = (len(df), cols)
+    key = id(df)
+    with _frame_lock:
+        entry = _frame_versions.get(key)
+        if entry is not None and entry[0]() is df:
+            version = entry[1].get(shape)
+            if version is not None:
+                return version
+
+    h = hashlib.sha256(pd.util.hash_pandas_object(df[list(cols)], index=False).to_numpy().tobytes())
+    h.update(','.join(cols).encode('utf-8'))
+    version = h.hexdigest()
+
+    with _frame_lock:
+        entry = _frame_versions.get(key)
+        if entry is None or entry[0]() is not df:
+            ref = weakref.ref(df, lambda _, key=key: _forget(key))
+            entry = _frame_versions[key] = (ref, {})
+        entry[1][shape] = version
+    return version
+
+
+def _forget(key):
+    with _frame_lock:
+        entry = _frame_versions.get(key)
+        if entry is not None and entry[0]() is None:
+            del _frame_versions[key]
+
+
+class VersionedLRU:
+    """
+    Small thread-safe LRU of objects built per data version (or any hashable key).
+
+    The shared engines keep one as a class attribute and look themselves up with
+    `get_or_build(version, build)`. Two sessions missing the same key may both
+    build; the last one stored wins (builds are pure, so either result is valid).
+    """
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+
+    def get_or_build(self, key, build):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, build())
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def discard(self, predicate):
+        """Drops every entry whose key matches predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                del self._items[key]
+
+    def latest(self):
+        """Most recently used value (None when empty)."""
+        with self._lock:
+            return next(reversed(self._items.values()), None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
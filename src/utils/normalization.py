@@ -1,5 +1,13 @@
+import atexit
+import os
+import threading
+from functools import lru_cache
+from types import MappingProxyType
 
 import pandas as pd
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class NameNormalizer:
     """
@@ -9,295 +17,415 @@ class NameNormalizer:
     to preserve historical data continuity across leagues.
     
     RESTRICTED TO SUPPORTED LEAGUES ONLY (E0, E1, SP1, SP2, D1, I1, F1).
+
+    The mapping and the fuzzy rules are compiled once at import; `normalize` is
+    memoized per raw string and `normalize_series` resolves each distinct value once.
+    Names that pass through unmapped are buffered and flushed (once each) to AUDIT_PATH,
+    so `unknown_names()` sees what the dashboard and updater ran into, across processes.
     """
-    
+
+    # HEURISTIC/FUZZY PRE-CHECK
+    # Catch hard-to-match names (unicode, weird spaces) BEFORE dictionary.
+    # (all lowercase substrings, canonical name), checked in order
+    RULES = (
+        (('paris', 'germain'), 'Paris SG'),
+        (('monaco', 'as'), 'Monaco'), # AS Monaco
+        (('lorient',), 'Lorient'),
+        (('lille',), 'Lille'),
+        (('west brom',), 'West Brom'),
+    )
+
+    # Extended Mapping for SUPPORTED LEAGUES (read-only)
+    MAPPING = MappingProxyType({
+        # --- SPAIN (SP1, SP2) ---
+        'Rayo Vallecano': 'Vallecano',
+        'CA Osasuna': 'Osasuna',
+        'RCD Mallorca': 'Mallorca',
+        'Athletic Club': 'Ath Bilbao',
+        'Real Betis': 'Betis',
+        'Real Sociedad': 'Sociedad',
+        'RC Celta': 'Celta',
+        'Celta de Vigo': 'Celta',
+        'Sevilla FC': 'Sevilla',
+        'Sevilla': 'Sevilla',
+        'Villarreal CF': 'Villarreal', # FIX
+        'Valencia CF': 'Valencia',     # FIX
+        'Deportivo Alaves': 'Alaves',
+        'Deportivo Alavés': 'Alaves',
+        'Alavés': 'Alaves',
+        'Atlético de Madrid': 'Ath Madrid',
+        'Atletico Madrid': 'Ath Madrid',
+        'Girona FC': 'Girona',
+        'Real Oviedo': 'Oviedo',
+        'Levante UD': 'Levante',
+        'Real Zaragoza': 'Zaragoza',
+        'Sporting de Gijón': 'Sp Gijon',
+        'Sporting Gijon': 'Sp Gijon',
+        'Sporting Gijón': 'Sp Gijon',
+        'Gijon': 'Sp Gijon', # Scraper
+        'Racing de Santander': 'Santander',
+        'Racing Santander': 'Santander',
+        'SD Eibar': 'Eibar',
+        'Granada CF': 'Granada',
+        'Elche CF': 'Elche',
+        'CD Tenerife': 'Tenerife',
+        'Albacete Balompié': 'Albacete',
+        'Burgos CF': 'Burgos',
+        'FC Cartagena': 'Cartagena',
+        'CD Castellón': 'Castellon',
+        'CD Eldense': 'Eldense',
+        'Cordoba CF': 'Cordoba',
+        'SD Huesca': 'Huesca',
+        'Malaga CF': 'Malaga',
+        'Mirandes': 'Mirandes',
+        'CD Mirandés': 'Mirandes',
+        'Racing Club Ferrol': 'Ferrol',
+        'UD Almería': 'Almeria',
+        'Cadiz CF': 'Cadiz',
+        'Cultural Leonesa': 'Cultural Leonesa',
+        'Real Sociedad B': 'Sociedad B',
+        'AD Ceuta': 'Ceuta',
+        'FC Andorra': 'Andorra',
+        'U.D. Las Palmas': 'Las Palmas',
+        'Las Palmas': 'Las Palmas',
+        'CD Leganes': 'Leganes',
+        'Leganés': 'Leganes',
+        'Deportivo': 'Dep. La Coruna',
+        'Coruna': 'Dep. La Coruna', # Scraper
+        'La Coruna': 'Dep. La Coruna',
+        'Getafe CF': 'Getafe',
+        'RCD Espanyol de Barcelona': 'Espanyol',
+        'RCD Espanyol': 'Espanyol',
+        'Espanol': 'Espanyol',
+
+        # --- ENGLAND (E0, E1) ---
+        'Spurs': 'Tottenham',
+        'Tottenham Hotspur': 'Tottenham',
+        'Man Utd': 'Man United',
+        'Manchester United': 'Man United',
+        'Man City': 'Man City',
+        'Manchester City': 'Man City',
+        'Wolves': 'Wolves',
+        'Wolverhampton': 'Wolves',
+        'Wolverhampton Wanderers': 'Wolves',
+        'Nottm Forest': "Nott'm Forest",
+        'Nottingham Forest': "Nott'm Forest",
+        'Sheffield Utd': 'Sheffield United',
+        'Sheffield United': 'Sheffield United',
+        'Leicester City': 'Leicester', 
+        'Leicester': 'Leicester',
+        'Leeds United': 'Leeds',
+        'Brighton & Hove Albion': 'Brighton',
+        'Brighton': 'Brighton',
+        'Newcastle United': 'Newcastle',
+        'Newcastle': 'Newcastle',
+        'Sunderland AFC': 'Sunderland',
+        'West Bromwich Albion': 'West Brom',
+        'West Bromwich': 'West Brom',
+        'Blackburn Rovers': 'Blackburn',
+        'Preston North End': 'Preston',
+        'Sheffield Wednesday': 'Sheffield Weds',
+        'Queens Park Rangers': 'QPR',
+        'Coventry City': 'Coventry',
+        'Stoke City': 'Stoke',
+        'Hull City': 'Hull',
+        'Middlesbrough FC': 'Middlesbrough',
+        'Burnley FC': 'Burnley',
+        'Luton Town': 'Luton',
+        'Norwich City': 'Norwich',
+        'Watford FC': 'Watford',
+        'Bristol City': 'Bristol City',
+        'Cardiff City': 'Cardiff',
+        'Derby County': 'Derby',
+        'Oxford United': 'Oxford',
+        'Portsmouth FC': 'Portsmouth',
+        'Plymouth Argyle': 'Plymouth',
+        'Swansea City': 'Swansea',
+        'Ipswich Town': 'Ipswich',
+        'Southampton FC': 'Southampton',
+        'Arsenal FC': 'Arsenal',
+        'Liverpool FC': 'Liverpool',
+        'Chelsea FC': 'Chelsea',
+        'Aston Villa FC': 'Aston Villa',
+        'Everton FC': 'Everton',
+        'Fulham FC': 'Fulham',
+        'Brentford FC': 'Brentford',
+        'Crystal Palace FC': 'Crystal Palace',
+        'West Ham United': 'West Ham',
+        'West Ham United FC': 'West Ham',
+        'AFC Bournemouth': 'Bournemouth',
+        'Bournemouth': 'Bournemouth',
+        'US Cremonese': 'Cremonese', # Fix for Serie A match
+        'Cremonese': 'Cremonese',
+
+        # --- GERMANY (D1) ---
+        '1. FC Union Berlin': 'Union Berlin',
+        '1. FSV Mainz 05': 'Mainz',
+        '1. FSV Mainz': 'Mainz', 
+        'Mainz 05': 'Mainz',
+        '1. FC Köln': 'FC Koln',
+        '1. FC Koln': 'FC Koln',
+        'FC Köln': 'FC Koln',
+        'Bayer 04 Leverkusen': 'Leverkusen',
+        'Borussia Mönchengladbach': 'M\'gladbach',
+        'Borussia Monchengladbach': 'M\'gladbach',
+        'Eintracht Frankfurt': 'Frankfurt',
+        'SC Freiburg': 'Freiburg',
+        'VfL Wolfsburg': 'Wolfsburg',
+        'VfB Stuttgart': 'Stuttgart',
+        'FC Augsburg': 'Augsburg',
+        'TSG 1899 Hoffenheim': 'Hoffenheim',
+        'VfL Bochum 1848': 'Bochum',
+        'VfL Bochum': 'Bochum',
+        'SV Werder Bremen': 'Werder Bremen',
+        'Werder Bremen': 'Werder Bremen',
+        'RB Leipzig': 'Leipzig',
+        'Borussia Dortmund': 'Dortmund',
+        'FC Bayern München': 'Bayern Munich',
+        'Bayern Munchen': 'Bayern Munich',
+        'SV Darmstadt 98': 'Darmstadt',
+        '1. FC Heidenheim 1846': 'Heidenheim',
+        'Heidenheim': 'Heidenheim',
+        'Holstein Kiel': 'Holstein Kiel',
+        'FC St. Pauli': 'St Pauli',
+        'St. Pauli': 'St Pauli', # API
+        # The following two lines are duplicates from the instruction, keeping them as per instruction
+        'FC St. Pauli': 'St Pauli',
+        'St. Pauli': 'St Pauli',
+        # The following three lines are duplicates from the instruction, keeping them as per instruction
+        '1. FC Heidenheim 1846': 'Heidenheim',
+        '1. FC Heidenheim': 'Heidenheim', # API
+        'Heidenheim': 'Heidenheim',
+        
+        # --- ITALY (I1) ---
+        'Inter Milan': 'Inter',
+        'Internazionale': 'Inter',
+        'Inter Milano': 'Inter', # API
+        'AC Milan': 'Milan',
+        'Juventus FC': 'Juventus',
+        'Juventus Turin': 'Juventus', # API
+        'SS Lazio': 'Lazio',
+        'Lazio Rome': 'Lazio', # API
+        'AS Roma': 'Roma',
+        'SSC Napoli': 'Napoli',
+        'Atalanta BC': 'Atalanta',
+        'Bologna FC': 'Bologna',
+        'ACF Fiorentina': 'Fiorentina',
+        'Torino FC': 'Torino',
+        'Udinese Calcio': 'Udinese',
+        'Genoa CFC': 'Genoa',
+        'Hellas Verona': 'Verona',
+        'Hellas Verona FC': 'Verona',
+        'US Lecce': 'Lecce',
+        'AC Monza': 'Monza',
+        'Frosinone Calcio': 'Frosinone',
+        'US Salernitana 1919': 'Salernitana',
+        'Empoli FC': 'Empoli',
+        'Cagliari Calcio': 'Cagliari',
+        'Parma Calcio 1913': 'Parma',
+        'Parma Calcio': 'Parma', # API
+        'Parma': 'Parma',
+        'Como 1907': 'Como',
+        'Venezia FC': 'Venezia',
+        'Pisa SC': 'Pisa', # API
+        'Sassuolo Calcio': 'Sassuolo', # API
+
+        # --- SPAIN (SP1/SP2 updates) ---
+        'Real Betis Seville': 'Betis',
+        'RC Celta de Vigo': 'Celta', 
+        'Espanyol Barcelona': 'Espanyol',
+        'Real Sociedad San Sebastian': 'Sociedad',
+        'Real Sociedad San Sebastian B': 'Sociedad B',
+        'Valladolid': 'Real Valladolid', # FIX
+        # Correct mappings for History Match (Not Logo Filenames)
+        'FC Koln': 'FC Koln', 
+        'Mainz': 'Mainz',
+        'Albacete Balompie': 'Albacete',
+        'CD Castellon': 'Castellon',
+        'RC Deportivo La Coruna': 'Dep. La Coruna',
+
+        # --- NETHERLANDS (N1) ---
+        'Ajax Amsterdam': 'Ajax',
+        'Feyenoord Rotterdam': 'Feyenoord',
+        'PSV Eindhoven': 'PSV',
+        'SC Heerenveen': 'Heerenveen',
+        'AZ Alkmaar': 'AZ Alkmaar', # Verify Local
+        'FC Twente Enschede': 'Twente',
+        'FC Groningen': 'Groningen',
+        'NEC Nijmegen': 'NEC Nijmegen',
+        'PEC Zwolle': 'Zwolle',
+        'Sparta Rotterdam': 'Sparta Rotterdam',
+        'Excelsior Rotterdam': 'Excelsior',
+        'Go Ahead Eagles': 'Go Ahead Eagles',
+        'Fortuna Sittard': 'Fortuna Sittard',
+        'FC Utrecht': 'Utrecht',
+        'FC Volendam': 'Volendam',
+        'Heracles Almelo': 'Heracles',
+        'SC Telstar': 'Telstar',
+        'NAC Breda': 'NAC Breda',
+        
+        # --- PORTUGAL (P1) ---
+        'Santa Clara Azores': 'Santa Clara',
+        'Nacional da Madeira': 'Nacional',
+        'Moreirense FC': 'Moreirense',
+        'CD Tondela': 'Tondela',
+
+        # --- FRANCE (F1) ---
+        'AS Monaco': 'Monaco',
+        'FC Lorient': 'Lorient',
+        'Paris Saint-Germain': 'Paris SG',
+        'PSG': 'Paris SG',
+        'LOSC Lille': 'Lille',
+        'Lille OSC': 'Lille',
+        'Olympique de Marseille': 'Marseille',
+        'Olympique Marseille': 'Marseille',
+        'Stade Brestois 29': 'Brest',
+        'Stade Brestois': 'Brest',
+        'Stade Rennais FC': 'Rennes',
+        'Stade Rennais': 'Rennes',
+        'OGC Nice': 'Nice',
+        'FC Nantes': 'Nantes',
+        'RC Strasbourg Alsace': 'Strasbourg',
+        'Strasbourg Alsace': 'Strasbourg',
+        'Montpellier HSC': 'Montpellier',
+        'Toulouse FC': 'Toulouse',
+        'Stade de Reims': 'Reims',
+        'RC Lens': 'Lens',
+        'AJ Auxerre': 'Auxerre',
+        'Angers SCO': 'Angers',
+        'AS Saint-Etienne': 'St Etienne',
+        'Saint-Etienne': 'St Etienne',
+        'Le Havre AC': 'Le Havre',
+        'Olympique Lyon': 'Lyon',
+        'Olympique Lyonnais': 'Lyon',
+        'FC Metz': 'Metz',
+    })
+
+    # Canonical names: never reported as unknown
+    KNOWN = frozenset(MAPPING.values()) | frozenset(target for _, target in RULES)
+    MEMO_SIZE = 8192
+
+    # first seen <TAB> name, shared by every process (dashboard, updater, tools)
+    AUDIT_PATH = os.path.join(PROJECT_ROOT, "data_cache", "unknown_team_names.tsv")
+
+    _pending = {} # unmapped raw name -> first seen, not yet flushed to AUDIT_PATH
+    _known = set() # names confirmed by the caller (e.g. historical data)
+    _audit_lock = threading.Lock()
+
     @classmethod
     def normalize(cls, name):
         """Returns the normalized team name."""
         if not isinstance(name, str):
             return str(name)
-        
+        return _resolve(name)
+
+    @classmethod
+    def normalize_series(cls, series):
+        """Vectorized normalize: each distinct value is resolved once, then broadcast."""
+        values = series.to_numpy(dtype=object)
+        codes, uniques = pd.factorize(values)
+        resolved = np.empty(len(uniques) + 1, dtype=object)
+        resolved[:-1] = [cls.normalize(u) for u in uniques]
+        out = resolved[codes]
+        # Missing values (None / NaN) keep their own str() like normalize does
+        missing = codes < 0
+        if missing.any():
+            out[missing] = [cls.normalize(v) for v in values[missing]]
+        return pd.Series(out, index=series.index, name=series.name)
+
+    @classmethod
+    def _compile(cls, name):
+        """Uncached resolution of one raw string."""
         name = name.strip()
         # Handle Non-Breaking Spaces (often in CSVs)
         name = name.replace('\xa0', ' ')
-        
-        # Case insensitive check (heuristic)
-        # We'll stick to exact mapping for now but cleaned
-        
-        
-        # Extended Mapping for SUPPORTED LEAGUES
-        
-        # HEURISTIC/FUZZY PRE-CHECK
-        # Catch hard-to-match names (unicode, weird spaces) BEFORE dictionary
+
         n_lower = name.lower()
-        if 'paris' in n_lower and 'germain' in n_lower: return 'Paris SG'
-        if 'monaco' in n_lower and 'as' in n_lower: return 'Monaco' # AS Monaco
-        if 'lorient' in n_lower: return 'Lorient'
-        if 'lille' in n_lower: return 'Lille'
-        if 'west brom' in n_lower: return 'West Brom'
-        
-        mapping = {
-            # --- SPAIN (SP1, SP2) ---
-            'Rayo Vallecano': 'Vallecano',
-            'CA Osasuna': 'Osasuna',
-            'RCD Mallorca': 'Mallorca',
-            'Athletic Club': 'Ath Bilbao',
-            'Real Betis': 'Betis',
-            'Real Sociedad': 'Sociedad',
-            'RC Celta': 'Celta',
-            'Celta de Vigo': 'Celta',
-            'Sevilla FC': 'Sevilla',
-            'Sevilla': 'Sevilla',
-            'Villarreal CF': 'Villarreal', # FIX
-            'Valencia CF': 'Valencia',     # FIX
-            'Deportivo Alaves': 'Alaves',
-            'Deportivo Alavés': 'Alaves',
-            'Alavés': 'Alaves',
-            'Atlético de Madrid': 'Ath Madrid',
-            'Atletico Madrid': 'Ath Madrid',
-            'Girona FC': 'Girona',
-            'Real Oviedo': 'Oviedo',
-            'Levante UD': 'Levante',
-            'Real Zaragoza': 'Zaragoza',
-            'Sporting de Gijón': 'Sp Gijon',
-            'Sporting Gijon': 'Sp Gijon',
-            'Sporting Gijón': 'Sp Gijon',
-            'Gijon': 'Sp Gijon', # Scraper
-            'Racing de Santander': 'Santander',
-            'Racing Santander': 'Santander',
-            'SD Eibar': 'Eibar',
-            'Granada CF': 'Granada',
-            'Elche CF': 'Elche',
-            'CD Tenerife': 'Tenerife',
-            'Albacete Balompié': 'Albacete',
-            'Burgos CF': 'Burgos',
-            'FC Cartagena': 'Cartagena',
-            'CD Castellón': 'Castellon',
-            'CD Eldense': 'Eldense',
-            'Cordoba CF': 'Cordoba',
-            'SD Huesca': 'Huesca',
-            'Malaga CF': 'Malaga',
-            'Mirandes': 'Mirandes',
-            'CD Mirandés': 'Mirandes',
-            'Racing Club Ferrol': 'Ferrol',
-            'UD Almería': 'Almeria',
-            'Cadiz CF': 'Cadiz',
-            'Cultural Leonesa': 'Cultural Leonesa',
-            'Real Sociedad B': 'Sociedad B',
-            'AD Ceuta': 'Ceuta',
-            'FC Andorra': 'Andorra',
-            'U.D. Las Palmas': 'Las Palmas',
-            'Las Palmas': 'Las Palmas',
-            'CD Leganes': 'Leganes',
-            'Leganés': 'Leganes',
-            'Deportivo': 'Dep. La Coruna',
-            'Coruna': 'Dep. La Coruna', # Scraper
-            'La Coruna': 'Dep. La Coruna',
-            'Getafe CF': 'Getafe',
-            'RCD Espanyol de Barcelona': 'Espanyol',
-            'RCD Espanyol': 'Espanyol',
-            'Espanol': 'Espanyol',
+        for needles, target in cls.RULES:
+            if all(n in n_lower for n in needles):
+                return target
+
+        if name in cls.MAPPING:
+            return cls.MAPPING[name]
+        if name and name not in cls.KNOWN:
+            cls._record(name)
+        return name
+
+    # --- AUDIT ---
+    # Unmapped names are buffered in memory by the (memoized) resolver and written
+    # out by flush_audit, never from inside the resolver itself.
+
+    @classmethod
+    def _record(cls, name):
+        with cls._audit_lock:
+            if name not in cls._known:
+                cls._pending.setdefault(name, pd.Timestamp.now().floor('s'))
+
+    @classmethod
+    def _read_audit(cls):
+        """{name: first seen} from AUDIT_PATH (empty if missing or unreadable)."""
+        audit = {}
+        try:
+            with open(cls.AUDIT_PATH, encoding='utf-8') as f:
+                for line in f:
+                    seen, _, name = line.rstrip('\n').partition('\t')
+                    if name and name not in audit:
+                        audit[name] = pd.to_datetime(seen, errors='coerce')
+        except OSError:
+            pass
+        return audit
+
+    @classmethod
+    def _write_audit(cls, entries, mode):
+        try:
+            os.makedirs(os.path.dirname(cls.AUDIT_PATH), exist_ok=True)
+            with open(cls.AUDIT_PATH, mode, encoding='utf-8') as f:
+                f.writelines(f"{seen.isoformat()}\t{name}\n" for name, seen in entries.items())
+        except OSError as e:
+            print(f"NameNormalizer: could not write {cls.AUDIT_PATH}: {e}")
 
-            # --- ENGLAND (E0, E1) ---
-            'Spurs': 'Tottenham',
-            'Tottenham Hotspur': 'Tottenham',
-            'Man Utd': 'Man United',
-            'Manchester United': 'Man United',
-            'Man City': 'Man City',
-            'Manchester City': 'Man City',
-            'Wolves': 'Wolves',
-            'Wolverhampton': 'Wolves',
-            'Wolverhampton Wanderers': 'Wolves',
-            'Nottm Forest': "Nott'm Forest",
-            'Nottingham Forest': "Nott'm Forest",
-            'Sheffield Utd': 'Sheffield United',
-            'Sheffield United': 'Sheffield United',
-            'Leicester City': 'Leicester', 
-            'Leicester': 'Leicester',
-            'Leeds United': 'Leeds',
-            'Brighton & Hove Albion': 'Brighton',
-            'Brighton': 'Brighton',
-            'Newcastle United': 'Newcastle',
-            'Newcastle': 'Newcastle',
-            'Sunderland AFC': 'Sunderland',
-            'West Bromwich Albion': 'West Brom',
-            'West Bromwich': 'West Brom',
-            'Blackburn Rovers': 'Blackburn',
-            'Preston North End': 'Preston',
-            'Sheffield Wednesday': 'Sheffield Weds',
-            'Queens Park Rangers': 'QPR',
-            'Coventry City': 'Coventry',
-            'Stoke City': 'Stoke',
-            'Hull City': 'Hull',
-            'Middlesbrough FC': 'Middlesbrough',
-            'Burnley FC': 'Burnley',
-            'Luton Town': 'Luton',
-            'Norwich City': 'Norwich',
-            'Watford FC': 'Watford',
-            'Bristol City': 'Bristol City',
-            'Cardiff City': 'Cardiff',
-            'Derby County': 'Derby',
-            'Oxford United': 'Oxford',
-            'Portsmouth FC': 'Portsmouth',
-            'Plymouth Argyle': 'Plymouth',
-            'Swansea City': 'Swansea',
-            'Ipswich Town': 'Ipswich',
-            'Southampton FC': 'Southampton',
-            'Arsenal FC': 'Arsenal',
-            'Liverpool FC': 'Liverpool',
-            'Chelsea FC': 'Chelsea',
-            'Aston Villa FC': 'Aston Villa',
-            'Everton FC': 'Everton',
-            'Fulham FC': 'Fulham',
-            'Brentford FC': 'Brentford',
-            'Crystal Palace FC': 'Crystal Palace',
-            'West Ham United': 'West Ham',
-            'West Ham United FC': 'West Ham',
-            'AFC Bournemouth': 'Bournemouth',
-            'Bournemouth': 'Bournemouth',
-            'US Cremonese': 'Cremonese', # Fix for Serie A match
-            'Cremonese': 'Cremonese',
+    @classmethod
+    def flush_audit(cls):
+        """Appends the buffered unknown names that aren't in AUDIT_PATH yet (also runs at exit)."""
+        with cls._audit_lock:
+            pending = {n: t for n, t in cls._pending.items() if n not in cls._known}
+            cls._pending.clear()
+            if not pending:
+                return
+            on_disk = cls._read_audit()
+            new = {n: t for n, t in pending.items() if n not in on_disk}
+            if new:
+                cls._write_audit(new, 'a')
+
+    @classmethod
+    def register_known(cls, names):
+        """Marks names as valid as-is (e.g. the team names of the historical data)."""
+        names = {n for n in names if isinstance(n, str)}
+        with cls._audit_lock:
+            cls._known.update(names)
+            for name in names & cls._pending.keys():
+                del cls._pending[name]
+            # Names recorded (by any process) before they were confirmed: drop them from the file
+            audit = cls._read_audit()
+            if names & audit.keys():
+                cls._write_audit({n: t for n, t in audit.items() if n not in names}, 'w')
+        cls.flush_audit()
+
+    @classmethod
+    def unknown_names(cls):
+        """
+        Unmapped names recorded by any process (AUDIT_PATH) that aren't known teams
+        here: {name: first seen}.
+        """
+        cls.flush_audit()
+        audit = cls._read_audit()
+        with cls._audit_lock:
+            return {n: t for n, t in audit.items() if n not in cls._known}
 
-            # --- GERMANY (D1) ---
-            '1. FC Union Berlin': 'Union Berlin',
-            '1. FSV Mainz 05': 'Mainz',
-            '1. FSV Mainz': 'Mainz', 
-            'Mainz 05': 'Mainz',
-            '1. FC Köln': 'FC Koln',
-            '1. FC Koln': 'FC Koln',
-            'FC Köln': 'FC Koln',
-            'Bayer 04 Leverkusen': 'Leverkusen',
-            'Borussia Mönchengladbach': 'M\'gladbach',
-            'Borussia Monchengladbach': 'M\'gladbach',
-            'Eintracht Frankfurt': 'Frankfurt',
-            'SC Freiburg': 'Freiburg',
-            'VfL Wolfsburg': 'Wolfsburg',
-            'VfB Stuttgart': 'Stuttgart',
-            'FC Augsburg': 'Augsburg',
-            'TSG 1899 Hoffenheim': 'Hoffenheim',
-            'VfL Bochum 1848': 'Bochum',
-            'VfL Bochum': 'Bochum',
-            'SV Werder Bremen': 'Werder Bremen',
-            'Werder Bremen': 'Werder Bremen',
-            'RB Leipzig': 'Leipzig',
-            'Borussia Dortmund': 'Dortmund',
-            'FC Bayern München': 'Bayern Munich',
-            'Bayern Munchen': 'Bayern Munich',
-            'SV Darmstadt 98': 'Darmstadt',
-            '1. FC Heidenheim 1846': 'Heidenheim',
-            'Heidenheim': 'Heidenheim',
-            'Holstein Kiel': 'Holstein Kiel',
-            'FC St. Pauli': 'St Pauli',
-            'St. Pauli': 'St Pauli', # API
-            # The following two lines are duplicates from the instruction, keeping them as per instruction
-            'FC St. Pauli': 'St Pauli',
-            'St. Pauli': 'St Pauli',
-            # The following three lines are duplicates from the instruction, keeping them as per instruction
-            '1. FC Heidenheim 1846': 'Heidenheim',
-            '1. FC Heidenheim': 'Heidenheim', # API
-            'Heidenheim': 'Heidenheim',
-            
-            # --- ITALY (I1) ---
-            'Inter Milan': 'Inter',
-            'Internazionale': 'Inter',
-            'Inter Milano': 'Inter', # API
-            'AC Milan': 'Milan',
-            'Juventus FC': 'Juventus',
-            'Juventus Turin': 'Juventus', # API
-            'SS Lazio': 'Lazio',
-            'Lazio Rome': 'Lazio', # API
-            'AS Roma': 'Roma',
-            'SSC Napoli': 'Napoli',
-            'Atalanta BC': 'Atalanta',
-            'Bologna FC': 'Bologna',
-            'ACF Fiorentina': 'Fiorentina',
-            'Torino FC': 'Torino',
-            'Udinese Calcio': 'Udinese',
-            'Genoa CFC': 'Genoa',
-            'Hellas Verona': 'Verona',
-            'Hellas Verona FC': 'Verona',
-            'US Lecce': 'Lecce',
-            'AC Monza': 'Monza',
-            'Frosinone Calcio': 'Frosinone',
-            'US Salernitana 1919': 'Salernitana',
-            'Empoli FC': 'Empoli',
-            'Cagliari Calcio': 'Cagliari',
-            'Parma Calcio 1913': 'Parma',
-            'Parma Calcio': 'Parma', # API
-            'Parma': 'Parma',
-            'Como 1907': 'Como',
-            'Venezia FC': 'Venezia',
-            'Pisa SC': 'Pisa', # API
-            'Sassuolo Calcio': 'Sassuolo', # API
 
-            # --- SPAIN (SP1/SP2 updates) ---
-            'Real Betis Seville': 'Betis',
-            'RC Celta de Vigo': 'Celta', 
-            'Espanyol Barcelona': 'Espanyol',
-            'Real Sociedad San Sebastian': 'Sociedad',
-            'Real Sociedad San Sebastian B': 'Sociedad B',
-            'Valladolid': 'Real Valladolid', # FIX
-            # Correct mappings for History Match (Not Logo Filenames)
-            'FC Koln': 'FC Koln', 
-            'Mainz': 'Mainz',
-            'Albacete Balompie': 'Albacete',
-            'CD Castellon': 'Castellon',
-            'RC Deportivo La Coruna': 'Dep. La Coruna',
+@lru_cache(maxsize=NameNormalizer.MEMO_SIZE)
+def _resolve(name):
+    return NameNormalizer._compile(name)
 
-            # --- NETHERLANDS (N1) ---
-            'Ajax Amsterdam': 'Ajax',
-            'Feyenoord Rotterdam': 'Feyenoord',
-            'PSV Eindhoven': 'PSV',
-            'SC Heerenveen': 'Heerenveen',
-            'AZ Alkmaar': 'AZ Alkmaar', # Verify Local
-            'FC Twente Enschede': 'Twente',
-            'FC Groningen': 'Groningen',
-            'NEC Nijmegen': 'NEC Nijmegen',
-            'PEC Zwolle': 'Zwolle',
-            'Sparta Rotterdam': 'Sparta Rotterdam',
-            'Excelsior Rotterdam': 'Excelsior',
-            'Go Ahead Eagles': 'Go Ahead Eagles',
-            'Fortuna Sittard': 'Fortuna Sittard',
-            'FC Utrecht': 'Utrecht',
-            'FC Volendam': 'Volendam',
-            'Heracles Almelo': 'Heracles',
-            'SC Telstar': 'Telstar',
-            'NAC Breda': 'NAC Breda',
-            
-            # --- PORTUGAL (P1) ---
-            'Santa Clara Azores': 'Santa Clara',
-            'Nacional da Madeira': 'Nacional',
-            'Moreirense FC': 'Moreirense',
-            'CD Tondela': 'Tondela',
 
-            # --- FRANCE (F1) ---
-            'AS Monaco': 'Monaco',
-            'FC Lorient': 'Lorient',
-            'Paris Saint-Germain': 'Paris SG',
-            'PSG': 'Paris SG',
-            'LOSC Lille': 'Lille',
-            'Lille OSC': 'Lille',
-            'Olympique de Marseille': 'Marseille',
-            'Olympique Marseille': 'Marseille',
-            'Stade Brestois 29': 'Brest',
-            'Stade Brestois': 'Brest',
-            'Stade Rennais FC': 'Rennes',
-            'Stade Rennais': 'Rennes',
-            'OGC Nice': 'Nice',
-            'FC Nantes': 'Nantes',
-            'RC Strasbourg Alsace': 'Strasbourg',
-            'Strasbourg Alsace': 'Strasbourg',
-            'Montpellier HSC': 'Montpellier',
-            'Toulouse FC': 'Toulouse',
-            'Stade de Reims': 'Reims',
-            'RC Lens': 'Lens',
-            'AJ Auxerre': 'Auxerre',
-            'Angers SCO': 'Angers',
-            'AS Saint-Etienne': 'St Etienne',
-            'Saint-Etienne': 'St Etienne',
-            'Le Havre AC': 'Le Havre',
-            'Olympique Lyon': 'Lyon',
-            'Olympique Lyonnais': 'Lyon',
-            'FC Metz': 'Metz',
-        }
-        return mapping.get(name, name)
+atexit.register(NameNormalizer.flush_audit)
@@ -3,6 +3,7 @@ import unittest
 import pandas as pd
 import sys
 import os
+import datetime
 import streamlit as st
 
 # Mock streamlit secrets/session_state if needed
@@ -108,5 +109,463 @@ class MetricOrbitTestSuite(unittest.TestCase):
         except Exception as e:
             self.fail(f"Match View Render Crash: {e}")
 
+class BetSettlementTestSuite(unittest.TestCase):
+    """BetSettler market rules, result join and batch settlement (no data download needed)."""
+
+    # Expected outcome of every ValueEngine market for a 2-1 home win
+    EXPECTED_2_1 = {
+        'Home': 'Won', 'Draw': 'Lost', 'Away': 'Lost', 'BTTS_Yes': 'Won', 'BTTS_No': 'Lost',
+        'Over0.5': 'Won', 'Over1.5': 'Won', 'Over2.5': 'Won', 'Over3.5': 'Lost', 'Over4.5': 'Lost',
+        'Under0.5': 'Lost', 'Under1.5': 'Lost', 'Under2.5': 'Lost', 'Under3.5': 'Won', 'Under4.5': 'Won',
+        'HomeOver0.5': 'Won', 'HomeOver1.5': 'Won', 'HomeOver2.5': 'Lost',
+        'AwayOver0.5': 'Won', 'AwayOver1.5': 'Lost', 'AwayOver2.5': 'Lost',
+    }
+
+    def test_every_value_engine_label_settles(self):
+        from src.engine.settlement import BetSettler
+        from src.engine.value_engine import ValueEngine
+        markets = ValueEngine.MARKETS
+        self.assertEqual({m[0] for m in markets}, set(self.EXPECTED_2_1), "Market list changed: update EXPECTED_2_1")
+        joined = pd.DataFrame({
+            'selection': [label for _, label, _, _ in markets],
+            'fthg': 2.0, 'ftag': 1.0,
+        })
+        outcomes = BetSettler.outcomes(joined)
+        for (key, label, _, _), outcome in zip(markets, outcomes):
+            self.assertEqual(outcome, self.EXPECTED_2_1[key], f"Label '{label}' settled as {outcome}")
+
+    def test_stored_market_wins_over_label(self):
+        from src.engine.settlement import BetSettler
+        joined = pd.DataFrame({
+            'selection': ['Ambos Marcan (Sí)', 'Seguro de Gol (>1.5)', 'Over 2.5 Goals', 'Corners'],
+            'market': ['BTTS_No', 'Over1.5', None, None],
+            'fthg': 2.0, 'ftag': 1.0,
+        })
+        self.assertEqual(list(BetSettler.outcomes(joined)), ['Lost', 'Won', 'Won', None])
+
+    def test_no_result_stays_pending(self):
+        from src.engine.settlement import BetSettler
+        joined = pd.DataFrame({'selection': ['Victoria Local'], 'fthg': [float('nan')], 'ftag': [float('nan')]})
+        self.assertIsNone(BetSettler.outcomes(joined).iloc[0])
+
+    def _results(self):
+        return pd.DataFrame({
+            'home': ['Arsenal', 'Arsenal', 'Leeds', 'Hull', 'Hull'],
+            'away': ['Chelsea', 'Chelsea', 'Hull', 'Leeds', 'Leeds'],
+            'match_date': pd.to_datetime(['2024-09-01', '2025-01-12', '2025-01-20', '2024-01-01', '2024-05-01']),
+            'fthg': [1.0, 2.0, 0.0, 0.0, 3.0],
+            'ftag': [0.0, 1.0, 0.0, 0.0, 3.0],
+        })
+
+    def test_join_takes_nearest_result_within_tolerance(self):
+        from src.engine.settlement import BetSettler
+        bets = pd.DataFrame({
+            'home_team': ['Arsenal', 'Leeds', 'Arsenal', 'Hull'],
+            'away_team': ['Chelsea', 'Hull', 'Chelsea', 'Leeds'],
+            # 2 days off (nearest of two results), 10 days off, tz-aware string, undated
+            'match_date': ['2025-01-10', '2025-01-10', '2025-01-11T20:00:00+01:00', ''],
+        })
+        joined = BetSettler.match_results(bets, self._results())
+        self.assertEqual(joined['fthg'].iloc[0], 2.0)
+        self.assertTrue(pd.isna(joined['fthg'].iloc[1]))
+        self.assertEqual(joined['fthg'].iloc[2], 2.0)
+        # Undated bets take the pair's latest result
+        self.assertEqual(joined[['fthg', 'ftag']].iloc[3].tolist(), [3.0, 3.0])
+
+        wider = BetSettler.match_results(bets.iloc[[1]], self._results(), tolerance=pd.Timedelta(days=10))
+        self.assertEqual(wider['fthg'].tolist(), [0.0])
+
+    def test_settle_pending_updates_only_matched_bets(self):
+        import tempfile
+        from src.engine.settlement import BetSettler
+        from src.user.store import Store
+        from src.user.portfolio_manager import PortfolioManager
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = Store(os.path.join(tmp.name, 'app.db'))
+        pm = PortfolioManager(os.path.join(tmp.name, 'portfolios'), store=store)
+        arsenal = {'HomeTeam': 'Arsenal', 'AwayTeam': 'Chelsea', 'Date': '2025-01-11'}
+        leeds = {'HomeTeam': 'Leeds', 'AwayTeam': 'Hull', 'Date': '2025-01-10'}
+        won = pm.add_bet('ana', arsenal, 'Victoria Local', 10, 2.0, market='Home')
+        lost = pm.add_bet('luis', arsenal, 'Ambos Marcan (No)', 5, 1.8)
+        unmatched = pm.add_bet('ana', leeds, 'Empate', 5, 3.0, market='Draw')
+
+        history = self._results().rename(columns={'home': 'HomeTeam', 'away': 'AwayTeam', 'match_date': 'Date',
+                                                  'fthg': 'FTHG', 'ftag': 'FTAG'})
+        self.assertEqual(BetSettler.settle_pending(store, history), 2)
+        bets = {b['id']: b for b in pm.get_user_bets('ana') + pm.get_user_bets('luis')}
+        self.assertEqual((bets[won]['status'], bets[won]['result_amount']), ('Won', 10.0))
+        self.assertEqual((bets[lost]['status'], bets[lost]['result_amount']), ('Lost', -5.0))
+        self.assertEqual(bets[unmatched]['status'], 'Pending')
+        # Nothing left to settle on a second run
+        self.assertEqual(BetSettler.settle_pending(store, history), 0)
+
+class UserStoreTestSuite(unittest.TestCase):
+    """SQLite store: one-shot JSON migration, registration and ledger versions (temp database)."""
+
+    def setUp(self):
+        import tempfile
+        from src.user.store import Store
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.store = Store(os.path.join(self.dir, 'app.db'))
+
+    def _write_json(self, path, data):
+        import json
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def test_users_migrate_once(self):
+        users_file = os.path.join(self.dir, 'users.json')
+        self._write_json(users_file, {'ana': {'password_hash': 'h1', 'name': 'Ana', 'preferences': {'leagues': ['E0']}}})
+        self.assertEqual(self.store.migrate_users(users_file), 1)
+
+        # Later edits of the legacy file are not re-imported
+        self._write_json(users_file, {'ana': {'password_hash': 'h2'}, 'luis': {'password_hash': 'h3'}})
+        self.assertEqual(self.store.migrate_users(users_file), 0)
+        rows = self.store.execute("SELECT username, password_hash FROM users").fetchall()
+        self.assertEqual([tuple(r) for r in rows], [('ana', 'h1')])
+        prefs = self.store.execute("SELECT key, value FROM preferences WHERE username = 'ana'").fetchall()
+        self.assertEqual([tuple(r) for r in prefs], [('leagues', '["E0"]')])
+
+    def test_portfolios_migrate_once(self):
+        from src.user.store import Store
+        data_dir = os.path.join(self.dir, 'portfolios')
+        bets = [{'id': 'a1', 'home_team': 'Arsenal', 'away_team': 'Chelsea', 'selection': 'Victoria Local',
+                 'odds': 2.0, 'stake': 10.0, 'status': 'Pending', 'note': 'kept in extra'},
+                {'id': 'a2', 'home_team': 'Leeds', 'away_team': 'Hull', 'selection': 'Empate',
+                 'odds': 3.2, 'stake': 5.0, 'status': 'Lost', 'result_amount': -5.0}]
+        self._write_json(os.path.join(data_dir, 'ana.json'), {'balance': 50.0, 'currency': '€', 'bets': bets})
+        self.assertEqual(self.store.migrate_portfolios(data_dir), 2)
+        self.assertEqual(self.store.migrate_portfolios(data_dir), 0)
+
+        rows = self.store.execute("SELECT * FROM bets WHERE username = 'ana' ORDER BY seq").fetchall()
+        # Unknown fields round-trip through the extra column
+        self.assertEqual([Store.bet_dict(r) for r in rows], bets)
+        balance = self.store.execute("SELECT balance FROM portfolios WHERE username = 'ana'").fetchone()
+        self.assertEqual(balance['balance'], 50.0)
+
+    def test_register_is_insert_if_absent(self):
+        from src.auth.user_manager import UserManager
+        um = UserManager(os.path.join(self.dir, 'users.json'), store=self.store)
+        ok, _ = um.register('ana', 'pass1', 'Ana', 'Ruiz', 'ana@example.com')
+        self.assertTrue(ok)
+        ok, msg = um.register('ana', 'pass2', 'Otra', 'Ana', 'otra@example.com')
+        self.assertFalse(ok)
+        self.assertEqual(msg, "El nombre de usuario ya existe.")
+        # The first registration is left untouched
+        self.assertIsNotNone(um.authenticate('ana', 'pass1'))
+        self.assertIsNone(um.authenticate('ana', 'pass2'))
+        self.assertEqual(um.get_user('ana')['email'], 'ana@example.com')
+
+    def test_ledger_version_bumps_on_every_bet_write(self):
+        from src.user.portfolio_manager import PortfolioManager
+        pm = PortfolioManager(os.path.join(self.dir, 'portfolios'), store=self.store)
+        match = {'HomeTeam': 'Arsenal', 'AwayTeam': 'Chelsea', 'Date': '2025-01-10', 'Div': 'E0'}
+        self.assertEqual(self.store.ledger_version('ana'), 0)
+
+        bet_id = pm.add_bet('ana', match, 'Victoria Local', 10, 2.0, market='Home')
+        pm.add_bet('luis', match, 'Empate', 5, 3.0, market='Draw')
+        v1 = self.store.ledger_version('ana')
+        self.assertEqual(v1, 1)
+
+        self.assertTrue(pm.update_bet('ana', bet_id, 20))
+        v2 = self.store.ledger_version('ana')
+        self.assertTrue(pm.update_bet_status('ana', bet_id, 'Won'))
+        v3 = self.store.ledger_version('ana')
+        self.assertTrue(pm.delete_bet('ana', bet_id))
+        v4 = self.store.ledger_version('ana')
+        self.assertEqual([v1, v2, v3, v4], [1, 2, 3, 4])
+
+        # Writes that touch no row (or another user's bets) leave the version alone
+        self.assertFalse(pm.update_bet('ana', bet_id, 30))
+        self.assertEqual(self.store.ledger_version('ana'), 4)
+        self.assertEqual(self.store.ledger_version('luis'), 1)
+
+class PortfolioAnalyticsTestSuite(unittest.TestCase):
+    """PortfolioAnalytics KPIs on a small hand-checked ledger."""
+
+    # (stake, odds, status, match date); stake 0 = tracking prediction
+    LEDGER = [
+        (10, 2.0, 'Won', '2025-01-01'),   # +10 -> bankroll 110
+        (10, 3.0, 'Lost', '2025-01-02'),  # -10 -> 100
+        (10, 1.5, 'Lost', '2025-01-03T18:00:00+01:00'),  # -10 -> 90 (20 below the 110 peak); tz-aware like API dates
+        (20, 2.5, 'Won', '2025-01-04'),   # +30 -> 120
+        (5, 2.0, 'Void', '2025-01-05'),   # 0 -> 120
+        (0, 1.8, 'Won', '2025-01-06'),    # tracking only
+        (10, 2.0, 'Pending', '2025-01-07'),
+    ]
+
+    def _report(self):
+        from src.user.analytics import PortfolioAnalytics
+        bets = [{'id': str(i), 'stake': stake, 'odds': odds, 'status': status, 'match_date': date,
+                 'strategy': 'Valor' if i % 2 else 'Manual', 'league': 'E0'}
+                for i, (stake, odds, status, date) in enumerate(self.LEDGER)]
+        return PortfolioAnalytics(bets, start_balance=100.0)
+
+    def test_summary_numbers(self):
+        summary = self._report().summary
+        expected = {
+            'total_bets': 7, 'settled_bets': 6, 'pending_bets': 1,
+            'win_rate': 50.0,        # 3 won of 6 settled (tracking included)
+            'hit_rate': 60.0,        # 3 won of 5 won/lost
+            'total_staked': 55.0,    # settled real stakes, void included
+            'total_profit': 20.0,
+            'roi': 36.36,            # 20 / 55
+            'yield': 40.0,           # 20 / 50 at risk (void excluded)
+            'total_returned': 75.0,  # 20 + 50 + 5 (void refunded)
+            'bankroll': 120.0,
+            'max_drawdown': 20.0,
+            'max_drawdown_pct': 18.18,  # 20 / 110
+        }
+        self.assertEqual({k: summary[k] for k in expected}, expected)
+
+    def test_curve_and_breakdown(self):
+        report = self._report()
+        self.assertEqual(report.curve['bankroll'].tolist(), [110.0, 100.0, 90.0, 120.0, 120.0])
+        self.assertEqual(report.curve['drawdown'].tolist(), [0.0, 10.0, 20.0, 0.0, 0.0])
+        by_strategy = report.by_strategy
+        # Manual: bets 0, 2, 4, 6 -> +10 - 10 + 0 on 25 staked; Valor: bets 1, 3, 5 -> -10 + 30 on 30 staked
+        self.assertEqual(by_strategy.loc['Manual', 'Beneficio'], 0.0)
+        self.assertEqual(by_strategy.loc['Valor', 'Beneficio'], 20.0)
+        self.assertEqual(by_strategy.loc['Valor', 'ROI %'], 66.7)
+        self.assertEqual(by_strategy.loc['Valor', 'Predicciones'], 1)
+
+    def test_placeholder_result_amount_is_ignored(self):
+        from src.user.analytics import PortfolioAnalytics
+        bets = [
+            # add_bet / legacy JSON write result_amount 0.0 before settlement
+            {'id': '1', 'stake': 50.0, 'odds': 2.0, 'status': 'Won', 'result_amount': 0.0},
+            {'id': '2', 'stake': 10.0, 'odds': 3.0, 'status': 'Lost', 'result_amount': 0.0},
+            # Explicit amount (e.g. a partial cash-out) is kept
+            {'id': '3', 'stake': 10.0, 'odds': 4.0, 'status': 'Won', 'result_amount': 12.5},
+            {'id': '4', 'stake': 10.0, 'odds': 2.0, 'status': 'Pending', 'result_amount': 0.0},
+        ]
+        summary = PortfolioAnalytics(bets).summary
+        self.assertEqual(summary['total_profit'], 52.5)  # +50 - 10 + 12.5
+        self.assertEqual(summary['total_staked'], 70.0)
+        self.assertEqual(summary['roi'], 75.0)
+
+    def test_report_cached_per_ledger_version(self):
+        import tempfile
+        from src.user.analytics import PortfolioAnalytics
+        from src.user.store import Store
+        from src.user.portfolio_manager import PortfolioManager
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        pm = PortfolioManager(os.path.join(tmp.name, 'portfolios'), store=Store(os.path.join(tmp.name, 'app.db')))
+        match = {'HomeTeam': 'Arsenal', 'AwayTeam': 'Chelsea', 'Date': '2025-01-10'}
+        bet_id = pm.add_bet('ana', match, 'Victoria Local', 10, 2.0, market='Home')
+        first = pm.analytics('ana')
+        self.assertIs(pm.analytics('ana'), first)
+        pm.update_bet_status('ana', bet_id, 'Won')
+        self.assertIsNot(pm.analytics('ana'), first)
+        self.assertEqual(pm.get_portfolio_stats('ana')['total_profit'], 10.0)
+
+class GoalModelTestSuite(unittest.TestCase):
+    """GoalModel on a small synthetic league (no data download needed)."""
+
+    # Scoring strength per team
+    STRENGTH = {'Tottenham': 1.8, 'Man United': 1.2, 'Arsenal': 1.5, 'Burnley': 0.6}
+
+    @classmethod
+    def setUpClass(cls):
+        import numpy as np
+        rng = np.random.default_rng(1)
+        rows = []
+        for k in range(160):
+            home, away = rng.choice(list(cls.STRENGTH), 2, replace=False)
+            sh, sa = cls.STRENGTH[home], cls.STRENGTH[away]
+            rows.append({'Div': 'E0', 'Season': '2425', 'Date': pd.Timestamp('2024-08-01') + pd.Timedelta(days=2 * k),
+                         'HomeTeam': home, 'AwayTeam': away,
+                         'FTHG': rng.poisson(1.2 * sh / np.sqrt(sa)), 'FTAG': rng.poisson(sa / np.sqrt(sh))})
+        cls.df = pd.DataFrame(rows)
+        cls.df['FTR'] = np.where(cls.df['FTHG'] > cls.df['FTAG'], 'H', np.where(cls.df['FTHG'] == cls.df['FTAG'], 'D', 'A'))
+
+    def setUp(self):
+        from src.engine.goal_model import GoalModel
+        self.model = GoalModel().fit(self.df)
+
+    def test_probabilities_sum_to_one(self):
+        import numpy as np
+        home, away = ['Tottenham', 'Burnley', 'Unknown FC'], ['Burnley', 'Arsenal', 'Man United']
+        m = self.model.score_matrix(home, away)
+        np.testing.assert_allclose(m.sum(axis=(1, 2)), 1.0)
+        markets = self.model.markets(home, away)
+        np.testing.assert_allclose(markets[['HomeWin', 'Draw', 'AwayWin']].sum(axis=1), 1.0)
+        for line in self.model.TOTAL_LINES:
+            np.testing.assert_allclose(markets[f'Over{line}'] + markets[f'Under{line}'], 1.0)
+
+    def test_stronger_team_more_likely_to_win(self):
+        strong = self.model.predict('Tottenham', 'Burnley')
+        weak = self.model.predict('Burnley', 'Tottenham')
+        self.assertGreater(strong['HomeWin'], strong['AwayWin'])
+        self.assertGreater(strong['HomeWin'], weak['HomeWin'])
+        self.assertGreater(weak['AwayWin'], weak['HomeWin'])
+
+    def test_predictor_resolves_aliases(self):
+        from unittest import mock
+        from src.engine.ml_engine import MLEngine
+        # No ML training or registry writes: only the analytic parts of the predictor
+        with mock.patch.object(MLEngine, 'load_model', return_value=False), mock.patch.object(MLEngine, 'retrain_async'):
+            predictor = Predictor(self.df, background_training=True)
+        alias = predictor.predict_match_safe('Spurs', 'Man Utd', match_date='2025-06-01')
+        canonical = predictor.predict_match_safe('Tottenham', 'Man United', match_date='2025-06-01')
+        gm = {k: v for k, v in canonical.items() if k.startswith('GM_')}
+        self.assertEqual({k: alias[k] for k in gm}, gm)
+        self.assertEqual(gm['GM_HomeWin'], self.model.predict('Tottenham', 'Man United')['HomeWin'])
+
+class ValueEngineTestSuite(unittest.TestCase):
+    """ValueEngine on small hand-checked slates (default limits)."""
+
+    def _evaluate(self, rows):
+        from src.engine.value_engine import ValueEngine
+        slate = pd.DataFrame([{'Date': '2025-01-04', **row} for row in rows])
+        slate['HomeTeam'] = [f'Home {i}' for i in range(len(slate))]
+        slate['AwayTeam'] = [f'Away {i}' for i in range(len(slate))]
+        slate['Div'] = 'E0'
+        return ValueEngine().evaluate(slate)
+
+    def test_edge_and_kelly(self):
+        bets = self._evaluate([{'GM_HomeWin': 0.5, 'B365H': 2.4, 'GM_Draw': 0.3, 'B365D': 3.2}])
+        self.assertEqual(bets['market'].tolist(), ['Home'])  # Draw: 0.3 * 3.2 - 1 = -0.04
+        bet = bets.iloc[0]
+        self.assertAlmostEqual(bet['edge'], 0.2)            # 0.5 * 2.4 - 1
+        self.assertAlmostEqual(bet['kelly'], 0.2 / 1.4)     # edge / (odd - 1)
+        self.assertAlmostEqual(bet['fair_odd'], 2.0)
+        self.assertEqual(bet['stake'], 0.0357)              # quarter Kelly, under every cap
+
+    def test_edge_and_odds_filters(self):
+        bets = self._evaluate([
+            {'GM_HomeWin': 0.5, 'B365H': 2.05},  # edge 0.025 < min_edge
+            {'GM_HomeWin': 0.9, 'B365H': 1.2},   # edge 0.08 but odd < min_odd
+            {'GM_HomeWin': 0.2, 'B365H': 9.0},   # edge 0.8 but odd > max_odd
+            {'GM_HomeWin': 0.5, 'B365H': 2.1},   # edge 0.05: kept
+        ])
+        self.assertEqual(bets['match_idx'].tolist(), [3])
+        self.assertAlmostEqual(bets['edge'].iloc[0], 0.05)
+
+    def test_stake_caps(self):
+        # 0.6 @ 3.0 -> kelly 0.4, quarter 0.1 -> per-bet cap 0.05
+        rows = [{'GM_HomeWin': 0.6, 'B365H': 3.0, 'Date': '2025-01-04'} for _ in range(6)]
+        # Two 0.05 bets on one match (0.4 @ 4.0 -> kelly 0.2) -> scaled to the 0.08 per-match cap
+        rows.append({'GM_HomeWin': 0.6, 'B365H': 3.0, 'GM_AwayWin': 0.4, 'B365A': 4.0, 'Date': '2025-01-05'})
+        bets = self._evaluate(rows)
+        by_day = bets.groupby('Date')['stake']
+        # Six 0.05 bets on one matchday (0.30) -> scaled to the 0.25 cap
+        self.assertEqual(by_day.get_group('2025-01-04').tolist(), [0.0417] * 6)
+        self.assertEqual(sorted(by_day.get_group('2025-01-05').tolist()), [0.04, 0.04])
+
+    def test_odds_column_preference(self):
+        bets = self._evaluate([
+            {'GM_HomeWin': 0.5, 'B365H': 2.4, 'AvgH': 3.0},
+            {'GM_HomeWin': 0.5, 'B365H': float('nan'), 'AvgH': 2.2},  # no B365 price: average used
+        ]).sort_values('match_idx')
+        self.assertEqual(bets['odd'].tolist(), [2.4, 2.2])
+
+class FeatureServiceTestSuite(unittest.TestCase):
+    """FeatureService point-in-time windows on a hand-built history."""
+
+    # (date, home, away, FTHG, FTAG, HS, AS); no fouls or corners columns at all
+    MATCHES = [
+        ('2025-01-01', 'Alpha', 'Beta', 1, 0, 10, 5),
+        ('2025-01-02', 'Gamma', 'Alpha', 2, 2, 8, 12),
+        ('2025-01-03', 'Alpha', 'Beta', 0, 1, 6, 7),
+        ('2025-01-04', 'Alpha', 'Gamma', 3, 1, 15, 4),
+        ('2025-01-05', 'Alpha', 'Beta', 9, 9, 40, 40),  # on the as_of date
+        ('2025-01-06', 'Alpha', 'Gamma', 9, 0, 40, 0),  # after it
+    ]
+    AS_OF = '2025-01-05'
+
+    def _service(self, matches):
+        from src.engine.feature_service import FeatureService
+        df = pd.DataFrame(matches, columns=['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'HS', 'AS'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        df['FTR'] = ['H' if h > a else 'D' if h == a else 'A' for h, a in zip(df['FTHG'], df['FTAG'])]
+        return FeatureService(df)
+
+    def test_ignores_matches_on_and_after_as_of(self):
+        full = self._service(self.MATCHES).features('Alpha', as_of=self.AS_OF, n=5)
+        past = self._service(self.MATCHES[:4]).features('Alpha', as_of=self.AS_OF, n=5)
+        self.assertEqual(full['Matches'], 4)
+        self.assertEqual(full['LastDate'], pd.Timestamp('2025-01-04'))
+        self.assertEqual(full['RestDays'], 1)
+        self.assertEqual(full['AvgGoalsFor'], past['AvgGoalsFor'])
+        self.assertEqual(full['AvgShotsFor'], past['AvgShotsFor'])
+
+    def test_window_means(self):
+        import math
+        feats = self._service(self.MATCHES).features('Alpha', as_of=self.AS_OF, n=3)
+        # Last 3 before the 5th: 2-2 away (12 shots), 0-1 (6), 3-1 (15)
+        self.assertEqual(feats['Matches'], 3)
+        self.assertAlmostEqual(feats['AvgGoalsFor'], 5 / 3)
+        self.assertAlmostEqual(feats['AvgGoalsAgainst'], 4 / 3)
+        self.assertAlmostEqual(feats['AvgShotsFor'], 11.0)
+        self.assertAlmostEqual(feats['AvgPoints'], 4 / 3)     # D, L, W
+        self.assertAlmostEqual(feats['StdDev_Goals'], math.sqrt(3))  # totals 4, 1, 4
+        home = self._service(self.MATCHES).features('Alpha', as_of=self.AS_OF, n=5, venue='Home')
+        self.assertAlmostEqual(home['AvgGoalsFor'], 4 / 3)    # 1-0, 0-1, 3-1
+
+    def test_missing_stat_is_nan(self):
+        import math
+        feats = self._service(self.MATCHES).features('Alpha', as_of=self.AS_OF)
+        for key in ['AvgFoulsFor', 'AvgCornersAgainst', 'AvgCardsFor']:
+            self.assertTrue(math.isnan(feats[key]), key)
+        self.assertIsNone(self._service(self.MATCHES).features('Alpha', as_of='2025-01-01'))
+
+class SlateSnapshotTestSuite(unittest.TestCase):
+    """SlateSnapshot save/load round trip through its typed column blocks."""
+
+    def setUp(self):
+        import tempfile
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+        nan = float('nan')
+        # Already in storage order (Div, Date) so the loaded frame lines up row by row
+        self.frame = pd.DataFrame({
+            'HomeTeam': ['Arsenal', 'Chelsea', 'Everton', 'Betis'],
+            'AwayTeam': ['Burnley', 'Fulham', 'Leeds', 'Sevilla'],
+            'Date': pd.to_datetime(['2025-01-04 15:00', '2025-01-05 20:00', '2025-01-06 12:30', '2025-01-05 21:00']),
+            'Div': ['E0', 'E0', 'E0', 'SP1'],
+            'HasStats': pd.array([True, False, None, True], dtype='boolean'),
+            'Referee': pd.Series(['M Oliver', None, 'A Taylor', None], dtype=object),
+            'active_strategies': [['Over 2.5'], [], ['BTTS', 'Over 2.5'], ['BTTS']],
+            'home_trends': [[{'label': 'Gana en casa', 'value': 0.8}], [], None, [{'label': 'Marca', 'value': 1}]],
+            'away_trends': [{'form': 'WDL', 'streak': 2}, {}, {'form': None}, {'form': 'LLL', 'streak': 0}],
+            'B365H': [1.9, nan, 2.6, nan],
+            'GM_HomeWin': [0.55, 0.41, 0.38, 0.47],
+        })
+        from src.data.snapshot import SlateSnapshot
+        metadata = {'schema_version': SlateSnapshot.SCHEMA_VERSION,
+                    'last_updated': datetime.datetime.now().isoformat(), 'leagues': ['E0', 'SP1']}
+        SlateSnapshot(self.frame, metadata, {}).save(self.path)
+
+    def _assert_rows(self, loaded, rows):
+        expected = self.frame.iloc[rows].reset_index(drop=True)
+        self.assertTrue(loaded['FromSnapshot'].all())
+        loaded = loaded.drop(columns=['FromSnapshot']).reset_index(drop=True)
+        self.assertEqual(list(loaded.columns), list(expected.columns))
+        self.assertEqual(loaded['HasStats'].tolist(), expected['HasStats'].tolist())  # <NA> stays null
+        for col in ['HomeTeam', 'Referee', 'active_strategies', 'home_trends', 'away_trends']:
+            self.assertEqual(loaded[col].tolist(), expected[col].tolist(), col)
+        pd.testing.assert_frame_equal(loaded[['Date', 'B365H', 'GM_HomeWin']], expected[['Date', 'B365H', 'GM_HomeWin']],
+                                      check_dtype=False)
+
+    def test_round_trip(self):
+        from src.data.snapshot import SlateSnapshot
+        snapshot = SlateSnapshot.load(path=self.path)
+        self.assertEqual(snapshot.leagues, {'E0', 'SP1'})
+        self._assert_rows(snapshot.matches, [0, 1, 2, 3])
+
+    def test_partial_load(self):
+        from src.data.snapshot import SlateSnapshot
+        # One league, one calendar day (an evening kick-off is still inside the day)
+        snapshot = SlateSnapshot.load(['E0'], '2025-01-05', '2025-01-05', path=self.path)
+        self._assert_rows(snapshot.matches, [1])
+        self.assertTrue(SlateSnapshot.load(['SP2'], path=self.path).matches.empty)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+# Add src to path
+sys.path.append(os.getcwd())
+
+APP = "src/dashboard/app.py"
+
+# Runs inside a fresh interpreter (cwd = the tree being measured) and prints one JSON line
+_WORKER = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("{app}", default_timeout={timeout})
+at.session_state["authenticated"] = True
+at.session_state["user"] = {{"username": "benchmark", "preferences": {{}}}}
+at.session_state["user_prefs"] = {{"leagues": {leagues!r}, "seasons": {seasons!r}}}
+t1 = time.perf_counter()
+at.run()
+cold = time.perf_counter() - t1
+reruns = []
+for _ in range({reruns}):
+    t = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t)
+errors = [str(e.value)[:200] for e in at.exception]
+print(json.dumps({{"import": t1 - t0, "cold": cold, "reruns": reruns, "errors": errors}}))
+'''
+
+def measure(tree, leagues, seasons, reruns, timeout):
+    """Cold start (first script run in a new process) and rerun latencies of the app in `tree`."""
+    code = _WORKER.format(app=APP, leagues=leagues, seasons=seasons, reruns=reruns, timeout=timeout)
+    out = subprocess.run([sys.executable, "-c", code], cwd=tree, capture_output=True, text=True)
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if out.returncode != 0 or not lines:
+        raise RuntimeError(f"Benchmark run failed in {tree}:\n{out.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+def checkout(rev, dest):
+    """Exports a git revision into dest, sharing the local data_cache (no re-downloads)."""
+    archive = subprocess.run(["git", "archive", rev], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", dest], input=archive, check=True)
+    cache = os.path.abspath("data_cache")
+    if os.path.isdir(cache):
+        shutil.rmtree(os.path.join(dest, "data_cache"), ignore_errors=True)
+        os.symlink(cache, os.path.join(dest, "data_cache"))
+
+def report(label, result):
+    reruns = result["reruns"]
+    med = statistics.median(reruns) if reruns else float("nan")
+    p90 = sorted(reruns)[int(0.9 * (len(reruns) - 1))] if reruns else float("nan")
+    print(f"{label:<12} import {result['import']:.2f}s | cold run {result['cold']:.2f}s | "
+          f"rerun median {med * 1000:.0f}ms, p90 {p90 * 1000:.0f}ms ({len(reruns)} reruns)")
+    for err in result["errors"]:
+        print(f"   ⚠️ App exception: {err}")
+    return med
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start and rerun latency of the Streamlit dashboard (headless AppTest).")
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--leagues", nargs="+", default=['SP1', 'SP2', 'E0', 'E1', 'D1', 'I1', 'F1', 'P1', 'N1'])
+    parser.add_argument("--seasons", nargs="+", default=['2526', '2425'])
+    parser.add_argument("--compare", metavar="REV", help="Also measure this git revision (e.g. HEAD~1) for a before/after")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds allowed per script run")
+    args = parser.parse_args()
+
+    print(f"⏱️ Benchmarking {APP} ({len(args.leagues)} leagues, seasons {args.seasons})...", flush=True)
+    results = {}
+    if args.compare:
+        with tempfile.TemporaryDirectory() as tmp:
+            checkout(args.compare, tmp)
+            results[args.compare] = measure(tmp, args.leagues, args.seasons, args.reruns, args.timeout)
+    results["working tree"] = measure(os.getcwd(), args.leagues, args.seasons, args.reruns, args.timeout)
+
+    medians = {label: report(label, r) for label, r in results.items()}
+    if args.compare:
+        before, after = medians[args.compare], medians["working tree"]
+        print(f"Rerun speedup vs {args.compare}: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
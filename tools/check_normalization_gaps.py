@@ -21,6 +21,7 @@ def check_gaps():
     print("="*60)
     
     gaps_found = {}
+    all_local_teams = set()
     
     for league in leagues:
         print(f"\nProcessing {league}...")
@@ -34,6 +35,7 @@ def check_gaps():
             
         # Get set of Normalized Local Teams
         local_teams = set(fixtures['HomeTeam'].unique()) | set(fixtures['AwayTeam'].unique())
+        all_local_teams |= local_teams
         print(f"  ✅ Local Teams Loaded: {len(local_teams)}")
         
         # 2. Get API Odds (The 'Source' names)
@@ -79,5 +81,13 @@ def check_gaps():
         for g in gaps:
             print(f"'{g[0]}': '{g[1]}',")
 
+    # Raw names that went through the normalizer unmapped in any run (dashboard, updater, ...),
+    # read from the audit file; names of the local fixtures above are valid as-is
+    unknown = {n: t for n, t in NameNormalizer.unknown_names().items() if n not in all_local_teams}
+    if unknown:
+        print(f"\nUNMAPPED NAMES SEEN BY NameNormalizer ({NameNormalizer.AUDIT_PATH}):")
+        for name, seen in sorted(unknown.items()):
+            print(f"  '{name}' (first seen {seen:%Y-%m-%d %H:%M})" if pd.notna(seen) else f"  '{name}'")
+
 if __name__ == "__main__":
     check_gaps()
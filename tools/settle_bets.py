@@ -0,0 +1,42 @@
+import sys
+import os
+import time
+import argparse
+
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.data.service import DataService
+from src.engine.settlement import BetSettler
+from src.user.store import Store
+
+ALL_LEAGUES = ['SP1', 'SP2', 'E0', 'E1', 'D1', 'I1', 'F1', 'P1', 'N1']
+SEASONS = ['2526', '2425']
+
+def run_once(store, leagues, seasons):
+    t0 = time.perf_counter()
+    history = DataService.build(leagues, seasons)
+    t1 = time.perf_counter()
+    settled = BetSettler.settle_pending(store, history)
+    print(f"✅ {settled} bets settled (load {t1 - t0:.1f}s, settle {time.perf_counter() - t1:.2f}s)")
+    return settled
+
+def main():
+    parser = argparse.ArgumentParser(description="Settles every user's pending bets against the latest results (cron / scheduler job).")
+    parser.add_argument("--db", default=Store.DEFAULT_PATH)
+    parser.add_argument("--leagues", nargs="+", default=ALL_LEAGUES)
+    parser.add_argument("--seasons", nargs="+", default=SEASONS)
+    parser.add_argument("--every", type=float, metavar="MINUTES", help="Keep running, settling every MINUTES")
+    args = parser.parse_args()
+
+    store = Store.get(args.db)
+    run_once(store, args.leagues, args.seasons)
+    while args.every:
+        time.sleep(args.every * 60)
+        try:
+            run_once(store, args.leagues, args.seasons)
+        except Exception as e:
+            print(f"❌ Settlement run failed: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import sys
 import os
-import pandas as pd
 import json
 import datetime
 import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 
 # Add src to path
 sys.path.append(os.getcwd())
@@ -12,176 +14,114 @@ from src.data.loader import DataLoader
 from src.data.upcoming import FixturesFetcher
 from src.engine.predictor import Predictor
 from src.engine.strategies import PREMATCH_PATTERNS
-from src.utils.normalization import NameNormalizer
+from src.engine.trends_scanner import TrendScanner
+from src.engine.trend_index import TrendIndex
+from src.data.snapshot import SlateSnapshot
 
-CACHE_FILE = "data_cache/dashboard_data.json"
 ALL_LEAGUES = ['SP1', 'SP2', 'E0', 'E1', 'D1', 'I1', 'F1', 'P1', 'N1']
+SEASONS = ['2526', '2425'] # Same default as the dashboard, so predictions match the live path
+RUN_LOG = "data_cache/update_runs.log" # One JSON line per run with per-stage timings
 
-import numpy as np
+# Read-only state inherited by forked workers (predictor, feature store, trend index)
+_SHARED = {}
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (datetime.datetime, datetime.date, pd.Timestamp)):
-            return obj.isoformat()
-        if isinstance(obj, (np.integer, np.int64)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64)):
-            return float(obj) if not np.isnan(obj) else None # Handle NaN here if possible, though dump check is later
-        
-        # Fallback for unknown
+def _enrich_shard(fixtures):
+    """Worker: enriches the fixtures of one league with the inherited predictor."""
+    return SlateSnapshot.build(fixtures, _SHARED['predictor'], PREMATCH_PATTERNS, scanner=TrendScanner())
+
+def enrich(upcoming_df, predictor, workers=None):
+    """
+    Predictions, strategies and trends for the whole slate, sharded by league.
+    Shards run in a fork-based process pool so workers share the parent's loaded
+    history and models copy-on-write; serial where fork isn't available or workers=1.
+    """
+    # Only leagues that produced fixtures count as covered: the dashboard fetches the rest live
+    if upcoming_df.empty:
+        return SlateSnapshot.build(upcoming_df, predictor, PREMATCH_PATTERNS, leagues=[], seasons=SEASONS)
+
+    shards = [g for _, g in upcoming_df.groupby(upcoming_df['Div'].fillna('?'), sort=False)]
+    shards.sort(key=len, reverse=True) # Biggest leagues first for better packing
+    workers = min(workers or os.cpu_count() or 1, len(shards))
+
+    if workers > 1 and 'fork' in mp.get_all_start_methods():
+        # Warm the shared indexes once in the parent so workers inherit them
+        TrendIndex.get(predictor.history)
+        _SHARED['predictor'] = predictor
         try:
-             # print(f"⚠️ Warning: serializing unknown type {type(obj)}: {str(obj)[:50]}")
-             return str(obj)
-        except:
-             return "Unserializable Object"
-        return super(DateTimeEncoder, self).default(obj)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork')) as pool:
+                parts = list(pool.map(_enrich_shard, shards))
+        finally:
+            _SHARED.clear()
+    else:
+        parts = [SlateSnapshot.build(s, predictor, PREMATCH_PATTERNS, scanner=TrendScanner()) for s in shards]
+    return SlateSnapshot.merge(parts, leagues=sorted(upcoming_df['Div'].dropna().unique()), seasons=SEASONS)
 
-def update_data():
+def log_run(record):
+    """Appends one run record (JSON line) to RUN_LOG."""
+    try:
+        os.makedirs(os.path.dirname(RUN_LOG), exist_ok=True)
+        with open(RUN_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    except Exception as e:
+        print(f"⚠️ Could not write run log: {e}", flush=True)
+
+def update_data(workers=None):
     print(f"[{datetime.datetime.now()}] 🚀 Starting Backend Data Update...", flush=True)
+    run = {'started': datetime.datetime.now().isoformat(), 'workers': workers, 'status': 'error', 'timings': {}}
+    timings = run['timings']
     
     # 1. Load History (Needed for Predictor)
     print("1. Loading Historical Data...", flush=True)
+    t0 = time.perf_counter()
     loader = DataLoader()
     # Fetch 2 seasons for robust stats
-    data = loader.fetch_data(ALL_LEAGUES, ['2425', '2324'])
+    data = loader.fetch_data(ALL_LEAGUES, SEASONS)
     
     if data.empty:
         print("❌ Error: Historical Data is empty. Aborting.", flush=True)
+        log_run(run)
         return
 
     # Initialize Predictor
     print("   Initializing Predictor...", flush=True)
     predictor = Predictor(data)
+    timings['load'] = time.perf_counter() - t0
     
-    # 2. Fetch Upcoming Matches
+    # 2. Fetch Upcoming Matches (FixturesFetcher merges the odds it finds)
     print(f"2. Fetching Upcoming Fixtures for {len(ALL_LEAGUES)} leagues...", flush=True)
+    t0 = time.perf_counter()
     fetcher = FixturesFetcher()
-    # Fetch for next 7 days
     upcoming_df = fetcher.fetch_upcoming(ALL_LEAGUES)
-    
-    if upcoming_df.empty:
-        print("⚠️ No upcoming matches found.", flush=True)
-        save_empty()
-        return
-        
+    timings['fetch'] = time.perf_counter() - t0
     print(f"   Found {len(upcoming_df)} upcoming matches.", flush=True)
     
-    # 3. Analyze & Enrich (Strategies + Odds)
-    # The Predictor.analyze_upcoming method already does:
-    # - Feature Engineering
-    # - Odds Fetching (via cache or API logic embedded in predict_match_safe helpers?)
-    # Wait, Predictor.analyze_upcoming calls predict_match_safe
-    # predict_match_safe uses 'known_odds' if passed.
-    
-    # We need to explicitly FETCH ODDS here and pass them, OR rely on FixturesFetcher?
-    # FixturesFetcher.fetch_upcoming calls OddsApiClient internally! 
-    # Let's verify FixturesFetcher logic.
-    # ... FixturesFetcher DOES merge odds if available.
-    
+    # 3. Analyze & Enrich (Predictions + Strategies + Trends + Odds), one shard per league
     print("3. Analyzing Matches (Running Strategies)...", flush=True)
-    
-    # We use a helper to replicate app.py logic
-    analyzed_results = []
-    
-    # Pre-calculate Pattern Docs for frontend
-    patterns_info = {name: doc for name, _, doc, _ in PREMATCH_PATTERNS}
-    
-    # We'll group matches by League for easier frontend consumption
-    grouped_data = {}
-    
-    # Counter
-    strat_count = 0
-    
-    for idx, row in upcoming_df.iterrows():
-        try:
-            home = row['HomeTeam']
-            away = row['AwayTeam']
-            league = row.get('Div', 'Unknown')
-            
-            # Predict & Enrich
-            # Pass existing odds columns if present
-            current_odds = {k: v for k, v in row.items() if str(k).startswith('B365')}
-            
-            # Run Prediction
-            analysis = predictor.predict_match_safe(home, away, referee=row.get('Referee'), known_odds=current_odds)
-            
-            # Merge Metadata
-            full_match = row.to_dict()
-            full_match.update(analysis)
-            
-            # Check Strategies
-            active_strategies = []
-            for name, func, _, _ in PREMATCH_PATTERNS:
-                if func(analysis):
-                    active_strategies.append(name)
-            
-            full_match['active_strategies'] = active_strategies
-            if active_strategies:
-                strat_count += 1
-                
-            analyzed_results.append(full_match)
-            
-        except Exception as e:
-            print(f"   Error analyzing {row.get('HomeTeam')} vs {row.get('AwayTeam')}: {e}")
-
-    print(f"   Analysis Complete. Found {strat_count} matches with active strategies.", flush=True)
+    t0 = time.perf_counter()
+    snapshot = enrich(upcoming_df, predictor, workers)
+    timings['enrich_wall'] = time.perf_counter() - t0
+    # Summed over shards (CPU seconds across workers)
+    timings.update(snapshot.metadata.get('timings', {}))
+    print(f"   Analysis Complete in {timings['enrich_wall']:.1f}s. "
+          f"Found {snapshot.metadata['strategies_found']} matches with active strategies.", flush=True)
 
-    # 4. Structure for Frontend
-    output = {
-        "metadata": {
-            "last_updated": datetime.datetime.now().isoformat(),
-            "total_matches": len(upcoming_df),
-            "strategies_found": strat_count
-        },
-        "patterns_info": patterns_info,
-        "matches": analyzed_results 
-    }
-    
-    # 5. Save
-    print(f"4. Saving to {CACHE_FILE}...", flush=True)
+    # 4. Save (new version folder + atomic CURRENT swap: the dashboard never reads a half-written snapshot)
+    print(f"4. Saving to {SlateSnapshot.PATH}...", flush=True)
+    t0 = time.perf_counter()
     try:
-        if not os.path.exists("data_cache"):
-            os.makedirs("data_cache")
-        
-        # Serialize to string first to catch errors before touching file
-        # ignore_nan=True isn't standard in dump, so we use allow_nan=True (default) 
-        # BUT standard JSON does not support NaN. app.py matches might need valid JSON.
-        # We manually replace NaN if needed, or rely on Python's non-standard NaN support.
-        # However, the previous corruption suggests a crash. 
-        # Let's replace NaN with None in a deep pass? Too expensive.
-        # We will try allow_nan=False to FORCE an error if NaN exists, or basic dump.
-        
-        # Better: Dump to string, replace NaN, then write.
-        json_str = json.dumps(output, cls=DateTimeEncoder, indent=2)
-        
-        # Robust NaN handling (Post-processing string is risky but effective for simple NaN)
-        # Replacing "NaN" (unquoted) with null? Python dump produces NaN (unquoted).
-        # JSON standard requires no NaN.
-        json_str = json_str.replace(": NaN", ": null").replace(": Infinity", ": null").replace(": -Infinity", ": null")
-        
-        print(f"DEBUG: JSON Size to write: {len(json_str)} bytes", flush=True)
-
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            f.write(json_str)
-            
-        print("✅ Success! Data pipeline finished.", flush=True)
-        
+        folder = snapshot.save()
+        size = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+        run.update(status='ok', snapshot=folder, bytes=size, matches=len(snapshot.matches))
+        print(f"✅ Success! Data pipeline finished ({folder}, {size} bytes).", flush=True)
     except Exception as e:
         print(f"❌ Error saving file: {e}", flush=True)
-        # import traceback
-        # traceback.print_exc()
+    timings['write'] = time.perf_counter() - t0
 
-def save_empty():
-    output = {
-        "metadata": {
-            "last_updated": datetime.datetime.now().isoformat(),
-            "total_matches": 0,
-            "strategies_found": 0
-        },
-        "matches": []
-    }
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2)
+    print("   Timings: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()), flush=True)
+    log_run(run)
 
 if __name__ == "__main__":
-    update_data()
+    parser = argparse.ArgumentParser(description="Builds the precomputed dashboard slate snapshot.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per league, up to the CPU count)")
+    args = parser.parse_args()
+    update_data(workers=args.workers)
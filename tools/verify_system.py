@@ -26,9 +26,7 @@ def run_verification():
     test_user = "yolo_tester"
     try:
         # Cleanup possibly existing user
-        if test_user in um.users:
-            del um.users[test_user]
-            um._save_users()
+        um.delete_user(test_user)
             
         success, msg = um.register(test_user, "password123", "Yolo", "Tester", "test@example.com")
         if success: